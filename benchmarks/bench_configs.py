@@ -0,0 +1,69 @@
+"""ConfigService startup and lookups on a large synthetic config tree.
+
+Startup is measured three ways: a cold parse with PyYAML's pure-Python loader, a
+cold parse with the libyaml loader, and a warm start from the compiled snapshot.
+"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+from tectonic.base import ConfigService
+
+FOLDERS, FILES, KEYS = 10, 10, 200
+
+
+def make_tree(root: Path, folders: int = FOLDERS, files: int = FILES, keys: int = KEYS) -> Path:
+    for f in range(folders):
+        folder = root / f"folder{f}"
+        folder.mkdir(parents=True)
+        for n in range(files):
+            data = {
+                f"key{k}": {"apt": [f"pkg{k}-{i}" for i in range(5)], "enabled": k % 2 == 0}
+                for k in range(keys)
+            }
+            (folder / f"file{n}.yaml").write_text(yaml.dump(data))
+    return root
+
+
+def startup(config_dir: Path, cache_dir: Path | None) -> None:
+    service = ConfigService(config_dir, cache_dir=cache_dir)
+    service.prefetch()
+    service.get("folder0.file0.key0.apt")
+
+
+def bench_startup_cold_pure_python(benchmark, tmp_path):
+    config_dir = make_tree(tmp_path / "configs")
+    with patch("yaml.CSafeLoader", yaml.SafeLoader, create=True):
+        benchmark.pedantic(startup, args=(config_dir, None), rounds=1)
+
+
+def bench_startup_cold_libyaml(benchmark, tmp_path):
+    config_dir = make_tree(tmp_path / "configs")
+    benchmark.pedantic(startup, args=(config_dir, None), rounds=3)
+
+
+def bench_startup_warm_snapshot(benchmark, tmp_path):
+    config_dir, cache_dir = make_tree(tmp_path / "configs"), tmp_path / "cache"
+    startup(config_dir, cache_dir)
+    benchmark(startup, config_dir, cache_dir)
+
+
+def bench_construct(benchmark, tmp_path):
+    config_dir = make_tree(tmp_path / "configs")
+    benchmark(ConfigService, config_dir)
+
+
+def bench_get(benchmark, tmp_path):
+    service = ConfigService(make_tree(tmp_path / "configs", folders=2, files=2))
+    service.prefetch()
+    keys = [
+        f"folder{f}.file{n}.key{k}.apt" for f in range(2) for n in range(2) for k in range(KEYS)
+    ]
+
+    def lookup_all():
+        for key in keys:
+            service.get(key)
+
+    benchmark(lookup_all)
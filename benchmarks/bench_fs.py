@@ -0,0 +1,55 @@
+"""copy_tree and files_equal on generated trees."""
+
+import os
+import shutil
+from pathlib import Path
+
+from tectonic.core import fs
+
+DIRS, FILES_PER_DIR, FILE_SIZE = 20, 25, 4096
+LARGE_SIZE = 64 * 1024 * 1024
+
+
+def make_tree(root: Path) -> Path:
+    for d in range(DIRS):
+        folder = root / f"dir{d}" / "nested"
+        folder.mkdir(parents=True)
+        for f in range(FILES_PER_DIR):
+            (folder / f"file{f}.txt").write_bytes(os.urandom(FILE_SIZE))
+    return root
+
+
+def bench_copy_tree_fresh(benchmark, tmp_path):
+    src, dst = make_tree(tmp_path / "src"), tmp_path / "dst"
+
+    def clean():
+        shutil.rmtree(dst, ignore_errors=True)
+
+    benchmark.pedantic(fs.copy_tree, args=(src, dst), kwargs={"do_backup": False},
+                       setup=clean, rounds=5)
+
+
+def bench_copy_tree_up_to_date(benchmark, tmp_path):
+    src, dst = make_tree(tmp_path / "src"), tmp_path / "dst"
+    fs.copy_tree(src, dst, do_backup=False)
+    benchmark(fs.copy_tree, src, dst, do_backup=False)
+
+
+def _large_pair(tmp_path: Path, differ_at: int | None) -> tuple[Path, Path]:
+    a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+    data = bytearray(os.urandom(LARGE_SIZE))
+    a.write_bytes(data)
+    if differ_at is not None:
+        data[differ_at] ^= 0xFF
+    b.write_bytes(data)
+    return a, b
+
+
+def bench_files_equal_large_identical(benchmark, tmp_path):
+    a, b = _large_pair(tmp_path, None)
+    benchmark(fs.files_equal, a, b)
+
+
+def bench_files_equal_large_early_difference(benchmark, tmp_path):
+    a, b = _large_pair(tmp_path, 100)
+    benchmark(fs.files_equal, a, b)
@@ -0,0 +1,40 @@
+"""Host resolution against a synthetic hosts.yaml with thousands of hosts and aliases."""
+
+from tectonic.core import host
+
+HOSTS, ALIASES = 5000, 4
+
+
+def make_hosts(hosts: int = HOSTS, aliases: int = ALIASES) -> dict:
+    return {
+        "presets": {f"preset{p}": [f"mod{p}-{m}" for m in range(6)] for p in range(20)},
+        "hosts": {
+            f"host{h}": {
+                "preset": f"preset{h % 20}",
+                "aliases": [f"host{h}-alias{a}" for a in range(aliases)],
+                "extra": [f"extra{h % 7}", f"mod{h % 20}-0"],
+            }
+            for h in range(hosts)
+        },
+    }
+
+
+def bench_find_host_by_name(benchmark):
+    config = make_hosts()
+    benchmark(host.find_host, f"host{HOSTS - 1}", config)
+
+
+def bench_find_host_by_last_alias(benchmark):
+    config = make_hosts()
+    benchmark(host.find_host, f"host{HOSTS - 1}-alias{ALIASES - 1}", config)
+
+
+def bench_resolve_modules(benchmark):
+    config = make_hosts()
+    names = [f"host{h}-alias{h % ALIASES}" for h in range(0, HOSTS, HOSTS // 50)]
+
+    def resolve_all():
+        for name in names:
+            host.resolve_modules(name, config)
+
+    benchmark(resolve_all)
@@ -0,0 +1,41 @@
+"""tool_status on generated git repositories."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+from tectonic.core import tools
+
+REPOS, FILES_PER_REPO = 8, 2000
+
+
+def _git(*args: str, cwd: Path) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def make_repos(root: Path) -> dict[str, dict[str, str]]:
+    defined = {}
+    for r in range(REPOS):
+        path = root / f"tool{r}"
+        for f in range(FILES_PER_REPO):
+            file = path / f"pkg{f % 40}" / f"mod{f}.py"
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(f"VALUE = {f}\n")
+        _git("init", "-q", cwd=path)
+        _git("add", ".", cwd=path)
+        _git("-c", "user.name=bench", "-c", "user.email=bench@example.com",
+             "commit", "-qm", "init", cwd=path)
+        defined[f"tool{r}"] = {"repo": "unused", "path": f"tool{r}"}
+    return defined
+
+
+def bench_tool_status(benchmark, tmp_path):
+    if shutil.which("git") is None:
+        return
+    defined = make_repos(tmp_path)
+
+    def status_all():
+        for name, defn in defined.items():
+            tools.tool_status(name, defn, tmp_path)
+
+    benchmark(status_all)
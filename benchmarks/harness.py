@@ -0,0 +1,151 @@
+"""A small pytest-benchmark style harness: discovery, timing, baselines, comparison.
+
+Benchmarks are `bench_*` functions in `benchmarks/bench_*.py`. Each takes a
+`benchmark` argument (and optionally `tmp_path`) and calls `benchmark(fn, *args)`
+or `benchmark.pedantic(fn, setup=...)` once with the code under test.
+"""
+
+import contextlib
+import importlib.util
+import inspect
+import io
+import json
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).parent
+BASELINE_DIR = BENCH_DIR.parent / ".benchmarks"
+
+
+@dataclass
+class Stats:
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stddev: float
+
+    @classmethod
+    def of(cls, times: list[float]) -> "Stats":
+        return cls(
+            rounds=len(times),
+            min=min(times),
+            median=statistics.median(times),
+            mean=statistics.fmean(times),
+            stddev=statistics.stdev(times) if len(times) > 1 else 0.0,
+        )
+
+
+class Benchmark:
+    """Times one callable; rounds are added until `min_time` has been spent."""
+
+    def __init__(self, min_rounds: int = 5, max_rounds: int = 1000, min_time: float = 0.5):
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.min_time = min_time
+        self.stats: Stats | None = None
+
+    def __call__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return self.pedantic(fn, args=args, kwargs=kwargs)
+
+    def pedantic(
+        self,
+        fn: Callable[..., Any],
+        args: tuple[Any, ...] = (),
+        kwargs: dict[str, Any] | None = None,
+        setup: Callable[[], Any] | None = None,
+        rounds: int | None = None,
+    ) -> Any:
+        """Like pytest-benchmark's: `setup` runs untimed before every round."""
+        kwargs = kwargs or {}
+        times: list[float] = []
+        result = None
+        spent = 0.0
+        while True:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            spent += elapsed
+            if rounds is not None:
+                if len(times) >= rounds:
+                    break
+            elif len(times) >= self.max_rounds or (
+                len(times) >= self.min_rounds and spent >= self.min_time
+            ):
+                break
+        self.stats = Stats.of(times)
+        return result
+
+
+@contextlib.contextmanager
+def _quiet() -> Iterator[None]:
+    # tectonic prints a line per copied file; keep that off the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def discover(pattern: str = "") -> list[tuple[str, Callable[..., None]]]:
+    found = []
+    for path in sorted(BENCH_DIR.glob("bench_*.py")):
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        for name, fn in inspect.getmembers(module, inspect.isfunction):
+            full = f"{path.stem.removeprefix('bench_')}::{name.removeprefix('bench_')}"
+            if name.startswith("bench_") and fn.__module__ == path.stem and pattern in full:
+                found.append((full, fn))
+    return found
+
+
+def run(fn: Callable[..., None], **options: Any) -> Stats | None:
+    benchmark = Benchmark(**options)
+    params = inspect.signature(fn).parameters
+    with tempfile.TemporaryDirectory() as tmp:
+        kwargs: dict[str, Any] = {"benchmark": benchmark}
+        if "tmp_path" in params:
+            kwargs["tmp_path"] = Path(tmp)
+        with _quiet():
+            fn(**kwargs)
+    return benchmark.stats
+
+
+def save(name: str, results: dict[str, Stats]) -> Path:
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = BASELINE_DIR / f"{name}.json"
+    payload = {
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "saved": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {k: asdict(v) for k, v in results.items()},
+    }
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def load(name: str) -> dict[str, Stats]:
+    payload = json.loads((BASELINE_DIR / f"{name}.json").read_text())
+    return {k: Stats(**v) for k, v in payload["results"].items()}
+
+
+def compare(
+    results: dict[str, Stats], baseline: dict[str, Stats], threshold: float
+) -> list[tuple[str, float]]:
+    """Benchmarks whose median grew by more than `threshold` (a fraction), with the ratio."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is not None and base.median > 0:
+            ratio = stats.median / base.median
+            if ratio > 1 + threshold:
+                regressions.append((name, ratio))
+    return regressions
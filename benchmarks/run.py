@@ -0,0 +1,61 @@
+"""Run the benchmark suite, optionally saving or comparing against a baseline.
+
+    python benchmarks/run.py                       # run everything
+    python benchmarks/run.py -k host               # only names containing "host"
+    python benchmarks/run.py --save main           # store results as .benchmarks/main.json
+    python benchmarks/run.py --compare main        # exit 1 if a median regressed >10%
+"""
+
+import argparse
+import sys
+
+import harness
+
+
+def _fmt(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.2f} s "
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", default="", help="Only run names containing this")
+    parser.add_argument("--save", metavar="NAME", help="Save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Regression threshold in percent of the baseline median")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="Seconds to spend per benchmark")
+    args = parser.parse_args()
+
+    baseline = harness.load(args.compare) if args.compare else {}
+    results: dict[str, harness.Stats] = {}
+    print(f"{'benchmark':<40} {'median':>11} {'min':>11} {'rounds':>7}  vs baseline")
+    for name, fn in harness.discover(args.pattern):
+        stats = harness.run(fn, min_time=args.min_time)
+        if stats is None:
+            print(f"{name:<40} {'skipped':>11}")
+            continue
+        results[name] = stats
+        delta = ""
+        if name in baseline:
+            delta = f"{(stats.median / baseline[name].median - 1) * 100:+6.1f}%"
+        print(f"{name:<40} {_fmt(stats.median)} {_fmt(stats.min)} {stats.rounds:>7}  {delta}")
+
+    if args.save:
+        print(f"\nSaved baseline: {harness.save(args.save, results)}")
+
+    regressions = harness.compare(results, baseline, args.threshold / 100)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:g}% of '{args.compare}':")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:.2f}x baseline median")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,39 @@
+import atexit
+import hashlib
+import os
+import pickle
+from collections.abc import Iterable
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
-from yaml import safe_load
+SNAPSHOT_VERSION = 1
+
+# path -> ((mtime_ns, size), parsed content)
+Snapshot = dict[str, tuple[tuple[int, int], Any]]
+
+
+def _yaml_load(stream: IO[str]) -> Any:
+    # Imported on first parse: a warm snapshot means read-only commands never load yaml.
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml when PyYAML has it
+    return yaml.load(stream, Loader=loader)
+
+
+@lru_cache(maxsize=4096)
+def _split(keys: str) -> tuple[str, ...]:
+    return tuple(keys.split("."))
 
 
 class ConfigService:
-    def __init__(self, config_dir: str | Path = "configs"):
+    def __init__(self, config_dir: str | Path = "configs", cache_dir: str | Path | None = None):
         self._config_dir = Path(config_dir)
         self._cache: dict[tuple[str, str], dict[str, Any] | None] = {}
         self._folders: set[str] = set()
+        self._snapshot_path = self._snapshot_file(cache_dir)
+        self._snapshot: Snapshot = self._load_snapshot()
+        self._dirty = False
         self._scan_config_tree()
 
     def _scan_config_tree(self) -> None:
@@ -22,6 +47,49 @@ class ConfigService:
             elif item.suffix == ".yaml":
                 self._cache[("", item.stem)] = None
 
+    def _snapshot_file(self, cache_dir: str | Path | None) -> Path | None:
+        if cache_dir is None:
+            return None
+        key = hashlib.sha1(str(self._config_dir.resolve()).encode()).hexdigest()[:12]
+        return Path(cache_dir) / f"configs-{key}.pickle"
+
+    def _load_snapshot(self) -> Snapshot:
+        if self._snapshot_path is None:
+            return {}
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                version, snapshot = pickle.load(f)
+        except Exception:
+            return {}
+        return snapshot if version == SNAPSHOT_VERSION else {}
+
+    def _save_snapshot(self) -> None:
+        if self._snapshot_path is None or not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self._snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump((SNAPSHOT_VERSION, self._snapshot), f, pickle.HIGHEST_PROTOCOL)
+            tmp.replace(self._snapshot_path)
+        except OSError:
+            pass  # the snapshot is an optimization; a read-only cache dir just means parsing
+
+    def _parse(self, path: Path) -> dict[str, Any]:
+        st = path.stat()
+        signature = (st.st_mtime_ns, st.st_size)
+        entry = self._snapshot.get(str(path))
+        if entry is not None and entry[0] == signature:
+            return entry[1]  # type: ignore[no-any-return]
+        with open(path) as f:
+            content = _yaml_load(f) or {}
+        self._snapshot[str(path)] = (signature, content)
+        if self._snapshot_path is not None and not self._dirty:
+            self._dirty = True
+            atexit.register(self._save_snapshot)
+        return content  # type: ignore[no-any-return]
+
     def _load_file(self, folder: str, file: str) -> dict[str, Any]:
         key = (folder, file)
         if key not in self._cache:
@@ -31,12 +99,11 @@ class ConfigService:
                 path = self._config_dir / folder / f"{file}.yaml"
             else:
                 path = self._config_dir / f"{file}.yaml"
-            with open(path) as f:
-                self._cache[key] = safe_load(f) or {}
+            self._cache[key] = self._parse(path)
         return self._cache[key]  # type: ignore[return-value]
 
     def get(self, keys: str, default: Any = None) -> Any:
-        parts = keys.split(".")
+        parts = _split(keys)
         if len(parts) < 2:
             return default
         folder, file, *yaml_path = parts
@@ -44,10 +111,19 @@ class ConfigService:
             content = self._load_file(folder, file)
             return self._traverse(content, yaml_path, default)
         file = parts[0]
-        yaml_path = parts[1:]
+        yaml_path = list(parts[1:])
         content = self._load_file("", file)
         return self._traverse(content, yaml_path, default)
 
+    def get_many(self, keys: Iterable[str], default: Any = None) -> dict[str, Any]:
+        return {k: self.get(k, default) for k in keys}
+
+    def prefetch(self) -> None:
+        """Load every file now, so later lookups never touch the disk."""
+        for folder, file in list(self._cache):
+            self._load_file(folder, file)
+        self._save_snapshot()
+
     def _traverse(self, data: dict[str, Any], path: list[str], default: Any) -> Any:
         value: Any = data
         for key in path:
@@ -3,13 +3,15 @@ from typing import Annotated
 import typer
 
 from tectonic import config
-from tectonic.cli import apply, dotfiles, packages, tools
+from tectonic.cli import apply, backups, bundle, dotfiles, packages, shell, tools
 from tectonic.core import ui
 
 app = typer.Typer(
     name="tectonic",
     help="Environment Setup CLI Tool",
     no_args_is_help=True,
+    # Plain click help: rich-formatted help costs ~250ms of imports on every --help
+    rich_markup_mode=None,
 )
 
 
@@ -27,3 +29,6 @@ app.command(name="apply")(apply.apply)
 app.command(name="packages")(packages.packages)
 app.command(name="dotfiles")(dotfiles.dotfiles)
 app.command(name="tools")(tools.tools)
+app.command(name="bundle")(bundle.bundle)
+app.add_typer(backups.app, name="backups")
+app.add_typer(shell.app, name="shell")
@@ -1,13 +1,81 @@
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated
+
 import typer
 
 from tectonic import config
 from tectonic.cli import dotfiles as dotfiles_cmd
 from tectonic.cli import packages as packages_cmd
 from tectonic.cli import tools as tools_cmd
-from tectonic.core import host, ui
+from tectonic.core import host, profile, state, ui
+
+if TYPE_CHECKING:
+    import cProfile
+
+PROFILE_ROWS = 15
+
+
+def _report(profiler: profile.Profiler, python_profiler: "cProfile.Profile | None") -> None:
+    from rich.table import Table
+
+    table = Table(title="Slowest steps", title_justify="left")
+    for column in ("Step", "Kind", "Wall", "CPU", "Peak RSS", "Exit", "Output"):
+        table.add_column(column, justify="left" if column in ("Step", "Kind") else "right")
+    for s in profiler.slowest(PROFILE_ROWS):
+        exit_code = s.args.get("exit_code")
+        output = s.args.get("output_bytes")
+        table.add_row(
+            s.name,
+            s.cat,
+            f"{s.dur:.2f}s",
+            f"{s.cpu:.2f}s",
+            f"{s.max_rss / 2**20:.0f} MiB",
+            "" if exit_code is None else str(exit_code),
+            "" if output is None else f"{output / 1024:.1f} KiB",
+        )
+    ui.console.print(table)
 
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    trace = config.LOG_FILE.with_name(f"profile.{stamp}.trace.json")
+    profiler.write_trace(trace)
+    ui.ok(f"Trace written to {trace} (open in https://ui.perfetto.dev)")
+    if python_profiler is not None:
+        dump = trace.with_name(f"profile.{stamp}.prof")
+        python_profiler.dump_stats(dump)
+        ui.ok(f"cProfile written to {dump}")
 
-def apply() -> None:
+
+def apply(
+    refresh: Annotated[
+        bool,
+        typer.Option("--refresh", help="Refresh the package index and pull every tool"),
+    ] = False,
+    force: Annotated[
+        bool,
+        typer.Option("--force", "-f", help="Run every step, ignoring the convergence cache"),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", help="Modules and tools to run in parallel (0 = auto)"),
+    ] = 0,
+    profile_run: Annotated[
+        bool,
+        typer.Option(
+            "--profile", help="Time every step and command; write a Chrome trace to logs/",
+        ),
+    ] = False,
+    cprofile: Annotated[
+        bool,
+        typer.Option(
+            "--cprofile", help="Also dump a cProfile of the main thread (implies --profile)",
+        ),
+    ] = False,
+    from_bundle: Annotated[
+        Path | None,
+        typer.Option("--from-bundle", help="Install from a `tectonic bundle` archive, offline"),
+    ] = None,
+) -> None:
     """Converge current host to declared state."""
     hostname = host.get_hostname()
 
@@ -20,9 +88,44 @@ def apply() -> None:
 
     ui.section(f"Apply: {hostname}")
 
-    packages_cmd.packages()
-    dotfiles_cmd.dotfiles()
-    tools_cmd.tools()
+    if profile_run or cprofile:
+        profile.start()
+    python_profiler = None
+    if cprofile:
+        import cProfile
+
+        python_profiler = cProfile.Profile()
+        python_profiler.enable()
+
+    if from_bundle is not None:
+        from tectonic.core import bundle
+
+        try:
+            offline = bundle.unpack(from_bundle)
+        except (OSError, bundle.BundleError) as e:
+            ui.error(f"Cannot read bundle: {e}")
+            raise typer.Exit(code=1)
+        ui.info(f"Offline from bundle for {offline.manifest['host']} "
+                f"({offline.manifest['created']})")
+        bundle.activate(offline)
+
+    state.activate(state.StateStore(config.STATE_FILE, force=force))
+    try:
+        with profile.span("packages"):
+            packages_cmd.packages(refresh=refresh, jobs=jobs)
+        with profile.span("dotfiles"):
+            dotfiles_cmd.dotfiles()
+        with profile.span("tools"):
+            tools_cmd.tools(jobs=jobs, refresh=refresh)
+    finally:
+        state.activate(None)
+        if from_bundle is not None:
+            bundle.activate(None)
+        if python_profiler is not None:
+            python_profiler.disable()
+        profiler = profile.stop()
+        if profiler is not None:
+            _report(profiler, python_profiler)
 
     ui.section("Apply Complete")
     ui.ok("Host converged to declared state")
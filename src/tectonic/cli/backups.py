@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from tectonic import config
+from tectonic.core import ui
+
+app = typer.Typer(help="List, restore and prune file backups.", no_args_is_help=True)
+
+
+@app.command(name="list")
+def list_backups(
+    path: Annotated[Path | None, typer.Argument(help="Only show backups of this file")] = None,
+) -> None:
+    """List backed-up versions, oldest first."""
+    from tectonic.core import backup
+
+    entries = backup.store_for().entries(path)
+    if not entries:
+        ui.info("No backups")
+        return
+    for entry in entries:
+        ui.console.print(
+            f"  [dim]{entry.time}[/dim]  {entry.hash[:12]}  {entry.size:>10}  {entry.path}"
+        )
+
+
+@app.command()
+def restore(
+    path: Annotated[Path, typer.Argument(help="File to restore")],
+    version: Annotated[
+        str | None,
+        typer.Option("--version", help="Hash prefix of the version to restore (default: latest)"),
+    ] = None,
+    to: Annotated[
+        Path | None,
+        typer.Option("--to", help="Write here instead of the original path"),
+    ] = None,
+) -> None:
+    """Restore a file from its backups."""
+    from tectonic.core import backup
+
+    store = backup.store_for()
+    entries = [e for e in store.entries(path) if version is None or e.hash.startswith(version)]
+    if not entries:
+        ui.error(f"No backup of {path}" + (f" matching {version}" if version else ""))
+        raise typer.Exit(code=1)
+
+    entry = entries[-1]
+    target = to if to is not None else Path(entry.path)
+    if target.exists() and not target.is_symlink():
+        store.put(target)  # so the restore itself can be undone
+    store.restore(entry, target)
+    ui.ok(f"Restored {entry.path} ({entry.time}, {entry.hash[:12]}) -> {target}")
+
+
+@app.command()
+def prune(
+    keep: Annotated[
+        int | None,
+        typer.Option(
+            "--keep", min=1, help="Versions to keep per file (default: backups.keep)",
+        ),
+    ] = None,
+    max_age: Annotated[
+        float | None,
+        typer.Option("--max-age", help="Drop versions older than this many days"),
+    ] = None,
+) -> None:
+    """Apply the retention policy and compress old versions."""
+    from tectonic.core import backup
+
+    keep = keep if keep is not None else config.configs.get("settings.backups.keep", 10)
+    if max_age is None:
+        max_age = config.configs.get("settings.backups.max_age_days")
+    result = backup.store_for().prune(keep=keep, max_age_days=max_age)
+    ui.ok(
+        f"Pruned {result.entries} entries and {result.blobs} blobs, "
+        f"compressed {result.compressed}, freed {result.bytes_freed / 2**20:.1f} MiB"
+    )
@@ -0,0 +1,77 @@
+from datetime import date
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from tectonic import config
+from tectonic.core import distro, host, ui
+
+
+def bundle(
+    host_name: Annotated[
+        str | None,
+        typer.Option("--host", help="Host whose plan to bundle (default: this one)"),
+    ] = None,
+    output: Annotated[
+        Path | None,
+        typer.Option("--output", "-o", help="Archive to write (default: tectonic-HOST-DATE.tar)"),
+    ] = None,
+    platform_key: Annotated[
+        str | None,
+        typer.Option("--platform", help="Release binaries for <arch>-<os> (default: this machine)"),
+    ] = None,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", help="Downloads and repositories to fetch in parallel"),
+    ] = 4,
+) -> None:
+    """Write an offline bundle for `apply --from-bundle` on a host without network."""
+    # Imported here so --help doesn't load the module registry or tarfile
+    from tectonic import modules
+    from tectonic.core import bundle as core_bundle
+    from tectonic.core import download
+
+    hostname = host_name or host.get_hostname()
+    try:
+        hosts_config = host.load_hosts(config.configs)
+        host.find_host(hostname, hosts_config)
+        resolved = host.resolve_modules(hostname, hosts_config)
+    except (FileNotFoundError, KeyError) as e:
+        ui.error(f"Host resolution failed: {e}")
+        raise typer.Exit(code=1)
+
+    ui.section(f"Bundle: {hostname}")
+    ui.info(f"Modules: {', '.join(resolved)}")
+
+    # Package files come from this machine's package manager, so build on the target's distro
+    pkg_mgr = distro.detect().pkg_mgr
+    platform_key = platform_key or download.platform_key()
+    scripts = [config.configs.get(f"urls.{name}") for name in ("starship", "chezmoi")]
+    releases = [
+        download.release_url(spec, platform_key)
+        for spec in (config.configs.get("urls.releases", {}) or {}).values()
+    ]
+    root = Path(config.configs.get("tools.root", "~/workspace")).expanduser()
+    plan = core_bundle.Plan(
+        host=hostname,
+        platform=platform_key,
+        pkg_mgr=pkg_mgr,
+        packages=modules.plan_packages(resolved, pkg_mgr, config.configs),
+        downloads=[(url, None) for url in scripts if url] + [r for r in releases if r],
+        tools={
+            name: (defn["repo"], root / defn["path"])
+            for name, defn in config.configs.get("tools.tools", {}).items()
+        },
+        externals=core_bundle.chezmoi_externals(config.CHEZMOI_SOURCE),
+    )
+
+    output = output or Path(f"tectonic-{hostname}-{date.today():%Y%m%d}.tar")
+    try:
+        core_bundle.create(plan, output, jobs)
+    except (core_bundle.BundleError, download.DownloadError) as e:
+        ui.error(str(e))
+        raise typer.Exit(code=1)
+    size = output.stat().st_size / 2**20
+    ui.ok(f"Bundle written to {output} ({size:.1f} MiB)")
+    ui.info(f"On {hostname}: tectonic apply --from-bundle {output.name}")
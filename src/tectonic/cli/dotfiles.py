@@ -1,5 +1,40 @@
+import shutil
+import time
+from pathlib import Path
+
 from tectonic import config
-from tectonic.core import process, ui
+from tectonic.core import host, process, state, ui
+
+
+def _fingerprint(chezmoi_config: Path) -> str:
+    # .chezmoi.toml.tmpl reads hosts.yaml for the template data (hpc modules, scratch)
+    hosts = config.CONFIGS_DIR / "hosts.yaml"
+    return state.fingerprint(
+        state.version(),
+        host.get_hostname(),
+        state.tree_fingerprint(config.CHEZMOI_SOURCE),
+        hosts.read_text() if hosts.exists() else None,
+        chezmoi_config.exists(),
+        shutil.which("chezmoi"),
+    )
+
+
+def pending_changes(output: str) -> list[tuple[str, str]]:
+    """(action, target) for each `chezmoi status` line that `apply` would act on.
+
+    The second column compares the target with the source state; the first
+    only records drift since chezmoi last wrote the file, which apply ignores.
+    """
+    return [
+        (line[1], line[3:]) for line in output.splitlines() if len(line) > 3 and line[1] != " "
+    ]
+
+
+def _saved(store: state.StateStore | None, spent: float) -> str:
+    full = store.duration("dotfiles") if store is not None else None
+    if full is None or full <= spent:
+        return ""
+    return f", ~{full - spent:.1f}s faster than a full apply"
 
 
 def dotfiles() -> None:
@@ -10,12 +45,49 @@ def dotfiles() -> None:
         ui.info("chezmoi not found, skipping dotfiles")
         return
 
+    from tectonic.core import bundle
+
     source = str(config.CHEZMOI_SOURCE)
     chezmoi_config = config.XDG_CONFIG_HOME / "chezmoi" / "chezmoi.toml"
+    offline = bundle.active()
+    # chezmoi would download externals itself; unpack the bundled archives instead
+    exclude = ["--exclude=externals"] if offline is not None else []
+    if offline is not None:
+        offline.install_externals()
+
+    store = state.active()
+    if store is not None and store.is_current("dotfiles", _fingerprint(chezmoi_config)):
+        ui.ok("Dotfiles unchanged since last apply")
+        return
 
-    if chezmoi_config.exists():
-        process.run_interactive(["chezmoi", "apply", "--source", source, "--force"])
+    started = time.perf_counter()
+    if not chezmoi_config.exists():
+        process.run_interactive(["chezmoi", "init", "--source", source, "--apply", *exclude])
+        targets = None
     else:
-        process.run_interactive(["chezmoi", "init", "--source", source, "--apply"])
+        status = process.run(
+            ["chezmoi", "status", "--source", source, *exclude], check=False, capture=True
+        )
+        changes = pending_changes(status.stdout) if status.returncode == 0 else None
+        if changes is None or any(action == "R" for action, _ in changes):
+            # Unknown drift, or run_ scripts whose triggers only a full apply evaluates
+            targets = None
+        else:
+            targets = [str(Path.home() / target) for _, target in changes]
+        if targets == []:
+            spent = time.perf_counter() - started
+            ui.ok(f"Dotfiles clean, nothing to apply{_saved(store, spent)}")
+        else:
+            process.run_interactive(
+                ["chezmoi", "apply", "--source", source, "--force", *exclude, *(targets or [])]
+            )
 
-    ui.ok("Dotfiles applied")
+    spent = time.perf_counter() - started
+    if store is not None:
+        store.record(
+            "dotfiles", _fingerprint(chezmoi_config), duration=spent if targets is None else None
+        )
+    if targets is None:
+        ui.ok("Dotfiles applied")
+    elif targets:
+        ui.ok(f"Dotfiles applied: {len(targets)} changed paths{_saved(store, spent)}")
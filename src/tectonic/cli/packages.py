@@ -1,9 +1,27 @@
-from tectonic import config, modules
-from tectonic.core import distro, host, process, ui
+from contextlib import nullcontext
+from typing import Annotated
 
+import typer
 
-def packages() -> None:
+from tectonic import config
+from tectonic.core import distro, host, process, state, ui
+
+
+def packages(
+    refresh: Annotated[
+        bool,
+        typer.Option("--refresh", help="Refresh the package index even if it is recent"),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", help="Modules to run in parallel (0 = auto)"),
+    ] = 0,
+) -> None:
     """Install packages for current host."""
+    # Imported here so --help and read-only commands don't load the module registry
+    from tectonic import modules
+    from tectonic.core import bundle, parallel, scheduler
+
     hostname = host.get_hostname()
     hosts_config = host.load_hosts(config.configs)
     _, host_entry = host.find_host(hostname, hosts_config)
@@ -13,10 +31,66 @@ def packages() -> None:
     ui.section("Packages")
     ui.info(f"Modules: {', '.join(resolved)}")
 
+    d = distro.detect()
+    store = state.active()
+    fingerprints = {
+        name: modules.fingerprint(name, d, config.configs, host_entry) for name in resolved
+    }
+    pending = [
+        name for name in resolved
+        if store is None or not store.is_current(f"module:{name}", fingerprints[name])
+    ]
+    if not pending:
+        ui.ok("Packages unchanged since last apply")
+        return
+    if len(pending) < len(resolved):
+        ui.info(f"Unchanged, skipping: {', '.join(n for n in resolved if n not in pending)}")
+
+    # Guards run before the plan, as they did inside each module before it installed anything
+    set_up = [name for name in pending if modules.is_set_up(name)]
+    for name in set_up:
+        ui.info(f"{name}: {modules.MODULES[name].guard} already installed, skipping")
+        if store is not None:
+            store.record(f"module:{name}", fingerprints[name])
+    pending = [name for name in pending if name not in set_up]
+    if not pending:
+        return
+
     if not is_hpc:
         ui.step("Requesting sudo access")
         process.run_interactive(["sudo", "-v"])
 
-    distro.detect()
-    for name in resolved:
+    offline = bundle.active()
+    distro.configure(
+        update_ttl=config.configs.get("settings.packages.update_ttl", 0),
+        force_update=refresh,
+        offline=offline is not None,
+    )
+    planned = modules.plan_packages(pending, d.pkg_mgr, config.configs, check_guards=True)
+    if offline is not None:
+        # Dependencies ship in the bundle too; install whichever of them are missing,
+        # except packages the guards just left out of the plan
+        held = set(modules.plan_packages([*pending, *set_up], d.pkg_mgr, config.configs))
+        bundled = set(offline.manifest.get("packages", {}).values()) - held.difference(planned)
+        distro.mark_installed(offline.install_packages(set(distro.missing_packages(list(bundled)))))
+    missing = distro.missing_packages(planned)
+    if refresh or missing:
+        distro.pkg_update()
+    if missing:
+        distro.pkg_install(planned)
+
+    def run(name: str) -> None:
         modules.run_module(name)
+        if store is not None:
+            # Binaries may have appeared during the run; record what a rerun would compute.
+            store.record(f"module:{name}", modules.fingerprint(name, d, config.configs, host_entry))
+
+    tasks = [modules.task(name, run=lambda name=name: run(name)) for name in pending]
+    with nullcontext() if is_hpc else process.sudo_keepalive():
+        outcomes = scheduler.run(tasks, jobs or parallel.default_jobs())
+
+    failed = [o for o in outcomes if o.failed]
+    for o in failed:
+        ui.error(f"{o.name}: {o.error}")
+    if failed:
+        raise typer.Exit(code=1)
@@ -0,0 +1,87 @@
+import shutil
+from typing import Annotated
+
+import typer
+
+from tectonic import config
+from tectonic.core import host, state, ui
+
+app = typer.Typer(help="Inspect the managed zsh setup.", no_args_is_help=True)
+
+
+def _delta(now: float, before: float | None) -> str:
+    if not before:
+        return ""
+    change = (now / before - 1) * 100
+    color = "red" if change > 10 else "green" if change < -10 else "dim"
+    return f"[{color}]{change:+.0f}%[/{color}]"
+
+
+@app.command()
+def bench(
+    runs: Annotated[int, typer.Option("--runs", "-n", help="Timed launches")] = 20,
+    warmup: Annotated[int, typer.Option("--warmup", help="Untimed launches first")] = 2,
+    show_zprof: Annotated[
+        bool,
+        typer.Option("--zprof", help="Also print zprof's per-function report for one launch"),
+    ] = False,
+    eager: Annotated[
+        bool,
+        typer.Option(
+            "--eager/--deferred",
+            help="Load the zle-deferred plugins during startup (--deferred: time to prompt)",
+        ),
+    ] = True,
+    save: Annotated[
+        bool,
+        typer.Option("--save/--no-save", help="Append the result to the bench history"),
+    ] = True,
+) -> None:
+    """Time interactive zsh startup, per launch and per sourced file."""
+    from rich.table import Table
+
+    from tectonic.core import zsh
+
+    zsh_path = shutil.which("zsh")
+    if zsh_path is None:
+        ui.error("zsh not found in PATH")
+        raise typer.Exit(code=1)
+    if runs < 1:
+        ui.error("--runs must be at least 1")
+        raise typer.Exit(code=1)
+
+    ui.section("zsh startup")
+    plugins = "eager" if eager else "deferred"
+    ui.info(f"{runs} launches of `zsh -i -c exit` in a clean environment, {plugins} plugins")
+    result = zsh.bench(runs, warmup, zsh_path, eager=eager)
+    hostname = host.get_hostname()
+    dotfiles = state.tree_fingerprint(config.CHEZMOI_SOURCE)
+    previous = zsh.last_record(hostname, plugins)
+    if previous is not None:
+        same = "same" if previous.get("dotfiles") == dotfiles else "changed"
+        ui.info(f"vs last run on this host ({previous.get('time')}, dotfiles {same})")
+
+    table = Table(title_justify="left")
+    for column in ("Sourced file", "Median", "vs last"):
+        table.add_column(column, justify="left" if column == "Sourced file" else "right")
+    old_files = (previous or {}).get("files", {})
+    medians = result.file_medians()
+    for name, ms in sorted(medians.items(), key=lambda item: item[1], reverse=True):
+        table.add_row(name, f"{ms:.1f} ms", _delta(ms, old_files.get(name)))
+    if medians:
+        ui.console.print(table)
+    else:
+        ui.warn("No per-file times: the installed .zshrc predates the profiling hook")
+
+    summary = result.summary()
+    ui.console.print("  " + "  ".join(
+        f"{name} [bold]{ms:.1f}[/bold] ms {_delta(ms, (previous or {}).get(name))}".rstrip()
+        for name, ms in summary.items()
+    ))
+
+    if show_zprof:
+        ui.console.print(zsh.zprof(zsh_path, eager=eager), markup=False, highlight=False)
+
+    if save:
+        zsh.append_record(zsh.record(result, host=hostname, dotfiles=dotfiles, plugins=plugins))
+        ui.ok(f"Saved to {zsh.HISTORY_FILE}")
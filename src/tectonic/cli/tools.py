@@ -1,10 +1,91 @@
+import json
+import shutil
+import time
+from dataclasses import asdict
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any
 
 import typer
 
 from tectonic import config
-from tectonic.core import tools as core_tools, ui
+from tectonic.core import state, ui
+from tectonic.core import tools as core_tools
+
+
+def _fingerprint(defined: dict[str, Any], root: Path) -> str:
+    # Pulls depend on upstream state we can't see locally, so callers pair this with a max age.
+    return state.fingerprint(
+        state.version(),
+        defined,
+        str(root),
+        shutil.which("git"),
+        shutil.which("uv"),
+        {
+            name: [
+                (root / defn["path"]).exists(),
+                (core_tools.DIR_BIN / name).exists(),
+                core_tools.lock_hash(root / defn["path"]),
+            ]
+            for name, defn in defined.items()
+        },
+    )
+
+
+def _ago(timestamp: float) -> str:
+    seconds = time.time() - timestamp
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.0f}{unit} ago"
+    return "just now"
+
+
+def _print_status(
+    defined: dict[str, Any], root: Path, as_json: bool, untracked: bool, jobs: int
+) -> None:
+    from tectonic.core import parallel
+
+    outcomes = parallel.map_grouped(
+        lambda name: core_tools.tool_status(name, defined[name], root, untracked=untracked),
+        defined,
+        jobs or parallel.default_jobs(),
+    )
+    statuses = [o.value for o in outcomes if o.value is not None]
+    failed = [o for o in outcomes if o.failed]
+
+    if as_json:
+        entries: list[dict[str, Any]] = []
+        for o in outcomes:
+            if o.error is not None:
+                entries.append({"name": o.name, "error": str(o.error)})
+            elif o.value is not None:
+                entries.append(asdict(o.value))
+        typer.echo(json.dumps(entries, indent=2))
+        if failed:
+            raise typer.Exit(code=1)
+        return
+
+    for s in statuses:
+        src_color = {"missing": "red", "dirty": "yellow", "clean": "green"}[s.source]
+        wrap_color = {"missing": "red", "ok": "green"}.get(s.wrapper, "yellow")  # stale, no-uv
+        line = (
+            f"  {s.name}: source [{src_color}]{s.source}[/{src_color}], "
+            f"wrapper [{wrap_color}]{s.wrapper}[/{wrap_color}]"
+        )
+        if s.branch is not None:
+            line += f", {s.branch}"
+            if s.upstream is None:
+                line += " [dim](no upstream)[/dim]"
+            elif s.ahead or s.behind:
+                line += f" [yellow]+{s.ahead} -{s.behind}[/yellow]"
+        if s.untracked:
+            line += f", {s.untracked} untracked"
+        if s.last_fetch is not None:
+            line += f" [dim](fetched {_ago(s.last_fetch)})[/dim]"
+        ui.console.print(line)
+    for o in failed:
+        ui.error(f"{o.name}: {o.error}")
+    if failed:
+        raise typer.Exit(code=1)
 
 
 def tools(
@@ -16,10 +97,31 @@ def tools(
         bool,
         typer.Option("--status", "-s", help="Show source + wrapper status"),
     ] = False,
+    as_json: Annotated[
+        bool,
+        typer.Option("--json", help="With --status, print machine-readable JSON"),
+    ] = False,
+    untracked: Annotated[
+        bool,
+        typer.Option("--untracked", help="With --status, also scan for untracked files"),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", help="Tools to sync in parallel (0 = auto)"),
+    ] = 0,
+    refresh: Annotated[
+        bool,
+        typer.Option("--refresh", help="Pull every tool, ignoring fetch_ttl"),
+    ] = False,
 ) -> None:
     """Install and update CLI tools."""
     root = Path(config.configs.get("tools.root", "~/workspace")).expanduser()
-    defined = config.configs.get("tools.tools", {})
+    # `clone:` holds defaults (depth, filter, sparse, mirror) each tool may override
+    clone_defaults = config.configs.get("tools.clone", {})
+    defined = {
+        name: {**clone_defaults, **defn}
+        for name, defn in config.configs.get("tools.tools", {}).items()
+    }
 
     if not defined:
         ui.info("No tools defined")
@@ -31,17 +133,44 @@ def tools(
         return
 
     if status:
-        for name, defn in defined.items():
-            src, wrap = core_tools.tool_status(name, defn, root)
-            src_color = {"missing": "red", "dirty": "yellow", "clean": "green"}[src]
-            wrap_color = {"missing": "red", "stale": "yellow", "ok": "green"}[wrap]
-            ui.console.print(
-                f"  {name}: source [{src_color}]{src}[/{src_color}], "
-                f"wrapper [{wrap_color}]{wrap}[/{wrap_color}]"
-            )
+        _print_status(defined, root, as_json, untracked, jobs)
         return
 
+    # thread pool machinery and the bundle reader; --list/--status don't need them
+    from tectonic.core import bundle, parallel
+
     ui.section("Tools")
-    for name, defn in defined.items():
-        core_tools.install_tool(name, defn, root)
+    store = state.active()
+    offline = bundle.active()
+    fp = _fingerprint(defined, root)
+    max_age = config.configs.get("settings.apply.tools_max_age", 0)
+    fresh = refresh or offline is not None
+    if not fresh and store is not None and store.is_current("tools", fp, max_age=max_age):
+        ui.ok("Tools unchanged since last apply")
+        return
+
+    fetch_ttl = config.configs.get("tools.fetch_ttl", 0)
+    outcomes = parallel.map_grouped(
+        lambda name: core_tools.install_tool(
+            name, defined[name], root, fetch_ttl=fetch_ttl, refresh=refresh,
+            source_bundle=offline.tool(name) if offline is not None else None,
+        ),
+        defined,
+        jobs or parallel.default_jobs(),
+    )
+
+    failed = [o.name for o in outcomes if o.failed]
+    skipped = [o.name for o in outcomes if not o.failed and o.value]
+    for o in outcomes:
+        if o.failed:
+            ui.error(f"{o.name}: {o.error}")
+
+    if failed:
+        ui.warn(f"Tools: {len(failed)} of {len(outcomes)} failed ({', '.join(failed)})")
+        raise typer.Exit(code=1)
+    if skipped:
+        ui.warn(f"Tools ready, pull skipped for: {', '.join(skipped)}")
+        return
+    if store is not None:
+        store.record("tools", _fingerprint(defined, root))
     ui.ok("Tools ready")
@@ -1,7 +1,9 @@
 import platform
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from tectonic.base import ConfigService
+if TYPE_CHECKING:
+    from tectonic.base import ConfigService
 
 TECTONIC_ROOT = Path(__file__).parent.parent.parent
 CONFIGS_DIR = TECTONIC_ROOT / "configs"
@@ -10,7 +12,10 @@ XDG_CONFIG_HOME = Path.home() / ".config"
 XDG_DATA_HOME = Path.home() / ".local" / "share"
 XDG_CACHE_HOME = Path.home() / ".cache"
 
-LOG_FILE = TECTONIC_ROOT / "logs" / "tectonic.log"
+LOG_FILE = TECTONIC_ROOT / "logs" / "tectonic.jsonl"
+
+DIR_CACHE = XDG_CACHE_HOME / "tectonic"
+STATE_FILE = DIR_CACHE / "state.json"
 
 DIR_ZSH_CONFIG = XDG_CONFIG_HOME / "zsh"
 DIR_ZSH_DATA = XDG_DATA_HOME / "zsh"
@@ -26,4 +31,14 @@ CHEZMOI_SOURCE = TECTONIC_ROOT / "home"
 ARCH = platform.machine()
 SYSTEM = platform.system()
 
-configs = ConfigService(config_dir=CONFIGS_DIR)
+configs: "ConfigService"
+
+
+def __getattr__(name: str) -> Any:
+    # Build `configs` on first use: read-only commands and --help shouldn't scan configs/.
+    if name == "configs":
+        from tectonic.base import ConfigService
+
+        globals()["configs"] = ConfigService(config_dir=CONFIGS_DIR, cache_dir=DIR_CACHE)
+        return globals()["configs"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
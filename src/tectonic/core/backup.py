@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+from tectonic.core import fs
+
+BACKUP_DIR = Path.home() / ".dotfiles.backup"
+
+
+@dataclass(frozen=True)
+class Entry:
+    time: str
+    path: str
+    hash: str
+    size: int
+    mode: int
+
+
+@dataclass
+class PruneResult:
+    entries: int = 0
+    blobs: int = 0
+    bytes_freed: int = 0
+    compressed: int = 0
+
+
+class Store:
+    """Content-addressed backups: each distinct content is stored once as a blob.
+
+    `objects/<hh>/<rest>` holds blobs by sha256, gzipped (`.gz`) once prune has
+    compressed them; `index.jsonl` records which path had which content when.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._index = root / "index.jsonl"
+        self._lock = threading.Lock()
+
+    def _object(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    def blob(self, entry: Entry) -> Path:
+        plain = self._object(entry.hash)
+        return plain if plain.exists() else plain.with_suffix(".gz")
+
+    def put(self, path: Path) -> Entry:
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        st = path.stat()
+        entry = Entry(
+            datetime.now().isoformat(timespec="seconds"),
+            str(path.absolute()),
+            digest,
+            st.st_size,
+            st.st_mode & 0o7777,
+        )
+        obj = self._object(digest)
+        with self._lock:
+            if not obj.exists() and not obj.with_suffix(".gz").exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_name(f".{obj.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                fs.copy_file(path, tmp)
+                tmp.chmod(0o444)  # blobs are shared by every entry with this content
+                tmp.replace(obj)
+            with open(self._index, "a") as index:
+                index.write(json.dumps(asdict(entry)) + "\n")
+        return entry
+
+    def entries(self, path: Path | None = None) -> list[Entry]:
+        """Index entries, oldest first, optionally only those for `path`."""
+        try:
+            lines = self._index.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+        wanted = str(path.absolute()) if path is not None else None
+        found = []
+        for line in lines:
+            try:
+                entry = Entry(**json.loads(line))
+            except (ValueError, TypeError):
+                continue  # a torn line from an interrupted run
+            if wanted is None or entry.path == wanted:
+                found.append(entry)
+        return found
+
+    def restore(self, entry: Entry, target: Path | None = None) -> Path:
+        target = target if target is not None else Path(entry.path)
+        blob = self.blob(entry)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if blob.suffix == ".gz":
+            with gzip.open(blob, "rb") as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, fs.CHUNK_SIZE)
+        else:
+            target.unlink(missing_ok=True)  # the blob is read-only; don't inherit that
+            fs.copy_file(blob, target)
+        target.chmod(entry.mode)
+        return target
+
+    def prune(
+        self, keep: int, max_age_days: float | None = None, compress: bool = True
+    ) -> PruneResult:
+        """Keep the newest `keep` entries per path, dropping those older than `max_age_days`.
+
+        The latest entry of each path always survives. Blobs no entry refers to
+        are deleted; with `compress`, blobs that are no longer the latest version
+        of any path are gzipped.
+        """
+        result = PruneResult()
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        with self._lock:
+            entries = self.entries()
+            by_path: dict[str, list[Entry]] = {}
+            for entry in entries:
+                by_path.setdefault(entry.path, []).append(entry)
+
+            kept: list[Entry] = []
+            latest: set[str] = set()
+            for versions in by_path.values():
+                latest.add(versions[-1].hash)
+                recent = versions[-max(keep, 1):]
+                kept.extend(
+                    e for e in recent
+                    if e is versions[-1]
+                    or cutoff is None
+                    or datetime.fromisoformat(e.time).timestamp() >= cutoff
+                )
+            kept.sort(key=lambda e: e.time)
+            result.entries = len(entries) - len(kept)
+
+            tmp = self._index.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text("".join(json.dumps(asdict(e)) + "\n" for e in kept))
+            tmp.replace(self._index)
+
+            referenced = {e.hash for e in kept}
+            for blob in sorted((self.root / "objects").glob("*/*")):
+                if blob.name.startswith("."):
+                    continue
+                digest = blob.parent.name + blob.name.removesuffix(".gz")
+                if digest not in referenced:
+                    result.blobs += 1
+                    result.bytes_freed += blob.stat().st_size
+                    blob.unlink()
+                elif compress and blob.suffix != ".gz" and digest not in latest:
+                    packed = blob.with_suffix(".gz")
+                    with open(blob, "rb") as src, gzip.open(packed, "wb") as dst:
+                        shutil.copyfileobj(src, dst, fs.CHUNK_SIZE)
+                    result.bytes_freed += blob.stat().st_size - packed.stat().st_size
+                    blob.unlink()
+                    result.compressed += 1
+        return result
+
+
+_stores: dict[Path, Store] = {}
+_stores_lock = threading.Lock()
+
+
+def store_for(root: Path = BACKUP_DIR) -> Store:
+    """One Store per directory, so concurrent backups share its lock."""
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = Store(root)
+        return _stores[root]
@@ -0,0 +1,250 @@
+import json
+import shutil
+import tarfile
+import tempfile
+import tomllib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from tectonic import config
+from tectonic.core import download, process, ui
+
+BUNDLE_DIR = config.DIR_CACHE / "bundles"
+MANIFEST = "manifest.json"
+FORMAT = 1
+
+# Installs package files without consulting remote repositories
+_LOCAL_INSTALL = {
+    "apt": ["sudo", "apt-get", "install", "-y", "--no-download"],
+    "dnf": ["sudo", "dnf", "install", "-y", "--disablerepo=*"],
+}
+
+
+class BundleError(Exception):
+    pass
+
+
+@dataclass
+class Plan:
+    """What a bundle carries for one host."""
+
+    host: str
+    platform: str
+    pkg_mgr: str = ""
+    packages: list[str] = field(default_factory=list)
+    downloads: list[tuple[str, str | None]] = field(default_factory=list)
+    tools: dict[str, tuple[str, Path]] = field(default_factory=dict)  # name -> (repo, checkout)
+    externals: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+def chezmoi_externals(source: Path) -> dict[str, dict[str, Any]]:
+    """Archive externals from `.chezmoiexternal.toml`, keyed by target relative to $HOME."""
+    path = source / ".chezmoiexternal.toml"
+    if not path.exists():
+        return {}
+    externals = {}
+    for target, spec in tomllib.loads(path.read_text()).items():
+        if spec.get("type") == "archive":
+            externals[target] = spec
+        else:
+            ui.warn(f"External {target}: type {spec.get('type')!r} can't be bundled")
+    return externals
+
+
+def _parse_apt_depends(output: str) -> list[str]:
+    # `apt-cache depends --recurse` lists each package unindented; <name> is virtual
+    return list(dict.fromkeys(
+        line for line in output.splitlines()
+        if line and not line[0].isspace() and not line.startswith("<")
+    ))
+
+
+def download_packages(pkg_mgr: str, packages: list[str], dest: Path) -> dict[str, str]:
+    """Download packages and everything they depend on; {file name: package name}."""
+    dest.mkdir(parents=True, exist_ok=True)
+    if not packages:
+        return {}
+    if pkg_mgr == "apt":
+        depends = process.run(
+            ["apt-cache", "depends", "--recurse", "--no-recommends", "--no-suggests",
+             "--no-conflicts", "--no-breaks", "--no-replaces", "--no-enhances", *packages],
+            capture=True,
+        )
+        process.run(["apt-get", "download", *_parse_apt_depends(depends.stdout)], cwd=dest)
+        # <name>_<version>_<arch>.deb
+        return {p.name: p.name.split("_", 1)[0] for p in sorted(dest.glob("*.deb"))}
+    if pkg_mgr == "dnf":
+        process.run(["dnf", "download", "--resolve", "--destdir", str(dest), *packages])
+        files = sorted(dest.glob("*.rpm"))
+        if not files:
+            return {}
+        names = process.run(
+            ["rpm", "-qp", "--qf", "%{NAME}\n", *map(str, files)], capture=True
+        )
+        return dict(zip((p.name for p in files), names.stdout.split()))
+    ui.warn(f"Bundling {pkg_mgr or 'no'} packages is not supported, skipping them")
+    return {}
+
+
+def _is_partial(path: Path) -> bool:
+    return process.run_quiet(["git", "config", "--get", "remote.origin.promisor"], cwd=path)
+
+
+def bundle_repo(repo: str, checkout: Path, out: Path) -> None:
+    """`git bundle` every ref of a repo, from its checkout when that has all objects."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = checkout
+        if not checkout.exists() or _is_partial(checkout):
+            # A partial clone lacks the blobs a bundle must carry
+            source = Path(tmp) / "repo.git"
+            process.run(["git", "clone", "--bare", "--quiet", repo, str(source)])
+        process.run(["git", "bundle", "create", "--quiet", str(out), "--all"], cwd=source)
+
+
+def create(plan: Plan, output: Path, jobs: int = 4) -> Path:
+    """Write a tar with everything `plan` needs from the network, plus its manifest."""
+    from tectonic.core import parallel
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output.parent) as tmp:
+        staging = Path(tmp)
+
+        ui.step(f"Downloading {len(plan.packages)} packages and their dependencies")
+        packages = download_packages(plan.pkg_mgr, plan.packages, staging / "packages")
+
+        urls = [*plan.downloads, *((spec["url"], None) for spec in plan.externals.values())]
+        ui.step(f"Fetching {len(urls)} downloads")
+        failed = {
+            url: str(result) for url, result in download.fetch_all(urls, jobs).items()
+            if isinstance(result, Exception)
+        }
+        if failed:
+            raise BundleError("Downloads failed: " + "; ".join(failed.values()))
+        (staging / "downloads").mkdir()
+        for url, _ in urls:
+            for path in download.cache_files(url):
+                shutil.copy2(path, staging / "downloads" / path.name)
+
+        ui.step(f"Bundling {len(plan.tools)} tool repositories")
+        (staging / "tools").mkdir()
+        outcomes = parallel.map_grouped(
+            lambda name: bundle_repo(*plan.tools[name], staging / "tools" / f"{name}.bundle"),
+            plan.tools,
+            jobs,
+        )
+        errors = [f"{o.name}: {o.error}" for o in outcomes if o.failed]
+        if errors:
+            raise BundleError("Tool bundles failed: " + "; ".join(errors))
+
+        manifest = {
+            "format": FORMAT,
+            "host": plan.host,
+            "platform": plan.platform,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "pkg_mgr": plan.pkg_mgr,
+            "packages": packages,
+            "downloads": [url for url, _ in urls],
+            "tools": sorted(plan.tools),
+            "externals": plan.externals,
+        }
+        (staging / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+
+        tmp_output = output.with_name(f".{output.name}.tmp")
+        # Package files, archives and git bundles are already compressed
+        with tarfile.open(tmp_output, "w") as tar:
+            for name in (MANIFEST, "packages", "downloads", "tools"):
+                tar.add(staging / name, arcname=name)
+        tmp_output.replace(output)
+    return output
+
+
+class Bundle:
+    """An unpacked bundle that packages, tools and dotfiles install from."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        try:
+            self.manifest: dict[str, Any] = json.loads((root / MANIFEST).read_text())
+        except FileNotFoundError:
+            raise BundleError(f"{root}: no {MANIFEST}, not a tectonic bundle") from None
+        if self.manifest.get("format") != FORMAT:
+            raise BundleError(f"{root}: unsupported bundle format {self.manifest.get('format')}")
+
+    def tool(self, name: str) -> Path | None:
+        path = self.root / "tools" / f"{name}.bundle"
+        return path if path.exists() else None
+
+    def install_packages(self, missing: set[str]) -> list[str]:
+        """Install the bundled package files for packages in `missing`; their names."""
+        pkg_mgr = self.manifest.get("pkg_mgr", "")
+        files = {
+            file: name for file, name in self.manifest.get("packages", {}).items()
+            if name in missing
+        }
+        if not files:
+            return []
+        if pkg_mgr not in _LOCAL_INSTALL:
+            raise BundleError(f"Can't install {pkg_mgr} package files")
+        ui.step(f"Installing from bundle: {' '.join(files.values())}")
+        process.run([*_LOCAL_INSTALL[pkg_mgr], *(str(self.root / "packages" / f) for f in files)])
+        return list(files.values())
+
+    def install_externals(self, home: Path = Path.home()) -> None:
+        """Unpack each chezmoi archive external into place, as `chezmoi apply` would."""
+        for target, spec in self.manifest.get("externals", {}).items():
+            _extract(download.fetch(spec["url"]), home / target, spec.get("stripComponents", 0))
+            ui.ok(f"External {target} installed from bundle")
+
+
+def _extract(archive: Path, target: Path, strip: int) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=target.parent))
+    try:
+        with tarfile.open(archive) as tar:
+            members = []
+            for member in tar.getmembers():
+                parts = Path(member.name).parts[strip:]
+                if parts:
+                    member.name = str(Path(*parts))
+                    members.append(member)
+            tar.extractall(staging, members=members, filter="data")
+    except BaseException:
+        shutil.rmtree(staging)
+        raise
+    staging.chmod(0o755)
+    # exact = true: the target holds the archive's contents and nothing else
+    if target.exists():
+        shutil.rmtree(target)
+    staging.rename(target)
+
+
+def unpack(archive: Path) -> Bundle:
+    """Extract a bundle under BUNDLE_DIR and seed the download cache from it."""
+    root = BUNDLE_DIR / archive.name.removesuffix(".tar")
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+    try:
+        with tarfile.open(archive) as tar:
+            tar.extractall(root, filter="data")
+    except tarfile.TarError as e:
+        raise BundleError(f"{archive}: {e}") from e
+    bundle = Bundle(root)
+    download.seed(root / "downloads")
+    return bundle
+
+
+_active: Bundle | None = None
+
+
+def activate(bundle: Bundle | None) -> None:
+    """Serve downloads, tools and externals from `bundle` (None: from the network)."""
+    global _active
+    _active = bundle
+    download.configure(offline=bundle is not None)
+
+
+def active() -> Bundle | None:
+    return _active
@@ -1,9 +1,18 @@
 import platform
+import subprocess
+import threading
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
 
+from tectonic import config
 from tectonic.core import process, ui
 
+OS_RELEASE = Path("/etc/os-release")
+APT_LISTS = Path("/var/lib/apt/lists")
+STAMP_DIR = config.DIR_CACHE
+
 
 @dataclass
 class Distro:
@@ -14,7 +23,70 @@ class Distro:
     pkg_mgr: str
 
 
+@dataclass(frozen=True)
+class PackageBackend:
+    name: str
+    query: list[str]
+    install: list[str]
+    update: list[str]
+    parse: Callable[[str], set[str]]
+
+
+def _parse_dpkg(output: str) -> set[str]:
+    # "<name>\t<want> <error> <status>"; removed-but-configured packages end in "config-files"
+    installed = set()
+    for line in output.splitlines():
+        name, _, status = line.partition("\t")
+        if status.endswith(" installed"):
+            installed.add(name)
+    return installed
+
+
+def _parse_first_column(output: str) -> set[str]:
+    return {line.split()[0] for line in output.splitlines() if line.strip()}
+
+
+BACKENDS: dict[str, PackageBackend] = {
+    "apt": PackageBackend(
+        name="apt",
+        query=["dpkg-query", "-W", "-f", "${Package}\t${Status}\n"],
+        install=["sudo", "apt", "install", "-y"],
+        update=["sudo", "apt", "update"],
+        parse=_parse_dpkg,
+    ),
+    "brew": PackageBackend(
+        name="brew",
+        query=["brew", "list", "--formula", "--versions"],
+        install=["brew", "install"],
+        update=["brew", "update"],
+        parse=_parse_first_column,
+    ),
+    "pacman": PackageBackend(
+        name="pacman",
+        query=["pacman", "-Q"],
+        install=["sudo", "pacman", "-S", "--needed", "--noconfirm"],
+        # Arch doesn't support partial upgrades: a sync without -u would let installs link
+        # against libraries newer than the rest of the system
+        update=["sudo", "pacman", "-Syu", "--noconfirm"],
+        parse=_parse_first_column,
+    ),
+    "dnf": PackageBackend(
+        name="dnf",
+        query=["rpm", "-qa", "--qf", "%{NAME}\n"],
+        install=["sudo", "dnf", "install", "-y"],
+        update=["sudo", "dnf", "makecache"],
+        parse=_parse_first_column,
+    ),
+}
+
 _distro: Distro | None = None
+_installed: set[str] | None = None
+_installed_lock = threading.Lock()
+_update_ttl = 0
+_force_update = False
+_offline = False
+_update_checked = False
+_refreshed = False
 
 
 def _detect_macos() -> Distro:
@@ -29,8 +101,7 @@ def _detect_macos() -> Distro:
 
 
 def _detect_linux() -> Distro:
-    os_release = Path("/etc/os-release")
-    if not os_release.exists():
+    if not OS_RELEASE.exists():
         ui.warn("Cannot detect distribution: /etc/os-release not found")
         return Distro(
             id="unknown",
@@ -41,7 +112,7 @@ def _detect_linux() -> Distro:
         )
 
     info: dict[str, str] = {}
-    for line in os_release.read_text().splitlines():
+    for line in OS_RELEASE.read_text().splitlines():
         if "=" in line:
             key, value = line.split("=", 1)
             info[key] = value.strip('"')
@@ -49,11 +120,15 @@ def _detect_linux() -> Distro:
     distro_id = info.get("ID", "unknown")
     id_like = info.get("ID_LIKE", "")
 
+    family = {distro_id, *id_like.split()}
+
     pkg_mgr = ""
-    if distro_id in ("ubuntu", "debian", "linuxmint", "pop"):
-        pkg_mgr = "apt"
-    elif "debian" in id_like:
+    if family & {"ubuntu", "debian", "linuxmint", "pop"}:
         pkg_mgr = "apt"
+    elif family & {"arch", "manjaro", "endeavouros"}:
+        pkg_mgr = "pacman"
+    elif family & {"fedora", "rhel", "centos", "rocky", "almalinux"}:
+        pkg_mgr = "dnf"
 
     return Distro(
         id=distro_id,
@@ -64,6 +139,14 @@ def _detect_linux() -> Distro:
     )
 
 
+def configure(update_ttl: int = 0, force_update: bool = False, offline: bool = False) -> None:
+    """Set how pkg_update treats a recently refreshed package index; `offline` skips it."""
+    global _update_ttl, _force_update, _offline
+    _update_ttl = update_ttl
+    _force_update = force_update
+    _offline = offline
+
+
 def detect() -> Distro:
     global _distro
     if _distro is not None:
@@ -78,41 +161,117 @@ def detect() -> Distro:
     return _distro
 
 
-def pkg_update() -> None:
-    d = detect()
-    ui.step("Updating package database")
+def backend() -> PackageBackend | None:
+    return BACKENDS.get(detect().pkg_mgr)
+
+
+def installed_packages() -> set[str]:
+    """Snapshot of installed packages, queried once per run."""
+    global _installed
+    with _installed_lock:
+        if _installed is None:
+            _installed = _query_installed()
+        return _installed
+
+
+def _query_installed() -> set[str]:
+    b = backend()
+    if b is None:
+        return set()
+    try:
+        result = process.run(b.query, check=False, capture=True)
+    except FileNotFoundError:
+        return set()
+    if result.returncode != 0:
+        ui.warn(f"Could not query installed packages ({b.name}), assuming none")
+        return set()
+    return b.parse(result.stdout)
 
-    match d.pkg_mgr:
-        case "apt":
-            process.run(["sudo", "apt", "update"])
-        case "brew":
-            process.run(["brew", "update"])
+
+def missing_packages(packages: list[str]) -> list[str]:
+    installed = installed_packages()
+    return [p for p in dict.fromkeys(packages) if p not in installed]
+
+
+def _stamp(pkg_mgr: str) -> Path:
+    return STAMP_DIR / f"pkg-update-{pkg_mgr}.stamp"
+
+
+def last_refresh(pkg_mgr: str) -> float | None:
+    """When the package index was last refreshed, by tectonic or anyone else."""
+    times = []
+    stamp = _stamp(pkg_mgr)
+    if stamp.exists():
+        times.append(stamp.stat().st_mtime)
+    # apt replaces files in lists/ on every successful update, bumping the directory mtime
+    if pkg_mgr == "apt" and APT_LISTS.is_dir():
+        times.append(APT_LISTS.stat().st_mtime)
+    return max(times, default=None)
+
+
+def pkg_update(force: bool = False) -> None:
+    global _update_checked, _refreshed
+    b = backend()
+    if b is None or _refreshed:
+        return
+    if _offline:
+        ui.info("Offline, not updating the package index")
+        return
+    force = force or _force_update
+    if _update_checked and not force:
+        return
+    _update_checked = True
+
+    last = last_refresh(b.name)
+    if not force and _update_ttl > 0 and last is not None:
+        age = time.time() - last
+        if age < _update_ttl:
+            ui.info(f"Package index refreshed {int(age // 60)}m ago, skipping update")
+            return
+
+    ui.step("Updating package database")
+    process.run(b.update)
+    _refreshed = True
+    STAMP_DIR.mkdir(parents=True, exist_ok=True)
+    _stamp(b.name).touch()
 
 
 def pkg_install(packages: list[str]) -> None:
     if not packages:
         return
 
-    d = detect()
-    ui.step(f"Installing: {' '.join(packages)}")
+    b = backend()
+    if b is None:
+        ui.warn(f"No package manager available, cannot install: {' '.join(packages)}")
+        return
 
-    match d.pkg_mgr:
-        case "apt":
-            process.run(["sudo", "apt", "install", "-y", *packages])
-        case "brew":
-            process.run(["brew", "install", *packages])
+    missing = missing_packages(packages)
+    if not missing:
+        ui.info(f"Already installed: {' '.join(packages)}")
+        return
 
+    ui.step(f"Installing: {' '.join(missing)}")
+    try:
+        process.run([*b.install, *missing])
+    except subprocess.CalledProcessError:
+        if _refreshed or _offline:
+            raise
+        # Usually a stale index that doesn't know the package (yet); refresh once and retry.
+        ui.warn("Install failed, refreshing package index and retrying")
+        pkg_update(force=True)
+        process.run([*b.install, *missing])
+    mark_installed(missing)
 
-def pkg_installed(package: str) -> bool:
-    d = detect()
 
-    match d.pkg_mgr:
-        case "apt":
-            return process.run_quiet(["dpkg", "-l", package])
-        case "brew":
-            return process.run_quiet(["brew", "list", package])
+def mark_installed(packages: list[str]) -> None:
+    """Record packages installed behind pkg_install's back (e.g. from package files)."""
+    with _installed_lock:
+        if _installed is not None:
+            _installed.update(packages)
 
-    return False
+
+def pkg_installed(package: str) -> bool:
+    return package in installed_packages()
 
 
 def is_macos() -> bool:
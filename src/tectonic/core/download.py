@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import platform
+import tarfile
+import threading
+from pathlib import Path
+from typing import Any
+
+from tectonic import config
+from tectonic.core import fs, ui
+
+CACHE_DIR = config.DIR_CACHE / "downloads"
+LOCAL_BIN = Path.home() / ".local" / "bin"
+TIMEOUT = 30
+
+# platform.machine() spellings -> the names release targets are keyed by
+_ARCH = {"amd64": "x86_64", "arm64": "aarch64"}
+
+
+class DownloadError(Exception):
+    pass
+
+
+_offline = False
+
+
+def configure(offline: bool = False) -> None:
+    """With `offline`, fetch serves the cache without trying the network."""
+    global _offline
+    _offline = offline
+
+
+def _entry(url: str) -> tuple[Path, Path]:
+    key = hashlib.sha256(url.encode()).hexdigest()[:24]
+    return CACHE_DIR / key, CACHE_DIR / f"{key}.json"
+
+
+def _read_meta(meta_path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(meta_path.read_text())  # type: ignore[no-any-return]
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _verify(url: str, digest: str, sha256: str | None) -> None:
+    if sha256 is not None and digest != sha256.lower():
+        raise DownloadError(f"{url}: sha256 {digest} does not match pinned {sha256}")
+
+
+def fetch(url: str, sha256: str | None = None) -> Path:
+    """Path to a local copy of url, revalidated with ETag/Last-Modified.
+
+    A pinned `sha256` is checked on every download and cache hit. When the
+    server can't be reached or answers with a 5xx error, a cached copy is used.
+    """
+    import urllib.error
+    import urllib.request
+
+    body, meta_path = _entry(url)
+    meta = _read_meta(meta_path) if body.exists() else {}
+    if _offline:
+        if not meta:
+            raise DownloadError(f"{url}: not in the download cache (offline)")
+        _verify(url, meta["sha256"], sha256)
+        return body
+
+    request = urllib.request.Request(url, headers={"User-Agent": "tectonic"})
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        response = urllib.request.urlopen(request, timeout=TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and meta:
+            _verify(url, meta["sha256"], sha256)
+            ui.info(f"Cached: {url}")
+            return body
+        if e.code >= 500 and meta:
+            # The server is up but broken; as good as unreachable
+            _verify(url, meta["sha256"], sha256)
+            ui.warn(f"Using cached {url} (HTTP {e.code})")
+            return body
+        raise DownloadError(f"{url}: HTTP {e.code}") from e
+    except (urllib.error.URLError, OSError) as e:
+        if meta:
+            _verify(url, meta["sha256"], sha256)
+            ui.warn(f"Using cached {url} ({e})")
+            return body
+        raise DownloadError(f"{url}: {e}") from e
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = body.with_name(f".{body.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    digest = hashlib.sha256()
+    with response, open(tmp, "wb") as out:
+        while chunk := response.read(fs.CHUNK_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    try:
+        _verify(url, digest.hexdigest(), sha256)
+    except DownloadError:
+        tmp.unlink()
+        raise
+    tmp.replace(body)
+    meta_path.write_text(json.dumps({
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": digest.hexdigest(),
+    }))
+    ui.info(f"Downloaded: {url}")
+    return body
+
+
+def cache_files(url: str) -> list[Path]:
+    """The cache's body and metadata files for url; empty if it was never fetched."""
+    body, meta_path = _entry(url)
+    return [body, meta_path] if body.exists() and meta_path.exists() else []
+
+
+def seed(directory: Path) -> int:
+    """Add cache files copied out with cache_files; entries already cached are kept."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    added = 0
+    for path in directory.iterdir():
+        target = CACHE_DIR / path.name
+        if not target.exists():
+            fs.copy_file(path, target)
+            added += 1
+    return added
+
+
+def platform_key() -> str:
+    """e.g. "x86_64-linux", "aarch64-darwin": the keys of a release's `targets`."""
+    machine = platform.machine().lower()
+    return f"{_ARCH.get(machine, machine)}-{platform.system().lower()}"
+
+
+def release_url(spec: dict[str, Any], key: str | None = None) -> tuple[str, str | None] | None:
+    """(url, pinned sha256) of a release asset for platform `key` (default: this one)."""
+    target = spec.get("targets", {}).get(key or platform_key())
+    if target is None:
+        return None
+    url = spec["url"].format(version=spec.get("version", ""), target=target)
+    return url, (spec.get("sha256") or {}).get(target)
+
+
+def fetch_all(urls: list[tuple[str, str | None]], jobs: int = 4) -> dict[str, Path | Exception]:
+    """Fetch (url, sha256) pairs concurrently; failures are returned, not raised."""
+    from tectonic.core import parallel
+
+    pins = dict(urls)
+    outcomes = parallel.map_grouped(lambda url: fetch(url, pins[url]), pins, jobs)
+    results: dict[str, Path | Exception] = {}
+    for o in outcomes:
+        results[o.name] = o.error if o.error is not None else o.value  # type: ignore[assignment]
+    return results
+
+
+def install_release(name: str, spec: dict[str, Any] | None, bin_dir: Path = LOCAL_BIN) -> bool:
+    """Install a release binary from its (cached) archive; False if none fits this platform."""
+    resolved = release_url(spec) if spec else None
+    if spec is None or resolved is None:
+        return False
+    url, sha256 = resolved
+    archive = fetch(url, sha256)
+    binary = spec.get("binary", name)
+
+    with tarfile.open(archive) as tar:
+        member = next(
+            (m for m in tar.getmembers() if m.isfile() and Path(m.name).name == binary), None
+        )
+        if member is None:
+            raise DownloadError(f"{url}: no '{binary}' in archive")
+        source = tar.extractfile(member)
+        assert source is not None
+        bin_dir.mkdir(parents=True, exist_ok=True)
+        target = bin_dir / name
+        tmp = target.with_name(f".{name}.tmp")
+        with source, open(tmp, "wb") as out:
+            while chunk := source.read(fs.CHUNK_SIZE):
+                out.write(chunk)
+    tmp.chmod(0o755)
+    tmp.replace(target)
+    ui.ok(f"{name} {spec.get('version', '')} installed to {target}")
+    return True
@@ -1,29 +1,43 @@
+import errno
+import fcntl
+import hashlib
+import json
+import os
 import shutil
-from datetime import datetime
+import sys
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
+from tectonic import config
 from tectonic.core import ui
 
+MANIFEST_DIR = config.DIR_CACHE / "manifests"
+
+# Comparison reads this much of each file at a time, whatever the file size
+CHUNK_SIZE = 1024 * 1024
+# Python only exposes fcntl.FICLONE from 3.12; the ioctl number is stable on Linux
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409 if sys.platform == "linux" else None)
+
 
 def ensure_dir(path: Path) -> None:
     if not path.exists():
-        path.mkdir(parents=True)
+        path.mkdir(parents=True, exist_ok=True)
         ui.info(f"Created directory: {path}")
 
 
 def backup(path: Path, backup_dir: Path | None = None) -> Path | None:
+    """Store path's content in the backup store; returns the stored copy."""
     if not path.exists() or path.is_symlink():
         return None
 
-    if backup_dir is None:
-        backup_dir = Path.home() / ".dotfiles.backup"
+    from tectonic.core import backup as backups  # imports fs itself
 
-    ensure_dir(backup_dir)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    backup_path = backup_dir / f"{path.name}.{timestamp}"
-    shutil.copy2(path, backup_path)
-    ui.info(f"Backed up: {path} -> {backup_path}")
-    return backup_path
+    store = backups.store_for(backup_dir or backups.BACKUP_DIR)
+    entry = store.put(path)
+    blob = store.blob(entry)
+    ui.info(f"Backed up: {path} -> {blob}")
+    return blob
 
 
 def symlink(src: Path, dst: Path, do_backup: bool = True) -> None:
@@ -47,10 +61,70 @@ def symlink(src: Path, dst: Path, do_backup: bool = True) -> None:
 
 
 def files_equal(src: Path, dst: Path) -> bool:
-    """Compare two files by content."""
-    if src.stat().st_size != dst.stat().st_size:
+    """Compare two files by content, a block at a time, stopping at the first difference."""
+    src_stat, dst_stat = src.stat(), dst.stat()
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    with open(src, "rb", buffering=0) as a, open(dst, "rb", buffering=0) as b:
+        while True:
+            block = a.read(CHUNK_SIZE)
+            if block != b.read(CHUNK_SIZE):
+                return False
+            if not block:
+                return True
+
+
+def _clone(src_fd: int, dst_fd: int) -> bool:
+    # Reflink: the copy shares extents with the source until either is written (btrfs, XFS)
+    if FICLONE is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    # In-kernel copy, no userspace buffers; may reflink or offload on its own (NFS, XFS)
+    # st_size 0 may still have content (procfs); leave those to shutil's read loop
+    if not hasattr(os, "copy_file_range") or size == 0:
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if n == 0:
+                if copied == 0:
+                    return False  # unsupported here (procfs, some FUSE and overlay mounts)
+                raise OSError(errno.EIO, f"copy_file_range stopped at {copied} of {size} bytes")
+            copied += n
+        return True
+    except OSError as e:
+        if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+            raise
         return False
-    return src.read_bytes() == dst.read_bytes()
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    """Copy content and metadata like shutil.copy2, without streaming through Python.
+
+    Tries a reflink, then copy_file_range, then shutil (sendfile on Linux,
+    fcopyfile on macOS).
+    """
+    # Opening dst for writing would truncate src too when they are the same file
+    if dst.exists() and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{str(src)!r} and {str(dst)!r} are the same file")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        done = _clone(fsrc.fileno(), fdst.fileno()) or _copy_range(
+            fsrc.fileno(), fdst.fileno(), size
+        )
+    if not done:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
 
 
 def copy(src: Path, dst: Path, do_backup: bool = True) -> None:
@@ -66,7 +140,7 @@ def copy(src: Path, dst: Path, do_backup: bool = True) -> None:
             backup(dst)
 
     ensure_dir(dst.parent)
-    shutil.copy2(src, dst)
+    copy_file(src, dst)
     ui.ok(f"Copied: {src} -> {dst}")
 
 
@@ -79,18 +153,169 @@ def copy_dir(src: Path, dst: Path) -> None:
         ui.info(f"Directory already exists: {dst}")
         return
 
-    shutil.copytree(src, dst)
+    shutil.copytree(src, dst, copy_function=lambda s, d: copy_file(Path(s), Path(d)))
     ui.ok(f"Copied directory: {src} -> {dst}")
 
 
-def copy_tree(src: Path, dst: Path, do_backup: bool = True) -> None:
+@dataclass
+class CopyStats:
+    files_copied: int = 0
+    bytes_copied: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    backed_up: int = 0
+
+
+def _file_hash(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class _Manifest:
+    """What copy_tree last left at each destination file, persisted as JSON.
+
+    Entries map a relative path to the source's (size, mtime_ns), the
+    destination's (size, mtime_ns, inode) and, when known, the content hash.
+    """
+
+    def __init__(self, path: Path | None):
+        self._path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        if path is not None:
+            try:
+                data = json.loads(path.read_text())
+                self.entries = data if isinstance(data, dict) else {}
+            except (FileNotFoundError, ValueError):
+                pass
+
+    def save(self, entries: dict[str, dict[str, Any]]) -> None:
+        if self._path is None:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(entries, sort_keys=True))
+            tmp.replace(self._path)
+        except OSError:
+            pass  # the manifest only saves work; without it the next sync compares content
+
+
+def _manifest_path(src: Path, dst: Path) -> Path:
+    key = hashlib.sha1(f"{src.resolve()}\0{dst.resolve()}".encode()).hexdigest()[:16]
+    return MANIFEST_DIR / f"{key}.json"
+
+
+def _signatures(src: str, dst: str) -> tuple[list[int], list[int] | None]:
+    s = os.stat(src)
+    try:
+        d = os.stat(dst)
+    except FileNotFoundError:
+        return [s.st_size, s.st_mtime_ns], None
+    return [s.st_size, s.st_mtime_ns], [d.st_size, d.st_mtime_ns, d.st_ino]
+
+
+def _sync_file(
+    src: Path,
+    dst: Path,
+    src_sig: list[int],
+    dst_sig: list[int] | None,
+    entry: dict[str, Any] | None,
+    do_backup: bool,
+) -> tuple[str, dict[str, Any]]:
+    """Bring dst in line with src; returns the action taken and the new manifest entry."""
+    known_dst = entry is not None and dst_sig is not None and entry.get("dst") == dst_sig
+    if dst_sig is not None and dst_sig[0] == src_sig[0]:
+        digest = None
+        if known_dst and entry is not None and entry.get("hash"):
+            # The destination is as we left it, so its hash is known: read only the source
+            digest = _file_hash(src)
+            same = digest == entry["hash"]
+        else:
+            same = files_equal(src, dst)
+        if same:
+            return "skipped", {"src": src_sig, "dst": dst_sig, "hash": digest}
+
+    action = "copied"
+    if dst_sig is not None and do_backup:
+        backup(dst)
+        action = "backed_up"
+    copy_file(src, dst)
+    ui.ok(f"Copied: {src} -> {dst}")
+    d = dst.stat()
+    return action, {"src": src_sig, "dst": [d.st_size, d.st_mtime_ns, d.st_ino], "hash": None}
+
+
+# (relative path, source, destination, source signature, destination signature)
+_SyncJob = tuple[str, Path, Path, list[int], list[int] | None]
+
+
+def copy_tree(
+    src: Path,
+    dst: Path,
+    do_backup: bool = True,
+    jobs: int = 8,
+    manifest: Path | None = None,
+) -> CopyStats:
+    """Merge src into dst, copying only files whose content differs.
+
+    A manifest (by default under config.DIR_CACHE) lets unchanged files be
+    skipped on metadata alone; changed ones are compared and copied on `jobs` threads.
+    """
+    stats = CopyStats()
     if not src.is_dir():
         ui.error(f"Source is not a directory: {src}")
-        return
+        return stats
+
+    previous = _Manifest(manifest or _manifest_path(src, dst))
+    entries: dict[str, dict[str, Any]] = {}
+    work: list[_SyncJob] = []
+    created: set[str] = set()
+    src_root, dst_root = str(src), str(dst)
+    for root, dirs, names in os.walk(src_root):
+        dirs.sort()
+        rel_root = os.path.relpath(root, src_root)
+        dest_dir = os.path.normpath(os.path.join(dst_root, rel_root))
+        for name in sorted(names):
+            item = os.path.join(root, name)
+            if not os.path.isfile(item):
+                continue
+            if dest_dir not in created:
+                ensure_dir(Path(dest_dir))
+                created.add(dest_dir)
+            rel = os.path.normpath(os.path.join(rel_root, name))
+            dest = os.path.join(dest_dir, name)
+            src_sig, dst_sig = _signatures(item, dest)
+            entry = previous.entries.get(rel)
+            if entry is not None and entry.get("src") == src_sig and entry.get("dst") == dst_sig:
+                entries[rel] = entry
+                stats.files_skipped += 1
+                stats.bytes_skipped += src_sig[0]
+            else:
+                work.append((rel, Path(item), Path(dest), src_sig, dst_sig))
+
+    def sync(job: _SyncJob) -> tuple[str, dict[str, Any]]:
+        rel, item, dest, src_sig, dst_sig = job
+        return _sync_file(item, dest, src_sig, dst_sig, previous.entries.get(rel), do_backup)
+
+    if work:
+        from concurrent.futures import ThreadPoolExecutor  # startup cost; most commands never sync
+
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(work)))) as pool:
+            results = list(pool.map(sync, work))
+        for (rel, _, _, src_sig, _), (action, entry) in zip(work, results, strict=True):
+            entries[rel] = entry
+            if action == "skipped":
+                stats.files_skipped += 1
+                stats.bytes_skipped += src_sig[0]
+            else:
+                stats.files_copied += 1
+                stats.bytes_copied += src_sig[0]
+                stats.backed_up += action == "backed_up"
+    if entries != previous.entries:
+        previous.save(entries)
 
-    for item in src.rglob("*"):
-        if item.is_file():
-            rel_path = item.relative_to(src)
-            dest_file = dst / rel_path
-            ensure_dir(dest_file.parent)
-            copy(item, dest_file, do_backup=do_backup)
+    ui.info(
+        f"Synced {src} -> {dst}: {stats.files_copied} copied ({stats.bytes_copied} bytes), "
+        f"{stats.files_skipped} unchanged, {stats.backed_up} backed up"
+    )
+    return stats
@@ -1,14 +1,15 @@
 import socket
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from tectonic.base import ConfigService
+if TYPE_CHECKING:
+    from tectonic.base import ConfigService
 
 
 def get_hostname() -> str:
     return socket.gethostname().split(".")[0].lower()
 
 
-def load_hosts(configs: ConfigService) -> dict[str, Any]:
+def load_hosts(configs: "ConfigService") -> dict[str, Any]:
     return {
         "presets": configs.get("hosts.presets", {}),
         "hosts": configs.get("hosts.hosts", {}),
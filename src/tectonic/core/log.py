@@ -0,0 +1,75 @@
+import gzip
+import json
+import queue
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+
+def rotate(log_file: Path, keep: int) -> None:
+    """Compress the previous run's log next to it and keep only the newest `keep` runs."""
+    if log_file.exists() and log_file.stat().st_size > 0:
+        stamp = datetime.fromtimestamp(log_file.stat().st_mtime).strftime("%Y%m%d-%H%M%S-%f")
+        rotated = log_file.with_name(f"{log_file.stem}.{stamp}{log_file.suffix}.gz")
+        n = 0
+        while rotated.exists():
+            # Coarse mtimes (some filesystems keep whole seconds) can still collide
+            n += 1
+            rotated = log_file.with_name(f"{log_file.stem}.{stamp}-{n}{log_file.suffix}.gz")
+        with open(log_file, "rb") as src, gzip.open(rotated, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        log_file.unlink()
+
+    runs = sorted(log_file.parent.glob(f"{log_file.stem}.*{log_file.suffix}.gz"))
+    for old in runs[: max(len(runs) - keep, 0)]:
+        old.unlink()
+
+
+class LogWriter:
+    """Append JSON Lines records from any thread; a background thread does the I/O."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._queue: queue.SimpleQueue[dict[str, Any] | threading.Event | None] = (
+            queue.SimpleQueue()
+        )
+        self._thread = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict[str, Any]) -> None:
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """Block until everything written so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                return  # closed, or died: nothing will ever drain the queue
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _drain(self) -> None:
+        with open(self._path, "a") as f:
+            while True:
+                item = self._queue.get()
+                # Batch whatever else is queued so a burst costs one flush
+                while True:
+                    if item is None:
+                        f.flush()
+                        return
+                    if isinstance(item, threading.Event):
+                        f.flush()
+                        item.set()
+                    else:
+                        f.write(json.dumps(item, default=str) + "\n")
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
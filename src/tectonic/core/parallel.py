@@ -0,0 +1,53 @@
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from tectonic.core import profile, ui
+
+T = TypeVar("T")
+
+
+@dataclass
+class Outcome(Generic[T]):
+    name: str
+    value: T | None = None
+    error: Exception | None = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+def default_jobs() -> int:
+    # Work here is mostly waiting on the network, so go a little past the core count.
+    return min(8, (os.cpu_count() or 1) + 4)
+
+
+def _call(name: str, fn: Callable[[str], T]) -> Outcome[T]:
+    try:
+        with profile.span(name, "task"):
+            return Outcome(name, value=fn(name))
+    except Exception as e:
+        return Outcome(name, error=e)
+
+
+def _call_grouped(name: str, fn: Callable[[str], T]) -> Outcome[T]:
+    with ui.grouped(task=name):
+        return _call(name, fn)
+
+
+def map_grouped(fn: Callable[[str], T], names: Iterable[str], jobs: int) -> list[Outcome[T]]:
+    """Run fn over names on up to `jobs` threads, one output block per name.
+
+    Exceptions are captured per name, never cancelling the rest. Outcomes come
+    back in input order regardless of completion order.
+    """
+    names = list(names)
+    if jobs <= 1 or len(names) <= 1:
+        return [_call(name, fn) for name in names]
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(names))) as pool:
+        futures = [pool.submit(_call_grouped, name, fn) for name in names]
+        return [f.result() for f in futures]
@@ -1,25 +1,109 @@
+import os
+import queue
 import shutil
 import subprocess
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
-
-from tectonic.core import ui
+from typing import IO
+
+from tectonic.core import profile, ui
+
+# Captured output is kept up to this size per stream; the middle of anything longer
+# is dropped from the returned result (the log still gets every line).
+CAPTURE_LIMIT = 4 * 1024 * 1024
+# Uncaptured stderr still keeps a short tail, so failures can say what went wrong.
+ERROR_TAIL = 8 * 1024
+LIVE_LINES = 6
+
+
+class _Capture:
+    """Bounded text buffer keeping the first `head` and last `tail` characters."""
+
+    def __init__(self, head: int, tail: int):
+        self._head_limit = head
+        self._tail_limit = tail
+        self._head: list[str] = []
+        self._head_size = 0
+        self._tail: deque[str] = deque()
+        self._tail_size = 0
+        self._dropped = 0
+        self.size = 0  # bytes seen, kept or not
+
+    def add(self, text: str) -> None:
+        self.size += len(text.encode())
+        if self._head_size < self._head_limit:
+            self._head.append(text)
+            self._head_size += len(text)
+            return
+        self._tail.append(text)
+        self._tail_size += len(text)
+        while self._tail_size > self._tail_limit and self._tail:
+            dropped = self._tail.popleft()
+            self._tail_size -= len(dropped)
+            self._dropped += len(dropped)
+
+    def getvalue(self) -> str:
+        marker = f"... [{self._dropped} characters truncated] ...\n" if self._dropped else ""
+        return "".join(self._head) + marker + "".join(self._tail)
+
+
+def _pump(stream: IO[str], capture: _Capture, lines: "queue.SimpleQueue[str | None]") -> None:
+    for line in stream:
+        capture.add(line)
+        lines.put(line.rstrip("\n"))
+    stream.close()
+    lines.put(None)
 
 
 def _exec(
     cmd: list[str],
     check: bool = True,
     cwd: Path | None = None,
+    capture: bool = False,
+    live: bool = True,
 ) -> subprocess.CompletedProcess[str]:
-    if ui.is_verbose():
-        return subprocess.run(cmd, check=check, text=True, cwd=cwd)
-
-    result = subprocess.run(
-        cmd, check=check, capture_output=True, text=True, cwd=cwd,
-    )
-    ui.log_cmd_output(result.stdout)
-    if result.stderr:
-        ui.log_cmd_output(result.stderr)
-    return result
+    """Run cmd, streaming its output line by line to the log (and console when verbose).
+
+    Reader threads only fill buffers; logging happens on the calling thread so
+    lines land in its grouped output block. Returns a CompletedProcess like
+    subprocess.run, with stdout None unless captured.
+    """
+    half = CAPTURE_LIMIT // 2
+    out = _Capture(half, half) if capture else _Capture(0, 0)
+    err = _Capture(half, half) if capture else _Capture(0, ERROR_TAIL)
+    lines: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+
+    started = time.perf_counter()
+    with ui.live_tail(LIVE_LINES if live else 0) as show:
+        proc = subprocess.Popen(
+            cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, errors="replace", bufsize=1,
+        )
+        assert proc.stdout is not None and proc.stderr is not None
+        for stream, buf in ((proc.stdout, out), (proc.stderr, err)):
+            threading.Thread(target=_pump, args=(stream, buf, lines), daemon=True).start()
+        open_streams = 2
+        while open_streams:
+            line = lines.get()
+            if line is None:
+                open_streams -= 1
+                continue
+            ui.log_cmd_output(line)
+            show(line)
+        # wait4 rather than proc.wait(): it also reports this child's own CPU and peak RSS
+        _, status, usage = os.wait4(proc.pid, 0)
+        returncode = proc.returncode = os.waitstatus_to_exitcode(status)
+    profile.record_command(cmd, started, usage, returncode, out.size + err.size)
+
+    stdout = out.getvalue() if capture else None
+    stderr = err.getvalue()
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, returncode, stdout=stdout, stderr=stderr)
 
 
 def run(
@@ -29,29 +113,14 @@ def run(
     cwd: Path | None = None,
 ) -> subprocess.CompletedProcess[str]:
     ui.info(f"Running: {' '.join(cmd)}")
-
-    if capture:
-        result = subprocess.run(
-            cmd, check=check, capture_output=True, text=True, cwd=cwd,
-        )
-        ui.log_cmd_output(result.stdout)
-        if result.stderr:
-            ui.log_cmd_output(result.stderr)
-        return result
-
-    return _exec(cmd, check=check, cwd=cwd)
+    return _exec(cmd, check=check, cwd=cwd, capture=capture)
 
 
 def run_quiet(cmd: list[str], cwd: Path | None = None) -> bool:
     try:
-        result = subprocess.run(
-            cmd, check=True, capture_output=True, text=True, cwd=cwd,
-        )
-        ui.log_cmd_output(result.stdout)
+        _exec(cmd, check=True, cwd=cwd, live=False)
         return True
-    except subprocess.CalledProcessError as e:
-        ui.log_cmd_output(e.stdout or "")
-        ui.log_cmd_output(e.stderr or "")
+    except subprocess.CalledProcessError:
         return False
 
 
@@ -67,3 +136,21 @@ def is_installed(cmd: str) -> bool:
 def run_shell(script: str, check: bool = True) -> subprocess.CompletedProcess[str]:
     ui.info("Running shell script")
     return _exec(["bash", "-c", script], check=check)
+
+
+@contextmanager
+def sudo_keepalive(interval: float = 60) -> Iterator[None]:
+    """Keep the sudo timestamp fresh so parallel steps never stop at a password prompt."""
+    stop = threading.Event()
+
+    def refresh() -> None:
+        while not stop.wait(interval):
+            subprocess.run(["sudo", "-n", "-v"], capture_output=True, check=False)
+
+    thread = threading.Thread(target=refresh, name="sudo-keepalive", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
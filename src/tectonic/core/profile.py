@@ -0,0 +1,132 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# ru_maxrss is kilobytes on Linux and bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+@dataclass
+class Span:
+    name: str
+    cat: str
+    start: float
+    thread: str
+    dur: float = 0.0
+    cpu: float = 0.0
+    max_rss: int = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+def usage_of(ru: resource.struct_rusage) -> tuple[float, int]:
+    """(user + system seconds, peak RSS in bytes) of a rusage record."""
+    return ru.ru_utime + ru.ru_stime, ru.ru_maxrss * _MAXRSS_UNIT
+
+
+class Profiler:
+    """Collects timed spans from any thread; times are relative to its creation."""
+
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+
+    def begin(self, name: str, cat: str, **args: Any) -> Span:
+        return Span(name, cat, time.perf_counter() - self._origin, threading.current_thread().name,
+                    args=args)
+
+    def end(self, span: Span) -> None:
+        span.dur = time.perf_counter() - self._origin - span.start
+        with self._lock:
+            self.spans.append(span)
+
+    def slowest(self, limit: int) -> list[Span]:
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s.dur, reverse=True)[:limit]
+
+    def write_trace(self, path: Path) -> None:
+        """Write Chrome trace-event JSON (opens in Perfetto or chrome://tracing)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        tids = {name: i for i, name in enumerate(dict.fromkeys(s.thread for s in spans))}
+        events: list[dict[str, Any]] = [
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+            for name, tid in tids.items()
+        ]
+        for s in sorted(spans, key=lambda s: s.start):
+            events.append({
+                "ph": "X",
+                "name": s.name,
+                "cat": s.cat,
+                "pid": pid,
+                "tid": tids[s.thread],
+                "ts": round(s.start * 1e6),
+                "dur": round(s.dur * 1e6),
+                "args": {"cpu_s": round(s.cpu, 4), "max_rss": s.max_rss, **s.args},
+            })
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+_active: Profiler | None = None
+
+
+def start() -> Profiler:
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def stop() -> Profiler | None:
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active() -> Profiler | None:
+    return _active
+
+
+@contextmanager
+def span(name: str, cat: str = "step") -> Iterator[Span | None]:
+    """Time the enclosed block when profiling; yields None otherwise.
+
+    CPU time and peak RSS are those of child processes reaped during the block.
+    They are process-wide, so spans overlapping on other threads share them.
+    """
+    profiler = _active
+    if profiler is None:
+        yield None
+        return
+    before = usage_of(resource.getrusage(resource.RUSAGE_CHILDREN))
+    s = profiler.begin(name, cat)
+    try:
+        yield s
+    finally:
+        cpu, max_rss = usage_of(resource.getrusage(resource.RUSAGE_CHILDREN))
+        s.cpu = cpu - before[0]
+        s.max_rss = max_rss
+        profiler.end(s)
+
+
+def record_command(
+    cmd: list[str], start: float, ru: resource.struct_rusage, returncode: int, output_bytes: int
+) -> None:
+    """Add a finished subprocess, timed from `start` (a time.perf_counter() value)."""
+    profiler = _active
+    if profiler is None:
+        return
+    s = profiler.begin(" ".join(cmd)[:120], "command", exit_code=returncode,
+                       output_bytes=output_bytes)
+    s.start -= time.perf_counter() - start
+    s.cpu, s.max_rss = usage_of(ru)
+    profiler.end(s)
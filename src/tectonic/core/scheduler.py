@@ -0,0 +1,113 @@
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from tectonic.core import profile, ui
+from tectonic.core.parallel import Outcome
+
+# Tasks holding this resource may prompt on the terminal, so they run alone and unbuffered.
+TTY = "tty"
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    run: Callable[[], None]
+    after: tuple[str, ...] = ()
+    locks: frozenset[str] = field(default_factory=frozenset)
+
+
+class DependencyError(Exception):
+    pass
+
+
+def order(tasks: list[Task]) -> list[str]:
+    """Topological order, stable with respect to input order. Unknown deps are ignored."""
+    names = [t.name for t in tasks]
+    deps = {t.name: {d for d in t.after if d in names} for t in tasks}
+    done: list[str] = []
+    remaining = list(names)
+    while remaining:
+        ready = next((n for n in remaining if deps[n] <= set(done)), None)
+        if ready is None:
+            raise ValueError(f"Dependency cycle: {' -> '.join(_find_cycle(remaining, deps))}")
+        done.append(ready)
+        remaining.remove(ready)
+    return done
+
+
+def _find_cycle(remaining: list[str], deps: dict[str, set[str]]) -> list[str]:
+    # Every remaining node has an unfinished dep, so walking deps must revisit a node.
+    path = [remaining[0]]
+    while True:
+        nxt = sorted(d for d in deps[path[-1]] if d in remaining)[0]
+        if nxt in path:
+            return [*path[path.index(nxt):], nxt]
+        path.append(nxt)
+
+
+def _execute(task: Task) -> Outcome[None]:
+    try:
+        if TTY in task.locks:
+            with profile.span(task.name, "module"):
+                task.run()
+        else:
+            with ui.grouped(task=task.name), profile.span(task.name, "module"):
+                task.run()
+        return Outcome(task.name)
+    except Exception as e:
+        return Outcome(task.name, error=e)
+
+
+def run(tasks: list[Task], jobs: int) -> list[Outcome[None]]:
+    """Run tasks after their dependencies, concurrently where they share no locks.
+
+    A failed task fails its dependents without running them; unrelated tasks
+    carry on. Outcomes are returned in topological order.
+    """
+    sequence = order(tasks)
+    by_name = {t.name: t for t in tasks}
+    deps = {t.name: [d for d in t.after if d in by_name] for t in tasks}
+    outcomes: dict[str, Outcome[None]] = {}
+
+    def blocked_by_failure(name: str) -> bool:
+        failed = [d for d in deps[name] if outcomes[d].failed]
+        if failed:
+            outcomes[name] = Outcome(name, error=DependencyError(f"{', '.join(failed)} failed"))
+        return bool(failed)
+
+    if jobs <= 1:
+        for name in sequence:
+            if not blocked_by_failure(name):
+                outcomes[name] = _execute(by_name[name])
+        return [outcomes[n] for n in sequence]
+
+    pending = list(sequence)
+    held: set[str] = set()
+    running: dict[Future[Outcome[None]], str] = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= jobs or TTY in held:
+                    break
+                task = by_name[name]
+                if any(d not in outcomes for d in deps[name]):
+                    continue
+                if blocked_by_failure(name):
+                    pending.remove(name)
+                    continue
+                if task.locks & held or (TTY in task.locks and running):
+                    continue
+                pending.remove(name)
+                held |= task.locks
+                running[pool.submit(_execute, task)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                outcomes[name] = future.result()
+                held -= by_name[name].locks
+
+    return [outcomes[n] for n in sequence]
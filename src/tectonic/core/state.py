@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+
+def version() -> str:
+    from importlib import metadata  # slow to import, and only needed when fingerprinting
+
+    try:
+        return metadata.version("tectonic")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def tree_fingerprint(root: Path) -> str:
+    """Fingerprint a directory tree by path, size and mtime, without reading contents."""
+    entries = []
+    for path in sorted(root.rglob("*")):
+        if path.is_file():
+            st = path.stat()
+            entries.append((str(path.relative_to(root)), st.st_size, st.st_mtime_ns))
+    return fingerprint(entries)
+
+
+class StateStore:
+    """Fingerprints of steps that last converged successfully, persisted as JSON."""
+
+    def __init__(self, path: Path, force: bool = False):
+        self._path = path
+        self._force = force
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = self._load()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(self._path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._entries, indent=2, sort_keys=True))
+        tmp.replace(self._path)
+
+    def is_current(self, step: str, fp: str, max_age: float | None = None) -> bool:
+        if self._force:
+            return False
+        with self._lock:
+            entry = self._entries.get(step)
+        if entry is None or entry.get("fingerprint") != fp:
+            return False
+        if max_age is not None and time.time() - entry.get("time", 0) > max_age:
+            return False
+        return True
+
+    def record(self, step: str, fp: str, duration: float | None = None) -> None:
+        """Mark `step` converged; `duration` (seconds of a full run) is kept until replaced."""
+        with self._lock:
+            entry: dict[str, Any] = {"fingerprint": fp, "time": time.time()}
+            previous = self._entries.get(step, {}).get("duration")
+            if duration is not None or previous is not None:
+                entry["duration"] = duration if duration is not None else previous
+            self._entries[step] = entry
+            self._save()
+
+    def duration(self, step: str) -> float | None:
+        with self._lock:
+            return self._entries.get(step, {}).get("duration")
+
+    def forget(self, step: str) -> None:
+        with self._lock:
+            if self._entries.pop(step, None) is not None:
+                self._save()
+
+
+_active: StateStore | None = None
+
+
+def activate(store: StateStore | None) -> None:
+    """Make steps consult `store`; None means every step runs unconditionally."""
+    global _active
+    _active = store
+
+
+def active() -> StateStore | None:
+    return _active
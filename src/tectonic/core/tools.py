@@ -1,13 +1,46 @@
+import hashlib
+import re
+import shutil
+import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from tectonic import config
 from tectonic.core import fs, process, ui
 
 DIR_BIN = Path.home() / ".local" / "bin"
+MIRROR_DIR = config.DIR_CACHE / "git"
 
 
 def _wrapper_content(name: str, path: Path) -> str:
-    return f'#!/bin/sh\nexec uv run --project {path} {name} "$@"\n'
+    # Exec the synced venv's entry point directly; `uv run` (project discovery, lock
+    # check, sync) only when TECTONIC_UV_RUN is set, the venv is missing, or the lock
+    # stamp is: ensure_env removes it when a sync fails, so a stale venv isn't used.
+    return (
+        "#!/bin/sh\n"
+        f'if [ -z "$TECTONIC_UV_RUN" ] && [ -f "{_stamp_path(name)}" ] '
+        f'&& [ -x "{path}/.venv/bin/{name}" ]; then\n'
+        f'    exec "{path}/.venv/bin/{name}" "$@"\n'
+        "fi\n"
+        f'exec uv run --project "{path}" {name} "$@"\n'
+    )
+
+
+def _stamp_path(name: str) -> Path:
+    return DIR_BIN / f".{name}.lock"
+
+
+def lock_hash(path: Path) -> str:
+    """Hash of what `uv sync` installs from: uv.lock and pyproject.toml."""
+    digest = hashlib.sha256()
+    for file in ("uv.lock", "pyproject.toml"):
+        target = path / file
+        digest.update(file.encode() + b"\0")
+        if target.exists():
+            digest.update(target.read_bytes())
+    return digest.hexdigest()
 
 
 def _pull_skip_reason(stderr: str) -> str:
@@ -21,21 +54,243 @@ def _pull_skip_reason(stderr: str) -> str:
     return "pull failed"
 
 
-def ensure_source(name: str, repo: str, path: Path) -> None:
+@dataclass
+class ToolStatus:
+    name: str
+    source: str  # missing / dirty / clean
+    wrapper: str  # missing / stale / no-uv / ok
+    branch: str | None = None
+    head: str | None = None  # commit checked out
+    upstream: str | None = None
+    ahead: int | None = None
+    behind: int | None = None
+    last_fetch: float | None = None  # FETCH_HEAD mtime
+    untracked: int | None = None  # only counted when asked for
+
+
+def _parse_status(output: str, status: ToolStatus) -> None:
+    """Fill status from `git status --porcelain=v2 --branch` output."""
+    changed = untracked = 0
+    for line in output.splitlines():
+        if line.startswith("# branch.head "):
+            head = line.removeprefix("# branch.head ")
+            status.branch = None if head == "(detached)" else head
+        elif line.startswith("# branch.oid "):
+            oid = line.removeprefix("# branch.oid ")
+            status.head = None if oid == "(initial)" else oid
+        elif line.startswith("# branch.upstream "):
+            status.upstream = line.removeprefix("# branch.upstream ")
+        elif line.startswith("# branch.ab "):
+            ahead, behind = line.removeprefix("# branch.ab ").split()
+            status.ahead, status.behind = int(ahead), -int(behind)
+        elif line.startswith("? "):
+            untracked += 1
+        elif line and not line.startswith("#"):
+            changed += 1
+    status.source = "dirty" if changed or untracked else "clean"
+    if status.untracked is not None:
+        status.untracked = untracked
+
+
+@dataclass(frozen=True)
+class CloneOptions:
+    depth: int | None = None
+    filter: str | None = None  # e.g. "blob:none": fetch file contents on demand
+    sparse: tuple[str, ...] = ()  # directories to check out (cone mode); empty = everything
+    mirror: bool = False  # borrow objects from a local bare mirror under MIRROR_DIR
+
+    @classmethod
+    def from_defn(cls, defn: dict[str, Any]) -> "CloneOptions":
+        return cls(
+            depth=defn.get("depth"),
+            filter=defn.get("filter"),
+            sparse=tuple(defn.get("sparse", ())),
+            mirror=defn.get("mirror", False),
+        )
+
+
+def mirror_path(repo: str) -> Path:
+    return MIRROR_DIR / (re.sub(r"[^A-Za-z0-9._-]+", "_", repo).removesuffix(".git") + ".git")
+
+
+def _refresh_mirror(repo: str) -> Path:
+    """Create or update the bare mirror of repo. Failures are fine: it is only a cache."""
+    mirror = mirror_path(repo)
+    if mirror.exists():
+        process.run_quiet(["git", "--git-dir", str(mirror), "fetch", "--prune", "--quiet"])
+    else:
+        fs.ensure_dir(mirror.parent)
+        if not process.run_quiet(["git", "clone", "--mirror", "--quiet", repo, str(mirror)]):
+            shutil.rmtree(mirror, ignore_errors=True)
+    return mirror
+
+
+def clone_command(repo: str, path: Path, options: CloneOptions) -> list[str]:
+    cmd = ["git", "clone"]
+    if options.depth:
+        cmd += ["--depth", str(options.depth)]
+    if options.filter:
+        cmd += [f"--filter={options.filter}"]
+    if options.sparse:
+        cmd += ["--sparse"]
+    if options.mirror:
+        # Objects come from the mirror when it exists; --dissociate copies them so the
+        # checkout never depends on the cache afterwards.
+        cmd += ["--reference-if-able", str(mirror_path(repo)), "--dissociate"]
+    return [*cmd, repo, str(path)]
+
+
+# Touched when an ls-remote probe finds upstream unchanged; FETCH_HEAD stays the last fetch
+PROBE_STAMP = "tectonic-probed"
+
+
+def _local_status(path: Path) -> ToolStatus | None:
+    """The checkout's branch, HEAD and ahead/behind counts, without touching the network."""
+    status = ToolStatus(path.name, "missing", "missing")
+    result = process.run(
+        ["git", "status", "--porcelain=v2", "--branch", "--untracked-files=no"],
+        cwd=path, check=False, capture=True,
+    )
+    if result.returncode != 0:
+        return None
+    _parse_status(result.stdout, status)
+    return status
+
+
+def _checked_within(path: Path, ttl: float) -> bool:
+    """True when upstream was fetched or probed less than `ttl` seconds ago."""
+    if ttl <= 0:
+        return False
+    stamps = [path / ".git" / "FETCH_HEAD", path / ".git" / PROBE_STAMP]
+    checked = max((p.stat().st_mtime for p in stamps if p.exists()), default=None)
+    return checked is not None and time.time() - checked < ttl
+
+
+def _at_upstream(status: ToolStatus) -> bool:
+    """HEAD is the upstream commit as of the last fetch: nothing to merge, nothing diverged."""
+    return status.upstream is not None and (status.ahead, status.behind) == (0, 0)
+
+
+def _upstream_unchanged(path: Path, status: ToolStatus) -> bool:
+    """True when the upstream branch's remote head is the commit checked out here."""
+    if status.upstream is None or status.head is None:
+        return False
+    remote, _, branch = status.upstream.partition("/")
+    probe = process.run(
+        ["git", "ls-remote", "--heads", remote, f"refs/heads/{branch}"],
+        cwd=path, check=False, capture=True,
+    )
+    remote_head = probe.stdout.split("\t", 1)[0].strip()
+    if probe.returncode != 0 or remote_head != status.head:
+        return False
+    (path / ".git" / PROBE_STAMP).touch()  # checked just now, which is what the TTL measures
+    return True
+
+
+def _bundle_ref(path: Path, source_bundle: Path) -> str | None:
+    """The ref in source_bundle carrying the checked-out branch's upstream, if any."""
+    status = _local_status(path)
+    if status is None or status.upstream is None:
+        return None
+    remote, _, branch = status.upstream.partition("/")
+    heads = process.run(
+        ["git", "bundle", "list-heads", str(source_bundle)], cwd=path, check=False, capture=True,
+    )
+    refs = {line.split()[-1] for line in heads.stdout.splitlines() if line.strip()}
+    # Made from a checkout, the bundle has its fetched upstream; from a bare clone, only heads
+    for ref in (f"refs/remotes/{remote}/{branch}", f"refs/heads/{branch}"):
+        if ref in refs:
+            return ref
+    return None
+
+
+def ensure_source(
+    name: str,
+    repo: str,
+    path: Path,
+    options: CloneOptions | None = None,
+    fetch_ttl: float = 0,
+    refresh: bool = False,
+    source_bundle: Path | None = None,
+) -> str | None:
+    """Clone or fast-forward the source; return the reason a pull was skipped, if any.
+
+    Unless `refresh`, no pull happens when HEAD is at its upstream and upstream
+    was fetched or probed less than `fetch_ttl` seconds ago, or when the remote
+    branch head matches HEAD. A diverged or behind checkout is always pulled, so
+    its skip reason is reported on every run. With a
+    `source_bundle` (a `git bundle` file), it is cloned or pulled instead of
+    `repo`, without touching the network.
+    """
+    options = options or CloneOptions()
     if not path.exists():
         ui.step(f"Cloning {name}")
         fs.ensure_dir(path.parent)
-        process.run(["git", "clone", repo, str(path)])
+        if source_bundle is not None:
+            process.run(["git", "clone", "--quiet", str(source_bundle), str(path)])
+            process.run(["git", "remote", "set-url", "origin", repo], cwd=path)
+        else:
+            if options.mirror:
+                _refresh_mirror(repo)
+            process.run(clone_command(repo, path, options))
+        if options.sparse:
+            process.run(["git", "sparse-checkout", "set", *options.sparse], cwd=path)
         ui.ok(f"{name}: cloned")
-        return
+        return None
+
+    if source_bundle is None and not refresh:
+        local = _local_status(path)
+        if local is not None and _at_upstream(local) and _checked_within(path, fetch_ttl):
+            ui.ok(f"{name}: fetched recently, not pulling")
+            return None
+        if local is not None and _upstream_unchanged(path, local):
+            ui.ok(f"{name}: up to date")
+            return None
 
+    source = []
+    if source_bundle is not None:
+        # The bundle's HEAD is its default branch, not necessarily the one checked out here
+        ref = _bundle_ref(path, source_bundle)
+        if ref is None:
+            reason = "branch not in bundle"
+            ui.warn(f"{name}: skipping pull ({reason})")
+            return reason
+        source = [str(source_bundle), ref]
     result = process.run(
-        ["git", "pull", "--ff-only"], cwd=path, check=False, capture=True,
+        ["git", "pull", "--ff-only", *source], cwd=path, check=False, capture=True,
     )
     if result.returncode == 0:
         ui.ok(f"{name}: pulled")
-    else:
-        ui.warn(f"{name}: skipping pull ({_pull_skip_reason(result.stderr)})")
+        return None
+    reason = _pull_skip_reason(result.stderr)
+    ui.warn(f"{name}: skipping pull ({reason})")
+    return reason
+
+
+def ensure_env(name: str, path: Path) -> None:
+    """`uv sync` the tool's venv once per lock change, recording the lock hash it matches."""
+    stamp = _stamp_path(name)
+    current = lock_hash(path)
+    venv_bin = path / ".venv" / "bin" / name
+    if venv_bin.exists() and stamp.exists() and stamp.read_text() == current:
+        ui.info(f"{name}: environment up to date")
+        return
+    if not process.is_installed("uv"):
+        # `uv run` needs uv too: the wrapper keeps the venv it has, if any
+        ui.warn(f"{name}: uv not found, environment not synced")
+        return
+    result = process.run(
+        # --inexact: keep dev dependencies a developer synced into the same checkout
+        ["uv", "sync", "--frozen", "--compile-bytecode", "--no-dev", "--inexact"],
+        cwd=path, check=False, capture=True,
+    )
+    if result.returncode != 0:
+        stamp.unlink(missing_ok=True)
+        ui.warn(f"{name}: uv sync failed, wrapper falls back to uv run")
+        return
+    fs.ensure_dir(stamp.parent)
+    stamp.write_text(current)
+    ui.ok(f"{name}: environment synced")
 
 
 def ensure_wrapper(name: str, path: Path) -> None:
@@ -50,28 +305,66 @@ def ensure_wrapper(name: str, path: Path) -> None:
     ui.ok(f"{name}: wrapper installed")
 
 
-def install_tool(name: str, defn: dict[str, Any], root: Path) -> None:
+def configure_repo(path: Path, maintenance: bool = False) -> None:
+    """Make status queries cheap in a managed checkout; optionally keep history indexed."""
+    settings = {"core.untrackedCache": "true"}
+    if sys.platform == "darwin":
+        settings["core.fsmonitor"] = "true"  # the built-in daemon only ships for macOS/Windows
+    if maintenance:
+        settings["fetch.writeCommitGraph"] = "true"
+    for key, value in settings.items():
+        process.run_quiet(["git", "config", key, value], cwd=path)
+    if maintenance:
+        process.run_quiet(["git", "maintenance", "register"], cwd=path)
+
+
+def install_tool(
+    name: str,
+    defn: dict[str, Any],
+    root: Path,
+    fetch_ttl: float = 0,
+    refresh: bool = False,
+    source_bundle: Path | None = None,
+) -> str | None:
     path = root / defn["path"]
-    ensure_source(name, defn["repo"], path)
+    skipped = ensure_source(
+        name, defn["repo"], path, CloneOptions.from_defn(defn),
+        fetch_ttl=fetch_ttl, refresh=refresh, source_bundle=source_bundle,
+    )
+    configure_repo(path, maintenance=defn.get("maintenance", False))
+    ensure_env(name, path)
     ensure_wrapper(name, path)
+    return skipped
 
 
-def tool_status(name: str, defn: dict[str, Any], root: Path) -> tuple[str, str]:
+def tool_status(
+    name: str, defn: dict[str, Any], root: Path, untracked: bool = False
+) -> ToolStatus:
     path = root / defn["path"]
-    if not path.exists():
-        source = "missing"
-    else:
-        result = process.run(
-            ["git", "status", "--porcelain"], cwd=path, check=False, capture=True,
-        )
-        source = "dirty" if result.stdout.strip() else "clean"
 
     bin_path = DIR_BIN / name
+    stamp = _stamp_path(name)
     if not bin_path.exists():
         wrapper = "missing"
-    elif bin_path.read_text() == _wrapper_content(name, path):
-        wrapper = "ok"
-    else:
+    elif bin_path.read_text() != _wrapper_content(name, path):
         wrapper = "stale"
+    elif not stamp.exists() or stamp.read_text() != lock_hash(path):
+        # The venv it execs predates the current lock; without uv, syncing can't fix that
+        wrapper = "stale" if process.is_installed("uv") else "no-uv"
+    else:
+        wrapper = "ok"
 
-    return source, wrapper
+    status = ToolStatus(name, "missing", wrapper, untracked=0 if untracked else None)
+    if not path.exists():
+        return status
+
+    result = process.run(
+        ["git", "status", "--porcelain=v2", "--branch",
+         f"--untracked-files={'normal' if untracked else 'no'}"],
+        cwd=path, check=False, capture=True,
+    )
+    _parse_status(result.stdout, status)
+    fetch_head = path / ".git" / "FETCH_HEAD"
+    if fetch_head.exists():
+        status.last_fetch = fetch_head.stat().st_mtime
+    return status
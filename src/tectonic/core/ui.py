@@ -1,79 +1,183 @@
+import atexit
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from rich.console import Console
-from rich.panel import Panel
+from tectonic.core import log
 
-console = Console()
+if TYPE_CHECKING:
+    from rich.console import Console
+
+console: "Console"
 
 # Global state
-_log_file: Path | None = None
+_writer: log.LogWriter | None = None
 _verbose: bool = False
+_step: str | None = None
+_local = threading.local()
+_print_lock = threading.Lock()
 
 
-def init(log_file: Path, verbose: bool = False) -> None:
+def init(log_file: Path, verbose: bool = False, keep_runs: int = 10) -> None:
     """Initialize UI with log file and verbosity setting."""
-    global _log_file, _verbose
-    _log_file = log_file
+    global _writer, _verbose
     _verbose = verbose
 
+    if _writer is not None:
+        _writer.close()
+
     # Ensure log directory exists
     log_file.parent.mkdir(parents=True, exist_ok=True)
 
-    # Clear log file
-    log_file.write_text("")
+    # Previous runs are compressed alongside, not truncated
+    log.rotate(log_file, keep=keep_runs)
+    _writer = log.LogWriter(log_file)
+
+
+@atexit.register
+def flush() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
+def __getattr__(name: str) -> Any:
+    # rich is only imported once something is printed
+    if name == "console":
+        from rich.console import Console
+
+        globals()["console"] = Console()
+        return globals()["console"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _console() -> "Console":
+    return globals().get("console") or __getattr__("console")  # type: ignore[no-any-return]
 
 
 def is_verbose() -> bool:
     return _verbose
 
 
-def _log(msg: str) -> None:
-    """Write message to log file."""
-    if _log_file is None:
+def task_id() -> str | None:
+    return getattr(_local, "task", None)
+
+
+def is_grouped() -> bool:
+    return getattr(_local, "buffer", None) is not None
+
+
+def _print(*objects: Any) -> None:
+    buffer = getattr(_local, "buffer", None)
+    if buffer is not None:
+        buffer.append(objects)
         return
+    with _print_lock:
+        _console().print(*objects)
+
+
+@contextmanager
+def grouped(task: str | None = None) -> Iterator[None]:
+    """Hold this thread's console output and print it as one block on exit.
+
+    `task` tags this thread's log records until the block ends.
+    """
+    buffer: list[tuple[Any, ...]] = []
+    _local.buffer = buffer
+    _local.task = task
+    try:
+        yield
+    finally:
+        _local.buffer = None
+        _local.task = None
+        _local.step = None
+        with _print_lock:
+            for objects in buffer:
+                _console().print(*objects)
+
+
+@contextmanager
+def live_tail(lines: int) -> Iterator[Callable[[str], None]]:
+    """Show the last `lines` pushed lines in a transient console view.
+
+    A no-op when verbose (every line is printed anyway), inside a grouped
+    block, or when the console is not a terminal.
+    """
+    if lines <= 0 or _verbose or is_grouped() or not _console().is_terminal:
+        yield lambda line: None
+        return
+
+    from rich.live import Live
+    from rich.text import Text
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with _log_file.open("a") as f:
-        f.write(f"[{timestamp}] {msg}\n")
+    recent: deque[str] = deque(maxlen=lines)
+    with Live(Text(""), console=_console(), transient=True, refresh_per_second=8) as view:
+        def push(line: str) -> None:
+            recent.append(line)
+            view.update(Text("\n".join(recent), style="dim", no_wrap=True, overflow="ellipsis"))
+
+        yield push
+
+
+def _log(level: str, msg: str) -> None:
+    """Queue a structured record for the log file."""
+    if _writer is None:
+        return
+    _writer.write({
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "level": level,
+        "step": getattr(_local, "step", None) or _step,
+        "task": task_id(),
+        "msg": msg,
+    })
 
 
 def info(msg: str) -> None:
-    _log(f"[INFO] {msg}")
+    _log("INFO", msg)
     if _verbose:
-        console.print(f"[blue][INFO][/blue]  {msg}")
+        _print(f"[blue][INFO][/blue]  {msg}")
 
 
 def ok(msg: str) -> None:
-    _log(f"[OK] {msg}")
-    console.print(f"[green][OK][/green]    {msg}")
+    _log("OK", msg)
+    _print(f"[green][OK][/green]    {msg}")
 
 
 def warn(msg: str) -> None:
-    _log(f"[WARN] {msg}")
-    console.print(f"[yellow][WARN][/yellow]  {msg}")
+    _log("WARN", msg)
+    _print(f"[yellow][WARN][/yellow]  {msg}")
 
 
 def error(msg: str) -> None:
-    _log(f"[ERROR] {msg}")
-    console.print(f"[red][ERROR][/red] {msg}")
+    _log("ERROR", msg)
+    _print(f"[red][ERROR][/red] {msg}")
 
 
 def step(msg: str) -> None:
-    _log(f"[STEP] {msg}")
-    console.print(f"[cyan]>>>[/cyan] {msg}")
+    _log("STEP", msg)
+    _print(f"[cyan]>>>[/cyan] {msg}")
 
 
 def section(title: str) -> None:
-    _log(f"===== {title} =====")
-    console.print()
-    console.print(Panel(title, style="cyan", expand=False))
-    console.print()
+    global _step
+    if task_id() is not None:
+        _local.step = title
+    else:
+        _step = title
+    _log("SECTION", title)
+    _print()
+    from rich.panel import Panel
+
+    _print(Panel(title, style="cyan", expand=False))
+    _print()
 
 
 def log_cmd_output(output: str) -> None:
     """Log command output to file, optionally display if verbose."""
     if output:
-        _log(output)
+        _log("OUTPUT", output)
         if _verbose:
-            console.print(output)
+            _print(output)
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from tectonic import config
+
+HISTORY_FILE = config.DIR_CACHE / "zsh-bench.jsonl"
+# Read by dot_zshrc: a file to append "<path>\t<ms>" to for every snippet it sources
+PROFILE_ENV = "TECTONIC_ZSH_PROFILE"
+# Read by dot_zshrc: load zsh/zprof and print its report on exit
+ZPROF_ENV = "TECTONIC_ZSH_ZPROF"
+# Read by plugins.zsh: source the deferred plugins at once; `-c exit` has no zle to wait for
+EAGER_ENV = "TECTONIC_ZSH_EAGER"
+PERCENTILES = (50, 90, 99)
+
+# What a login would carry over; everything else in our environment stays out
+_PASSED = ("HOME", "USER", "LOGNAME", "PATH", "LANG", "TERM", "TMPDIR")
+
+
+@dataclass
+class BenchResult:
+    totals: list[float] = field(default_factory=list)  # ms per launch
+    files: dict[str, list[float]] = field(default_factory=dict)  # ms per sourced file, per launch
+
+    def summary(self) -> dict[str, float]:
+        stats = {f"p{p}": percentile(self.totals, p) for p in PERCENTILES}
+        return {"min": min(self.totals), **stats, "max": max(self.totals)}
+
+    def file_medians(self) -> dict[str, float]:
+        return {name: statistics.median(times) for name, times in self.files.items()}
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile: the smallest value at least p% of values don't exceed."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def clean_env(**extra: str) -> dict[str, str]:
+    env = {k: os.environ[k] for k in _PASSED if k in os.environ}
+    env.setdefault("TERM", "xterm-256color")
+    return {**env, **extra}
+
+
+def _display(path: str) -> str:
+    home = str(Path.home())
+    return "~" + path[len(home):] if path.startswith(home + "/") else path
+
+
+def _plugin_env(eager: bool) -> dict[str, str]:
+    return {EAGER_ENV: "1"} if eager else {}
+
+
+def bench(
+    runs: int = 20, warmup: int = 2, zsh: str = "zsh", eager: bool = True
+) -> BenchResult:
+    """Time `zsh -i -c exit` launches; the first `warmup` ones only warm caches.
+
+    With `eager`, deferred plugins load during startup and are timed with it; otherwise
+    they never load, and the times are to the first prompt.
+    """
+    result = BenchResult()
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(warmup + runs):
+            log = Path(tmp) / f"{i}.tsv"
+            env = clean_env(**{PROFILE_ENV: str(log)}, **_plugin_env(eager))
+            # Plain subprocess: the process module's reader threads would be timed too
+            start = time.perf_counter()
+            subprocess.run(
+                [zsh, "-i", "-c", "exit"], env=env, stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False,
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            if i < warmup:
+                continue
+            result.totals.append(elapsed)
+            if log.exists():
+                for line in log.read_text().splitlines():
+                    path, _, ms = line.rpartition("\t")
+                    result.files.setdefault(_display(path), []).append(float(ms))
+    return result
+
+
+def zprof(zsh: str = "zsh", eager: bool = True) -> str:
+    """zprof's report for one launch: time per shell function."""
+    result = subprocess.run(
+        [zsh, "-i", "-c", "exit"], env=clean_env(**{ZPROF_ENV: "1"}, **_plugin_env(eager)),
+        stdin=subprocess.DEVNULL, capture_output=True, text=True, check=False,
+    )
+    return result.stdout
+
+
+def record(result: BenchResult, **meta: Any) -> dict[str, Any]:
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        **meta,
+        "runs": len(result.totals),
+        **{k: round(v, 2) for k, v in result.summary().items()},
+        "files": {k: round(v, 2) for k, v in result.file_medians().items()},
+    }
+
+
+def last_record(
+    host: str, plugins: str = "eager", history: Path = HISTORY_FILE
+) -> dict[str, Any] | None:
+    """The newest record from `host` with `plugins` loaded the same way.
+
+    Other machines' timings aren't comparable, nor are eager and deferred runs. Records
+    without a `plugins` field predate eager loading, so their plugins never loaded.
+    """
+    try:
+        lines = history.read_text().splitlines()
+    except FileNotFoundError:
+        return None
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # a torn line from an interrupted run
+        if (
+            isinstance(entry, dict)
+            and entry.get("host") == host
+            and entry.get("plugins", "deferred") == plugins
+        ):
+            return entry
+    return None
+
+
+def append_record(entry: dict[str, Any], history: Path = HISTORY_FILE) -> None:
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a") as f:
+        f.write(json.dumps(entry) + "\n")
@@ -1,25 +1,127 @@
+import shutil
 from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-from tectonic.modules import base, shell, shell_hpc
-from tectonic.modules.apps import docker
-from tectonic.modules.dev import c, node, python
-
-MODULES: dict[str, Callable[[], None]] = {
-    "base": base.run,
-    "shell": shell.run,
-    "shell-hpc": shell_hpc.run,
-    "dev-c": c.run,
-    "dev-python": python.run,
-    "dev-node": node.run,
-    "apps-docker": docker.run,
+from tectonic.core import scheduler, state
+
+if TYPE_CHECKING:
+    from tectonic.base import ConfigService
+    from tectonic.core.distro import Distro
+
+
+@dataclass(frozen=True)
+class Module:
+    path: str  # submodule of tectonic.modules providing run(), imported on first use
+    packages: str = ""  # package set in configs/packages/, installed by the plan phase
+    binaries: tuple[str, ...] = ()  # commands whose presence shows the module converged
+    guard: str = ""  # command whose presence means the module is set up: not planned, not run
+    guarded: tuple[str, ...] = ()  # packages run() installs only while their command is missing
+    after: tuple[str, ...] = ()  # modules that must finish first, when both are resolved
+    locks: frozenset[str] = frozenset()  # resources held exclusively while running
+    inputs: bool = False  # the submodule has inputs(host_entry): more state it converges to
+
+    def run(self) -> None:
+        import_module(f"{__name__}.{self.path}").run()
+
+    def read_inputs(self, host_entry: dict[str, Any]) -> Any:
+        if not self.inputs:
+            return None
+        return import_module(f"{__name__}.{self.path}").inputs(host_entry)
+
+
+# Resources: "pkg" is the package manager's lock (dpkg/apt, brew, pacman, dnf);
+# "tty" marks modules that may prompt, which run alone with live output.
+PKG = frozenset({"pkg"})
+
+MODULES: dict[str, Module] = {
+    "base": Module(
+        "base", packages="base", binaries=("curl", "git", "nvim", "tmux"), locks=PKG,
+    ),
+    "shell": Module(
+        "shell", packages="shell", binaries=("zsh", "starship"), guarded=("zsh", "starship"),
+        after=("base",), locks=PKG | {scheduler.TTY},
+    ),
+    "shell-hpc": Module("shell_hpc", binaries=("chezmoi", "starship"), inputs=True),
+    "dev-c": Module(
+        "dev.c", packages="dev-c", binaries=("gcc", "cmake", "gdb"), after=("base",), locks=PKG,
+    ),
+    "dev-python": Module("dev.python", binaries=("uv",)),
+    "dev-node": Module(
+        "dev.node", packages="dev-node", binaries=("node",), after=("base",), locks=PKG,
+    ),
+    "apps-docker": Module(
+        "apps.docker", packages="apps", binaries=("docker",), guard="docker",
+        after=("base",), locks=PKG,
+    ),
 }
 
 
 def run_module(name: str) -> None:
     if name not in MODULES:
         raise ValueError(f"Unknown module: {name}")
-    MODULES[name]()
+    MODULES[name].run()
 
 
 def list_modules() -> list[str]:
     return list(MODULES.keys())
+
+
+def is_set_up(name: str) -> bool:
+    """Whether the module's guard command is on PATH, so it has nothing to do.
+
+    Checked before the package plan: once the plan has installed a module's
+    packages, the guard command would be present even though setup hasn't run.
+    """
+    guard = MODULES[name].guard
+    return bool(guard) and shutil.which(guard) is not None
+
+
+def task(name: str, run: Callable[[], None] | None = None) -> scheduler.Task:
+    """Scheduler task for a module; `run` overrides the entry point (e.g. to wrap it)."""
+    module = MODULES[name]
+    return scheduler.Task(
+        name=name, run=run or module.run, after=module.after, locks=module.locks,
+    )
+
+
+def fingerprint(
+    name: str, d: "Distro", configs: "ConfigService", host_entry: dict[str, Any],
+) -> str:
+    """Inputs a module's outcome depends on; unchanged means the module has nothing to do."""
+    module = MODULES[name]
+    package_set = configs.get(f"packages.{module.packages}") if module.packages else None
+    return state.fingerprint(
+        state.version(),
+        name,
+        asdict(d),
+        package_set,
+        configs.get("urls.starship"),
+        configs.get("urls.releases"),
+        host_entry.get("hpc"),
+        {b: shutil.which(b) for b in module.binaries},
+        module.read_inputs(host_entry),
+    )
+
+
+def plan_packages(
+    names: list[str], pkg_mgr: str, configs: "ConfigService", check_guards: bool = False,
+) -> list[str]:
+    """Deduplicated package list for the given modules, in module order.
+
+    With check_guards, packages in a module's `guarded` whose command is already
+    on PATH are left out, as the module itself would skip them.
+    """
+    planned: dict[str, None] = {}
+    for name in names:
+        if name not in MODULES:
+            raise ValueError(f"Unknown module: {name}")
+        module = MODULES[name]
+        if not module.packages or not pkg_mgr:
+            continue
+        for package in configs.get(f"packages.{module.packages}.{pkg_mgr}", []) or []:
+            if check_guards and package in module.guarded and shutil.which(package):
+                continue
+            planned.setdefault(package)
+    return list(planned)
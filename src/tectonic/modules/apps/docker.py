@@ -34,10 +34,8 @@ def install_macos() -> None:
 def run() -> None:
     ui.section("Docker")
 
-    if process.is_installed("docker"):
-        ui.info("Docker already installed")
-        return
-
+    # Not reached when docker is already installed: the registry's guard checks
+    # that before the package plan, which may install docker for install_linux.
     if distro.is_macos():
         install_macos()
     else:
@@ -12,7 +12,8 @@ def run() -> None:
         ui.warn(f"No base packages defined for {d.pkg_mgr}")
         return
 
-    distro.pkg_update()
+    # The plan phase already refreshed the index if anything was missing; pkg_install
+    # refreshes and retries on its own if an install fails against a stale one
     distro.pkg_install(packages)
 
     ui.ok("Base packages installed")
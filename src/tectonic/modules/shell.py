@@ -3,7 +3,7 @@ import shutil
 from pathlib import Path
 
 from tectonic import config
-from tectonic.core import distro, process, ui
+from tectonic.core import distro, download, process, ui
 
 
 def install_zsh() -> None:
@@ -16,7 +16,7 @@ def install_zsh() -> None:
 
 
 def install_starship() -> None:
-    if process.is_installed("starship"):
+    if process.is_installed("starship") or (download.LOCAL_BIN / "starship").exists():
         ui.info("starship already installed")
         return
 
@@ -25,8 +25,9 @@ def install_starship() -> None:
         distro.pkg_install(["starship"])
     else:
         ui.step("Installing starship")
-        url = config.configs.get("urls.starship")
-        process.run_shell(f"curl -fsSL {url} | sh -s -- -y")
+        if not download.install_release("starship", config.configs.get("urls.releases.starship")):
+            script = download.fetch(config.configs.get("urls.starship"))
+            process.run(["sh", str(script), "-y"])
 
     ui.ok("starship installed")
 
@@ -1,36 +1,173 @@
+import os
+import shlex
+import tempfile
 from pathlib import Path
+from typing import Any
 
-from tectonic.core import process, ui
+from tectonic import config
+from tectonic.core import download, host, process, ui
 
 LOCAL_BIN = Path.home() / ".local" / "bin"
+RELEASES = ("chezmoi", "starship")
+LMOD_SNAPSHOT = config.DIR_CACHE / "lmod.zsh"
+
+# Loads the modules in a clean bash, dumping the environment before and after to files
+# (not stdout: every output line is logged, and environments can hold secrets)
+_LMOD_DUMP = """
+source "$1/init/bash" >/dev/null 2>&1 || exit 1
+module reset >/dev/null 2>&1 || module purge >/dev/null 2>&1
+env -0 > "$2"
+module load "${@:4}" >/dev/null || exit 1
+env -0 > "$3"
+"""
+# Shell bookkeeping that differs between any two environments
+_IGNORED = {"_", "PWD", "OLDPWD", "SHLVL"}
+
+
+class LmodError(Exception):
+    pass
+
+
+def _missing(name: str) -> bool:
+    return not process.is_installed(name) and not (LOCAL_BIN / name).exists()
+
+
+def prefetch() -> None:
+    """Download the release archives still needed, in parallel, ahead of installing."""
+    wanted = []
+    for name in RELEASES:
+        spec = config.configs.get(f"urls.releases.{name}")
+        resolved = download.release_url(spec) if spec and _missing(name) else None
+        if resolved is not None:
+            wanted.append(resolved)
+    for url, result in download.fetch_all(wanted).items():
+        if isinstance(result, Exception):
+            ui.warn(f"Prefetch failed for {url}: {result}")
 
 
 def install_chezmoi() -> None:
-    if process.is_installed("chezmoi"):
+    if not _missing("chezmoi"):
         ui.info("chezmoi already installed")
         return
 
     ui.step("Installing chezmoi")
-    process.run_shell(f'sh -c "$(curl -fsLS get.chezmoi.io)" -- -b {LOCAL_BIN}')
+    if not download.install_release(
+        "chezmoi", config.configs.get("urls.releases.chezmoi"), LOCAL_BIN
+    ):
+        script = download.fetch(config.configs.get("urls.chezmoi"))
+        process.run(["sh", str(script), "-b", str(LOCAL_BIN)])
     ui.ok("chezmoi installed")
 
 
 def install_starship() -> None:
-    if process.is_installed("starship"):
+    if not _missing("starship"):
         ui.info("starship already installed")
         return
 
     ui.step("Installing starship")
-    process.run_shell(f"curl -fsSL https://starship.rs/install.sh | sh -s -- -b {LOCAL_BIN} -y")
+    if not download.install_release(
+        "starship", config.configs.get("urls.releases.starship"), LOCAL_BIN
+    ):
+        script = download.fetch(config.configs.get("urls.starship"))
+        process.run(["sh", str(script), "-b", str(LOCAL_BIN), "-y"])
     ui.ok("starship installed")
 
 
+def _parse_env(dump: str) -> dict[str, str]:
+    return dict(item.split("=", 1) for item in dump.split("\0") if "=" in item)
+
+
+def lmod_key(modules: list[str], env: dict[str, str]) -> str:
+    """What a snapshot depends on; lmod.zsh computes the same string at shell startup."""
+    dirs = []
+    for d in filter(None, env.get("MODULEPATH", "").split(":")):
+        try:
+            dirs.append(f"{d}={int(os.stat(d).st_mtime)}")
+        except OSError:
+            dirs.append(f"{d}=-")
+    return "|".join([
+        " ".join(modules),
+        env.get("LMOD_VERSION", ""),
+        env.get("LOADEDMODULES", ""),
+        " ".join(dirs),
+    ])
+
+
+def _export(name: str, before: str | None, after: str) -> str:
+    # Modules prepend or append to path lists; keep the shell's own value in between
+    if before:
+        head, found, tail = after.partition(before)
+        if found and (head or tail) and head[-1:] in ("", ":") and tail[:1] in ("", ":"):
+            value = f'"${{{name}}}"'
+            if head:
+                value = shlex.quote(head) + value
+            if tail:
+                value += shlex.quote(tail)
+            return f"export {name}={value}"
+    return f"export {name}={shlex.quote(after)}"
+
+
+def snapshot_lines(key: str, before: dict[str, str], after: dict[str, str]) -> list[str]:
+    """zsh that replays the before -> after change, but only for a shell with the same key."""
+    lines = [
+        "# Written by tectonic (shell-hpc): the environment of the host's `module load`.",
+        f"[[ $_lmod_key == {shlex.quote(key)} ]] || return 1",
+    ]
+    for name in sorted(before.keys() | after.keys()):
+        if name in _IGNORED or name.startswith("BASH_FUNC_"):
+            continue
+        if name not in after:
+            lines.append(f"unset {name}")
+        elif before.get(name) != after[name]:
+            lines.append(_export(name, before.get(name), after[name]))
+    return lines
+
+
+def snapshot_modules(modules: list[str], lmod_pkg: str) -> bool:
+    """Resolve the modules once and write LMOD_SNAPSHOT for lmod.zsh to source.
+
+    False when the host has no modules to load; LmodError when loading them fails.
+    """
+    if not modules or not lmod_pkg:
+        return False
+    ui.step(f"Recording Lmod environment: {' '.join(modules)}")
+    with tempfile.TemporaryDirectory() as tmp:
+        dumps = Path(tmp) / "before", Path(tmp) / "after"
+        result = process.run(
+            ["bash", "--noprofile", "--norc", "-c", _LMOD_DUMP, "lmod", lmod_pkg,
+             *map(str, dumps), *modules],
+            check=False,
+        )
+        if result.returncode != 0:
+            LMOD_SNAPSHOT.unlink(missing_ok=True)
+            raise LmodError(f"module load {' '.join(modules)} failed; shells load them live")
+        before, after = (_parse_env(d.read_text(errors="replace")) for d in dumps)
+    LMOD_SNAPSHOT.parent.mkdir(parents=True, exist_ok=True)
+    tmp = LMOD_SNAPSHOT.with_suffix(".tmp")
+    tmp.write_text("\n".join(snapshot_lines(lmod_key(modules, before), before, after)) + "\n")
+    tmp.replace(LMOD_SNAPSHOT)
+    ui.ok(f"Lmod snapshot written to {LMOD_SNAPSHOT}")
+    return True
+
+
+def inputs(host_entry: dict[str, Any]) -> list[Any]:
+    """The Lmod state a snapshot was taken against, so a site upgrade or a module tree
+    change reruns the module; also whether the snapshot exists (a failed load removes it)."""
+    modules = host_entry.get("hpc", {}).get("modules", [])
+    return [lmod_key(modules, dict(os.environ)), LMOD_SNAPSHOT.exists()]
+
+
 def run() -> None:
     ui.section("Shell Environment (HPC)")
 
     LOCAL_BIN.mkdir(parents=True, exist_ok=True)
 
+    prefetch()
     install_chezmoi()
     install_starship()
 
+    _, host_entry = host.find_host(host.get_hostname(), host.load_hosts(config.configs))
+    hpc = host_entry.get("hpc", {})
+    snapshot_modules(hpc.get("modules", []), hpc.get("lmod_pkg", ""))
+
     ui.ok("HPC shell environment configured")
@@ -0,0 +1,134 @@
+import gzip
+import json
+from dataclasses import asdict, replace
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from tectonic.cli import app
+from tectonic.core import backup, fs
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return backup.Store(tmp_path / "backups")
+
+
+def _blobs(store):
+    return sorted(p for p in (store.root / "objects").glob("*/*"))
+
+
+class TestStore:
+    def test_identical_content_is_stored_once(self, store, tmp_path):
+        a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+        a.write_text("same")
+        b.write_text("same")
+
+        store.put(a)
+        store.put(a)
+        store.put(b)
+
+        assert len(store.entries()) == 3
+        assert len(_blobs(store)) == 1
+        assert [e.path for e in store.entries(a)] == [str(a), str(a)]
+
+    def test_restore_brings_back_content_and_mode(self, store, tmp_path):
+        path = tmp_path / "config"
+        path.write_text("v1")
+        path.chmod(0o600)
+        entry = store.put(path)
+        path.write_text("v2")
+
+        store.restore(entry)
+
+        assert path.read_text() == "v1"
+        assert path.stat().st_mode & 0o777 == 0o600
+
+    def test_fs_backup_returns_readable_blob(self, tmp_path):
+        path = tmp_path / "zshrc"
+        path.write_text("backup me")
+
+        blob = fs.backup(path, tmp_path / "backups")
+        again = fs.backup(path, tmp_path / "backups")
+
+        assert blob == again
+        assert blob.read_text() == "backup me"
+
+
+class TestPrune:
+    def _history(self, store, tmp_path, versions):
+        path = tmp_path / "file"
+        for i in range(versions):
+            path.write_text(f"version {i}")
+            store.put(path)
+        return path
+
+    def test_keeps_newest_per_path_and_drops_orphans(self, store, tmp_path):
+        path = self._history(store, tmp_path, 5)
+
+        result = store.prune(keep=2, compress=False)
+
+        assert (result.entries, result.blobs) == (3, 3)
+        assert [store.restore(e, tmp_path / "out").read_text() for e in store.entries(path)] == [
+            "version 3", "version 4",
+        ]
+
+    def test_old_versions_are_compressed_and_restorable(self, store, tmp_path):
+        path = self._history(store, tmp_path, 3)
+
+        result = store.prune(keep=10)
+
+        assert result.compressed == 2
+        assert sorted(p.suffix for p in _blobs(store)) == ["", ".gz", ".gz"]
+        oldest = store.entries(path)[0]
+        assert gzip.decompress(store.blob(oldest).read_bytes()) == b"version 0"
+        assert store.restore(oldest, tmp_path / "out").read_text() == "version 0"
+
+    def test_max_age_spares_the_latest_version(self, store, tmp_path):
+        path = self._history(store, tmp_path, 3)
+        old = [replace(e, time="2000-01-01T00:00:00") for e in store.entries()]
+        store._index.write_text("".join(json.dumps(asdict(e)) + "\n" for e in old))
+
+        store.prune(keep=10, max_age_days=30)
+
+        assert [e.hash for e in store.entries(path)] == [old[-1].hash]
+
+    def test_keep_zero_spares_the_latest_version(self, store, tmp_path):
+        path = self._history(store, tmp_path, 3)
+
+        store.prune(keep=0)
+
+        assert [store.restore(e, tmp_path / "out").read_text() for e in store.entries(path)] == [
+            "version 2",
+        ]
+
+
+class TestCli:
+    def test_list_and_restore(self, store, tmp_path):
+        path = tmp_path / "gitconfig"
+        path.write_text("original")
+        store.put(path)
+        path.write_text("clobbered")
+
+        with patch("tectonic.core.backup.store_for", return_value=store):
+            listed = runner.invoke(app, ["backups", "list"])
+            restored = runner.invoke(app, ["backups", "restore", str(path)])
+
+        assert listed.exit_code == 0 and str(path) in listed.stdout
+        assert restored.exit_code == 0
+        assert path.read_text() == "original"
+        # the clobbered content was saved before being overwritten
+        assert len(store.entries(path)) == 2
+
+    def test_restore_unknown_path_fails(self, store, tmp_path):
+        with patch("tectonic.core.backup.store_for", return_value=store):
+            result = runner.invoke(app, ["backups", "restore", str(tmp_path / "nope")])
+        assert result.exit_code == 1
+
+    def test_prune_rejects_keep_zero(self, store):
+        with patch("tectonic.core.backup.store_for", return_value=store):
+            result = runner.invoke(app, ["backups", "prune", "--keep", "0"])
+        assert result.exit_code == 2
@@ -0,0 +1,191 @@
+import io
+import json
+import shutil
+import subprocess
+import tarfile
+
+import pytest
+
+from tectonic import config
+from tectonic.core import bundle, download, tools
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+def _commit(repo, name, content):
+    (repo / name).write_text(content)
+    git("add", ".", cwd=repo)
+    git("commit", "-qm", name, cwd=repo)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    repo.mkdir()
+    git("init", "-q", "-b", "main", cwd=repo)
+    _commit(repo, "README", "hi\n")
+    return repo
+
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(bundle, "BUNDLE_DIR", tmp_path / "bundles")
+    yield
+    bundle.activate(None)
+
+
+def _plugin_archive(path):
+    with tarfile.open(path, "w:gz") as tar:
+        members = (("plugin-1.0/plugin.zsh", b"echo hi\n"), ("plugin-1.0/LICENSE", b""))
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return path
+
+
+class TestExternals:
+    def test_repo_externals_are_archives(self):
+        externals = bundle.chezmoi_externals(config.CHEZMOI_SOURCE)
+        assert ".local/share/zsh/plugins/zsh-autosuggestions" in externals
+        assert all(spec["url"].startswith("https://") for spec in externals.values())
+
+    def test_missing_file(self, tmp_path):
+        assert bundle.chezmoi_externals(tmp_path) == {}
+
+
+def test_parse_apt_depends():
+    output = "zsh\n  Depends: zsh-common\n  Depends: <libc6-any>\nzsh-common\n<libc6-any>\nzsh\n"
+    assert bundle._parse_apt_depends(output) == ["zsh", "zsh-common"]
+
+
+@needs_git
+class TestToolBundles:
+    def test_clone_from_bundle_keeps_upstream_url(self, tmp_path, upstream):
+        out = tmp_path / "tool.bundle"
+        bundle.bundle_repo(str(upstream), upstream, out)
+        dest = tmp_path / "ws" / "tool"
+
+        tools.ensure_source("tool", "https://example.invalid/tool.git", dest, source_bundle=out)
+
+        assert (dest / "README").read_text() == "hi\n"
+        url = subprocess.run(
+            ["git", "remote", "get-url", "origin"], cwd=dest, capture_output=True, text=True
+        ).stdout.strip()
+        assert url == "https://example.invalid/tool.git"
+
+    def test_existing_checkout_pulls_from_bundle(self, tmp_path, upstream):
+        dest = tmp_path / "tool"
+        git("clone", "-q", str(upstream), str(dest), cwd=tmp_path)
+        _commit(upstream, "new", "x")
+        out = tmp_path / "tool.bundle"
+        bundle.bundle_repo(str(upstream), upstream, out)
+        shutil.rmtree(upstream)  # no network: only the bundle has the new commit
+
+        assert tools.ensure_source("tool", str(upstream), dest, source_bundle=out) is None
+        assert (dest / "new").exists()
+
+    def test_pull_follows_the_checked_out_branch(self, tmp_path, upstream):
+        dest = tmp_path / "tool"
+        git("clone", "-q", str(upstream), str(dest), cwd=tmp_path)
+        git("checkout", "-q", "-b", "feature", "--track", "origin/main", cwd=dest)
+        _commit(upstream, "new", "x")
+        git("checkout", "-q", "-b", "other", cwd=upstream)
+        _commit(upstream, "unrelated", "y")  # the bundle's HEAD now points here
+        out = tmp_path / "tool.bundle"
+        bundle.bundle_repo(str(upstream), upstream, out)
+
+        assert tools.ensure_source("tool", str(upstream), dest, source_bundle=out) is None
+        assert (dest / "new").exists() and not (dest / "unrelated").exists()
+
+    def test_branch_missing_from_bundle_is_not_pulled(self, tmp_path, upstream):
+        dest = tmp_path / "tool"
+        git("clone", "-q", str(upstream), str(dest), cwd=tmp_path)
+        git("checkout", "-q", "-b", "feature", cwd=dest)  # no upstream
+        _commit(upstream, "new", "x")
+        out = tmp_path / "tool.bundle"
+        bundle.bundle_repo(str(upstream), upstream, out)
+
+        reason = tools.ensure_source("tool", str(upstream), dest, source_bundle=out)
+
+        assert reason == "branch not in bundle"
+        assert not (dest / "new").exists()
+
+    def test_partial_checkout_bundles_from_repo(self, tmp_path, upstream):
+        git("config", "uploadpack.allowFilter", "true", cwd=upstream)
+        checkout = tmp_path / "partial"
+        git("clone", "-q", "--filter=blob:none", f"file://{upstream}", str(checkout), cwd=tmp_path)
+        out = tmp_path / "tool.bundle"
+
+        bundle.bundle_repo(f"file://{upstream}", checkout, out)
+
+        git("clone", "-q", str(out), "restored", cwd=tmp_path)
+        assert (tmp_path / "restored" / "README").read_text() == "hi\n"
+
+
+@needs_git
+class TestRoundTrip:
+    def test_create_unpack_and_install_offline(self, tmp_path, upstream, isolated):
+        archive = _plugin_archive(tmp_path / "plugin.tar.gz")
+        binary = tmp_path / "install.sh"
+        binary.write_text("#!/bin/sh\n")
+        plan = bundle.Plan(
+            host="pioneer",
+            platform="x86_64-linux",
+            downloads=[(binary.as_uri(), None)],
+            tools={"tool": (str(upstream), upstream)},
+            externals={"plugins/plugin": {"url": archive.as_uri(), "stripComponents": 1}},
+        )
+        out = bundle.create(plan, tmp_path / "out" / "b.tar")
+
+        shutil.rmtree(download.CACHE_DIR)  # as on a fresh host
+        offline = bundle.unpack(out)
+        bundle.activate(offline)
+
+        assert offline.manifest["host"] == "pioneer"
+        assert offline.tool("tool") is not None and offline.tool("other") is None
+        assert download.fetch(binary.as_uri()).read_text() == "#!/bin/sh\n"
+        with pytest.raises(download.DownloadError, match="offline"):
+            download.fetch("https://example.invalid/missing")
+
+        home = tmp_path / "home"
+        (home / "plugins" / "plugin").mkdir(parents=True)
+        (home / "plugins" / "plugin" / "stale.zsh").write_text("")
+        offline.install_externals(home)
+        assert sorted(p.name for p in (home / "plugins" / "plugin").iterdir()) == [
+            "LICENSE", "plugin.zsh",
+        ]
+
+    def test_not_a_bundle(self, tmp_path, isolated):
+        junk = tmp_path / "junk.tar"
+        junk.write_text("not a tar")
+        with pytest.raises(bundle.BundleError):
+            bundle.unpack(junk)
+
+        (tmp_path / "dir").mkdir()
+        with pytest.raises(bundle.BundleError, match="not a tectonic bundle"):
+            bundle.Bundle(tmp_path / "dir")
+
+
+def test_install_packages_only_missing(tmp_path, monkeypatch):
+    (tmp_path / bundle.MANIFEST).write_text(json.dumps({
+        "format": bundle.FORMAT,
+        "pkg_mgr": "apt",
+        "packages": {"zsh_5.9_amd64.deb": "zsh", "libc6_2.39_amd64.deb": "libc6"},
+    }))
+    calls = []
+    monkeypatch.setattr(bundle.process, "run", lambda cmd, **kw: calls.append(cmd))
+
+    installed = bundle.Bundle(tmp_path).install_packages({"zsh"})
+
+    assert installed == ["zsh"]
+    assert calls[0][-1] == str(tmp_path / "packages" / "zsh_5.9_amd64.deb")
+    assert "--no-download" in calls[0]
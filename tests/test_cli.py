@@ -1,10 +1,16 @@
+import subprocess
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
 import yaml
 from typer.testing import CliRunner
 
 from tectonic.base import ConfigService
 from tectonic.cli import app
+from tectonic.cli import dotfiles as dotfiles_cmd
+from tectonic.cli import packages as packages_cmd
+from tectonic.core import distro, state
 
 runner = CliRunner()
 
@@ -38,6 +44,10 @@ class TestHelp:
         result = runner.invoke(app, ["dotfiles", "--help"])
         assert result.exit_code == 0
 
+    def test_bundle_help(self):
+        result = runner.invoke(app, ["bundle", "--help"])
+        assert result.exit_code == 0
+
 
 class TestApply:
     def test_unknown_host(self, tmp_path):
@@ -70,6 +80,24 @@ class TestApply:
         mock_dot.assert_called_once()
         mock_tools.assert_called_once()
 
+    def test_cprofile_implies_profile(self, tmp_path):
+        configs = _make_configs(tmp_path, {
+            "presets": {"test": ["base"]},
+            "hosts": {"testhost": {"preset": "test"}},
+        })
+
+        with patch("tectonic.cli.apply.host.get_hostname", return_value="testhost"), \
+             patch("tectonic.cli.apply.config.configs", configs), \
+             patch("tectonic.cli.apply.config.LOG_FILE", tmp_path / "logs" / "tectonic.jsonl"), \
+             patch("tectonic.cli.apply.packages_cmd.packages"), \
+             patch("tectonic.cli.apply.dotfiles_cmd.dotfiles"), \
+             patch("tectonic.cli.apply.tools_cmd.tools"):
+            result = runner.invoke(app, ["apply", "--cprofile"])
+
+        assert result.exit_code == 0
+        assert len(list((tmp_path / "logs").glob("profile.*.trace.json"))) == 1
+        assert len(list((tmp_path / "logs").glob("profile.*.prof"))) == 1
+
     def test_hpc_host_resolves_alias(self, tmp_path):
         configs = _make_configs(tmp_path, {
             "presets": {"hpc": ["shell-hpc"]},
@@ -91,3 +119,173 @@ class TestApply:
             result = runner.invoke(app, ["apply"])
 
         assert result.exit_code == 0
+
+
+class TestTools:
+    def _configs(self, tmp_path):
+        (tmp_path / "tools.yaml").write_text(yaml.dump({
+            "root": str(tmp_path / "ws"),
+            "tools": {
+                "alpha": {"repo": "git@example.com:alpha.git", "path": "alpha"},
+                "beta": {"repo": "git@example.com:beta.git", "path": "beta"},
+                "gamma": {"repo": "git@example.com:gamma.git", "path": "gamma"},
+            },
+        }))
+        return ConfigService(config_dir=tmp_path)
+
+    def test_failure_does_not_cancel_others(self, tmp_path):
+        synced = []
+
+        def install(name, defn, root, **kwargs):
+            synced.append(name)
+            if name == "beta":
+                raise RuntimeError("clone failed")
+            return None
+
+        with patch("tectonic.cli.tools.config.configs", self._configs(tmp_path)), \
+             patch("tectonic.cli.tools.core_tools.install_tool", side_effect=install):
+            result = runner.invoke(app, ["tools", "--jobs", "3"])
+
+        assert result.exit_code == 1
+        assert sorted(synced) == ["alpha", "beta", "gamma"]
+        assert "beta" in result.stdout
+
+    def test_skipped_pull_reported(self, tmp_path):
+        def install(name, defn, root, **kwargs):
+            return "uncommitted changes" if name == "gamma" else None
+
+        with patch("tectonic.cli.tools.config.configs", self._configs(tmp_path)), \
+             patch("tectonic.cli.tools.core_tools.install_tool", side_effect=install):
+            result = runner.invoke(app, ["tools", "-j", "2"])
+
+        assert result.exit_code == 0
+        assert "pull skipped for: gamma" in result.stdout
+
+
+class TestConvergenceCache:
+    def test_unchanged_modules_are_skipped(self, tmp_path):
+        configs = _make_configs(tmp_path, {
+            "presets": {"test": ["dev-python"]},
+            "hosts": {"testhost": {"preset": "test"}},
+        })
+        store = state.StateStore(tmp_path / "state.json")
+        debian = distro.Distro("debian", "", "12", "Debian", "apt")
+
+        with patch("tectonic.cli.packages.host.get_hostname", return_value="testhost"), \
+             patch("tectonic.cli.packages.config.configs", configs), \
+             patch("tectonic.cli.packages.distro.detect", return_value=debian), \
+             patch("tectonic.cli.packages.distro.missing_packages", return_value=[]), \
+             patch("tectonic.cli.packages.process.run_interactive") as mock_sudo, \
+             patch("tectonic.modules.run_module") as mock_run:
+            state.activate(store)
+            try:
+                packages_cmd.packages()
+                packages_cmd.packages()
+                state.activate(state.StateStore(tmp_path / "state.json", force=True))
+                packages_cmd.packages()
+            finally:
+                state.activate(None)
+
+        assert mock_run.call_count == 2
+        assert mock_sudo.call_count == 2
+
+    def test_guarded_module_is_not_planned_or_run(self, tmp_path):
+        configs = _make_configs(tmp_path, {
+            "presets": {"test": ["apps-docker"]},
+            "hosts": {"testhost": {"preset": "test"}},
+        })
+        (tmp_path / "packages").mkdir()
+        (tmp_path / "packages" / "apps.yaml").write_text(yaml.dump({"apt": ["docker.io"]}))
+        debian = distro.Distro("debian", "", "12", "Debian", "apt")
+
+        with patch("tectonic.cli.packages.host.get_hostname", return_value="testhost"), \
+             patch("tectonic.cli.packages.config.configs", configs), \
+             patch("tectonic.cli.packages.distro.detect", return_value=debian), \
+             patch("tectonic.modules.shutil.which", return_value="/usr/bin/docker"), \
+             patch("tectonic.cli.packages.distro.pkg_install") as mock_install, \
+             patch("tectonic.modules.run_module") as mock_run:
+            packages_cmd.packages()
+
+        mock_install.assert_not_called()
+        mock_run.assert_not_called()
+
+
+    def test_nothing_missing_skips_index_refresh(self, tmp_path):
+        configs = _make_configs(tmp_path, {
+            "presets": {"test": ["base"]},
+            "hosts": {"testhost": {"preset": "test"}},
+        })
+        (tmp_path / "packages").mkdir()
+        (tmp_path / "packages" / "base.yaml").write_text(yaml.dump({"apt": ["curl"]}))
+        debian = distro.Distro("debian", "", "12", "Debian", "apt")
+
+        with patch("tectonic.cli.packages.host.get_hostname", return_value="testhost"), \
+             patch("tectonic.cli.packages.config.configs", configs), \
+             patch("tectonic.cli.packages.distro.detect", return_value=debian), \
+             patch("tectonic.cli.packages.distro.missing_packages", return_value=[]), \
+             patch("tectonic.cli.packages.process.run_interactive"), \
+             patch("tectonic.cli.packages.distro.pkg_update") as mock_update:
+            packages_cmd.packages()
+            mock_update.assert_not_called()
+            packages_cmd.packages(refresh=True)
+            mock_update.assert_called_once()
+
+
+class TestDotfiles:
+    @pytest.fixture
+    def chezmoi(self, tmp_path):
+        """Runs dotfiles() against a `chezmoi status` printing the given output."""
+        (tmp_path / "chezmoi").mkdir()
+        (tmp_path / "chezmoi" / "chezmoi.toml").write_text("")
+
+        def run(status_output, store=None):
+            status = subprocess.CompletedProcess([], 0, stdout=status_output, stderr="")
+            with patch("tectonic.cli.dotfiles.process.is_installed", return_value=True), \
+                 patch("tectonic.cli.dotfiles.config.XDG_CONFIG_HOME", tmp_path), \
+                 patch("tectonic.cli.dotfiles.process.run", return_value=status), \
+                 patch("tectonic.cli.dotfiles.process.run_interactive") as apply:
+                state.activate(store)
+                try:
+                    dotfiles_cmd.dotfiles()
+                finally:
+                    state.activate(None)
+            return apply
+
+        return run
+
+    def test_fingerprint_covers_hosts_config(self, tmp_path):
+        (tmp_path / "hosts.yaml").write_text("hosts: {}\n")
+        with patch("tectonic.cli.dotfiles.config.CONFIGS_DIR", tmp_path):
+            before = dotfiles_cmd._fingerprint(tmp_path / "chezmoi.toml")
+            (tmp_path / "hosts.yaml").write_text("hosts: {box: {hpc: {scratch: /s}}}\n")
+            assert dotfiles_cmd._fingerprint(tmp_path / "chezmoi.toml") != before
+
+    def test_pending_changes_ignores_drift_apply_keeps(self):
+        output = "MM .zshrc\nM  .gitconfig\n R .local/share/chezmoi/run_x.sh\n A .new\n"
+        assert dotfiles_cmd.pending_changes(output) == [
+            ("M", ".zshrc"), ("R", ".local/share/chezmoi/run_x.sh"), ("A", ".new"),
+        ]
+
+    def test_clean_skips_apply(self, chezmoi, tmp_path, capsys):
+        store = state.StateStore(tmp_path / "state.json")
+        store.record("dotfiles", "old", duration=30.0)
+
+        apply = chezmoi("M  .gitconfig\n", store)
+
+        apply.assert_not_called()
+        assert "faster than a full apply" in capsys.readouterr().out
+        assert store.duration("dotfiles") == 30.0
+
+    def test_applies_only_changed_targets(self, chezmoi):
+        apply = chezmoi(" M .zshrc\n A .config/new\n")
+
+        cmd = apply.call_args.args[0]
+        assert cmd[-2:] == [str(Path.home() / ".zshrc"), str(Path.home() / ".config/new")]
+
+    def test_scripts_force_full_apply(self, chezmoi, tmp_path):
+        store = state.StateStore(tmp_path / "state.json")
+
+        apply = chezmoi(" M .zshrc\n R .setup.sh\n", store)
+
+        assert apply.call_args.args[0][-1] == "--force"
+        assert store.duration("dotfiles") is not None
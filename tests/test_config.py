@@ -1,6 +1,10 @@
 from pathlib import Path
+from unittest.mock import patch
+
+import yaml
 
 from tectonic import config
+from tectonic.base import ConfigService
 
 
 class TestPaths:
@@ -57,3 +61,49 @@ class TestConfigService:
         starship_url = config.configs.get("urls.starship")
         assert isinstance(starship_url, str)
         assert starship_url.startswith("https://")
+
+
+class TestSnapshot:
+    def _write(self, config_dir, data):
+        (config_dir / "packages").mkdir(exist_ok=True)
+        (config_dir / "packages" / "base.yaml").write_text(yaml.dump(data))
+
+    def test_snapshot_reused_across_instances(self, tmp_path):
+        config_dir, cache_dir = tmp_path / "configs", tmp_path / "cache"
+        config_dir.mkdir()
+        self._write(config_dir, {"apt": ["git"]})
+        first = ConfigService(config_dir, cache_dir=cache_dir)
+        first.prefetch()
+
+        with patch("tectonic.base.configs._yaml_load") as mock_load:
+            second = ConfigService(config_dir, cache_dir=cache_dir)
+            assert second.get("packages.base.apt") == ["git"]
+        mock_load.assert_not_called()
+
+    def test_snapshot_invalidated_on_change(self, tmp_path):
+        config_dir, cache_dir = tmp_path / "configs", tmp_path / "cache"
+        config_dir.mkdir()
+        self._write(config_dir, {"apt": ["git"]})
+        ConfigService(config_dir, cache_dir=cache_dir).prefetch()
+
+        self._write(config_dir, {"apt": ["git", "tmux"]})
+
+        assert ConfigService(config_dir, cache_dir=cache_dir).get("packages.base.apt") == [
+            "git", "tmux",
+        ]
+
+    def test_corrupt_snapshot_ignored(self, tmp_path):
+        config_dir, cache_dir = tmp_path / "configs", tmp_path / "cache"
+        config_dir.mkdir()
+        self._write(config_dir, {"apt": ["git"]})
+        service = ConfigService(config_dir, cache_dir=cache_dir)
+        service.prefetch()
+        next(cache_dir.iterdir()).write_bytes(b"garbage")
+
+        assert ConfigService(config_dir, cache_dir=cache_dir).get("packages.base.apt") == ["git"]
+
+    def test_get_many(self):
+        values = config.configs.get_many(["packages.base.brew", "urls.starship", "nope.nope"])
+        assert "git" in values["packages.base.brew"]
+        assert values["urls.starship"].startswith("https://")
+        assert values["nope.nope"] is None
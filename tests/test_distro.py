@@ -0,0 +1,175 @@
+import os
+import subprocess
+import time
+from unittest.mock import patch
+
+import pytest
+
+from tectonic.core import distro
+
+
+@pytest.fixture
+def apt_host(monkeypatch, tmp_path):
+    monkeypatch.setattr(distro, "_distro", distro.Distro("debian", "", "12", "Debian", "apt"))
+    monkeypatch.setattr(distro, "_installed", None)
+    monkeypatch.setattr(distro, "_update_checked", False)
+    monkeypatch.setattr(distro, "_refreshed", False)
+    monkeypatch.setattr(distro, "_update_ttl", 0)
+    monkeypatch.setattr(distro, "_force_update", False)
+    monkeypatch.setattr(distro, "STAMP_DIR", tmp_path / "cache")
+    monkeypatch.setattr(distro, "APT_LISTS", tmp_path / "lists")
+
+
+def _completed(cmd, stdout="", returncode=0):
+    return subprocess.CompletedProcess(cmd, returncode, stdout=stdout, stderr="")
+
+
+class TestDetectLinux:
+    @pytest.mark.parametrize(("os_id", "id_like", "expected"), [
+        ("ubuntu", "debian", "apt"),
+        ("pop", "ubuntu debian", "apt"),
+        ("arch", "", "pacman"),
+        ("endeavouros", "arch", "pacman"),
+        ("fedora", "", "dnf"),
+        ("rocky", "rhel centos fedora", "dnf"),
+        ("alpine", "", ""),
+    ])
+    def test_pkg_mgr(self, tmp_path, monkeypatch, os_id, id_like, expected):
+        os_release = tmp_path / "os-release"
+        os_release.write_text(f'ID={os_id}\nID_LIKE="{id_like}"\nPRETTY_NAME="{os_id}"\n')
+        monkeypatch.setattr(distro, "OS_RELEASE", os_release)
+
+        assert distro._detect_linux().pkg_mgr == expected
+
+
+class TestParse:
+    def test_dpkg_skips_config_files(self):
+        output = (
+            "git\tinstall ok installed\n"
+            "vim\tdeinstall ok config-files\n"
+            "zsh\tinstall ok installed\n"
+        )
+        assert distro._parse_dpkg(output) == {"git", "zsh"}
+
+    def test_first_column(self):
+        output = "git 2.45.0\nneovim 0.10.0 0.9.5\n\n"
+        assert distro._parse_first_column(output) == {"git", "neovim"}
+
+
+class TestPkgInstall:
+    def test_installs_only_missing(self, apt_host):
+        calls = []
+
+        def run(cmd, check=True, capture=False, cwd=None):
+            calls.append(cmd)
+            return _completed(cmd, stdout="git\tinstall ok installed\n")
+
+        with patch("tectonic.core.distro.process.run", side_effect=run):
+            distro.pkg_install(["git", "tmux", "git"])
+
+        assert calls[0][0] == "dpkg-query"
+        assert calls[1] == ["sudo", "apt", "install", "-y", "tmux"]
+
+    def test_skips_package_manager_when_nothing_missing(self, apt_host):
+        calls = []
+
+        def run(cmd, check=True, capture=False, cwd=None):
+            calls.append(cmd)
+            return _completed(cmd, stdout="git\tinstall ok installed\ntmux\tinstall ok installed\n")
+
+        with patch("tectonic.core.distro.process.run", side_effect=run):
+            distro.pkg_install(["git", "tmux"])
+            distro.pkg_install(["tmux"])
+            assert distro.pkg_installed("git")
+
+        assert len(calls) == 1
+
+    def test_snapshot_updated_after_install(self, apt_host):
+        def run(cmd, **kw):
+            return _completed(cmd)
+
+        with patch("tectonic.core.distro.process.run", side_effect=run):
+            distro.pkg_install(["tmux"])
+            assert distro.pkg_installed("tmux")
+
+
+class TestPkgUpdate:
+    def test_pacman_refresh_upgrades(self):
+        # -Sy alone followed by -S is a partial upgrade
+        assert distro.BACKENDS["pacman"].update[:3] == ["sudo", "pacman", "-Syu"]
+
+    def _run(self, calls):
+        def run(cmd, check=True, capture=False, cwd=None):
+            calls.append(cmd)
+            return _completed(cmd)
+        return run
+
+    def test_skips_within_ttl(self, apt_host):
+        distro.configure(update_ttl=3600)
+        distro._stamp("apt").parent.mkdir(parents=True)
+        distro._stamp("apt").touch()
+        calls = []
+
+        with patch("tectonic.core.distro.process.run", side_effect=self._run(calls)):
+            distro.pkg_update()
+
+        assert calls == []
+
+    def test_apt_lists_mtime_counts_as_refresh(self, apt_host):
+        distro.configure(update_ttl=3600)
+        distro.APT_LISTS.mkdir()
+        calls = []
+
+        with patch("tectonic.core.distro.process.run", side_effect=self._run(calls)):
+            distro.pkg_update()
+
+        assert calls == []
+
+    def test_refreshes_when_stale(self, apt_host):
+        distro.configure(update_ttl=60)
+        stamp = distro._stamp("apt")
+        stamp.parent.mkdir(parents=True)
+        stamp.touch()
+        old = time.time() - 3600
+        os.utime(stamp, (old, old))
+        calls = []
+
+        with patch("tectonic.core.distro.process.run", side_effect=self._run(calls)):
+            distro.pkg_update()
+            distro.pkg_update()
+
+        assert calls == [["sudo", "apt", "update"]]
+        assert stamp.stat().st_mtime > old
+
+    def test_force_ignores_ttl(self, apt_host):
+        distro.configure(update_ttl=3600, force_update=True)
+        distro._stamp("apt").parent.mkdir(parents=True)
+        distro._stamp("apt").touch()
+        calls = []
+
+        with patch("tectonic.core.distro.process.run", side_effect=self._run(calls)):
+            distro.pkg_update()
+
+        assert calls == [["sudo", "apt", "update"]]
+
+    def test_install_failure_refreshes_and_retries(self, apt_host):
+        distro.configure(update_ttl=3600)
+        distro._stamp("apt").parent.mkdir(parents=True)
+        distro._stamp("apt").touch()
+        calls = []
+
+        def run(cmd, check=True, capture=False, cwd=None):
+            calls.append(cmd)
+            if cmd[:3] == ["sudo", "apt", "install"] and ["sudo", "apt", "update"] not in calls:
+                raise subprocess.CalledProcessError(100, cmd)
+            return _completed(cmd)
+
+        with patch("tectonic.core.distro.process.run", side_effect=run):
+            distro.pkg_update()
+            distro.pkg_install(["newpkg"])
+
+        assert calls[1:] == [
+            ["sudo", "apt", "install", "-y", "newpkg"],
+            ["sudo", "apt", "update"],
+            ["sudo", "apt", "install", "-y", "newpkg"],
+        ]
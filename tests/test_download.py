@@ -0,0 +1,158 @@
+import hashlib
+import io
+import tarfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tectonic.core import download
+
+
+class _Handler(BaseHTTPRequestHandler):
+    files: dict[str, bytes] = {}
+    log: list[tuple[str, int]] = []
+    error: int | None = None  # answer every request with this status
+
+    def do_GET(self):
+        # Log before responding, so the client can't observe a response the log lacks
+        if self.error is not None:
+            self.log.append((self.path, self.error))
+            self.send_response(self.error)
+            self.end_headers()
+            return
+        body = self.files.get(self.path)
+        if body is None:
+            self.log.append((self.path, 404))
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.log.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.log.append((self.path, 200))
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "CACHE_DIR", tmp_path / "cache")
+    _Handler.files, _Handler.log, _Handler.error = {}, [], None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", _Handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _tarball(name, content):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        info = tarfile.TarInfo(f"release/{name}")
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
+
+
+class TestFetch:
+    def test_revalidates_with_etag(self, server):
+        base, handler = server
+        handler.files["/install.sh"] = b"echo hi\n"
+
+        first = download.fetch(f"{base}/install.sh")
+        second = download.fetch(f"{base}/install.sh")
+
+        assert first == second and first.read_bytes() == b"echo hi\n"
+        assert handler.log == [("/install.sh", 200), ("/install.sh", 304)]
+
+    def test_changed_content_is_downloaded_again(self, server):
+        base, handler = server
+        handler.files["/a"] = b"v1"
+        download.fetch(f"{base}/a")
+        handler.files["/a"] = b"v2"
+
+        assert download.fetch(f"{base}/a").read_bytes() == b"v2"
+
+    def test_pin_mismatch_raises_and_caches_nothing(self, server):
+        base, handler = server
+        handler.files["/a"] = b"tampered"
+
+        with pytest.raises(download.DownloadError, match="does not match"):
+            download.fetch(f"{base}/a", sha256="0" * 64)
+        assert [p for p in download.CACHE_DIR.iterdir()] == []
+
+    def test_pin_match(self, server):
+        base, handler = server
+        handler.files["/a"] = b"good"
+        path = download.fetch(f"{base}/a", sha256=hashlib.sha256(b"good").hexdigest())
+        assert path.read_bytes() == b"good"
+
+    def test_unreachable_server_uses_cache(self, server, monkeypatch):
+        base, handler = server
+        handler.files["/a"] = b"cached"
+        download.fetch(f"{base}/a")
+
+        def offline(*args, **kwargs):
+            raise urllib.error.URLError("network is unreachable")
+
+        monkeypatch.setattr(urllib.request, "urlopen", offline)
+        assert download.fetch(f"{base}/a").read_bytes() == b"cached"
+        with pytest.raises(download.DownloadError, match="unreachable"):
+            download.fetch(f"{base}/never-fetched")
+
+    def test_server_error_uses_cache(self, server):
+        base, handler = server
+        handler.files["/a"] = b"cached"
+        download.fetch(f"{base}/a")
+        handler.error = 503
+
+        assert download.fetch(f"{base}/a").read_bytes() == b"cached"
+        with pytest.raises(download.DownloadError, match="HTTP 503"):
+            download.fetch(f"{base}/never-fetched")
+
+    def test_fetch_all_runs_in_parallel_and_reports_failures(self, server):
+        base, handler = server
+        handler.files.update({"/a": b"a", "/b": b"b"})
+
+        results = download.fetch_all([(f"{base}/a", None), (f"{base}/b", None),
+                                      (f"{base}/missing", None)])
+
+        assert results[f"{base}/a"].read_bytes() == b"a"
+        assert isinstance(results[f"{base}/missing"], download.DownloadError)
+
+
+class TestRelease:
+    def test_installs_binary_from_archive(self, server, tmp_path, monkeypatch):
+        base, handler = server
+        handler.files["/v1.0/tool-x86_64.tar.gz"] = _tarball("tool", b"#!/bin/sh\n")
+        monkeypatch.setattr(download, "platform_key", lambda: "x86_64-linux")
+        spec = {
+            "version": "1.0",
+            "url": base + "/v{version}/tool-{target}.tar.gz",
+            "targets": {"x86_64-linux": "x86_64"},
+        }
+
+        assert download.install_release("tool", spec, tmp_path / "bin")
+
+        installed = tmp_path / "bin" / "tool"
+        assert installed.read_bytes() == b"#!/bin/sh\n"
+        assert installed.stat().st_mode & 0o111
+
+    def test_unsupported_platform_falls_back(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr(download, "platform_key", lambda: "riscv64-linux")
+        spec = {"url": "unused", "targets": {"x86_64-linux": "x86_64"}}
+        assert not download.install_release("tool", spec, tmp_path / "bin")
+        assert not download.install_release("tool", None, tmp_path / "bin")
@@ -1,6 +1,18 @@
+import os
+import shutil
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
 from tectonic.core import fs
 
 
+@pytest.fixture(autouse=True)
+def manifest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(fs, "MANIFEST_DIR", tmp_path / "manifests")
+
+
 class TestEnsureDir:
     def test_creates_directory(self, tmp_path):
         new_dir = tmp_path / "new" / "nested" / "dir"
@@ -53,6 +65,89 @@ class TestFilesEqual:
 
         assert not fs.files_equal(file1, file2)
 
+    @pytest.mark.parametrize("offset", [0, 4095, 4096, 9999])
+    def test_difference_in_any_block(self, tmp_path, monkeypatch, offset):
+        monkeypatch.setattr(fs, "CHUNK_SIZE", 4096)
+        data = bytearray(os.urandom(10000))
+        file1, file2 = tmp_path / "a", tmp_path / "b"
+        file1.write_bytes(data)
+        file2.write_bytes(data)
+        assert fs.files_equal(file1, file2)
+
+        data[offset] ^= 0xFF
+        file2.write_bytes(data)
+        assert not fs.files_equal(file1, file2)
+
+    def test_memory_does_not_grow_with_file_size(self, tmp_path):
+        file1, file2 = tmp_path / "a", tmp_path / "b"
+        data = os.urandom(32 * 1024 * 1024)
+        file1.write_bytes(data)
+        file2.write_bytes(data)
+        del data
+
+        tracemalloc.start()
+        try:
+            assert fs.files_equal(file1, file2)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < 4 * fs.CHUNK_SIZE
+
+
+class TestCopyFile:
+    @pytest.mark.parametrize("path", ["clone", "copy_range", "shutil"])
+    def test_each_strategy_copies_content_and_metadata(self, tmp_path, monkeypatch, path):
+        if path != "clone":
+            monkeypatch.setattr(fs, "_clone", lambda *a: False)
+        if path == "shutil":
+            monkeypatch.setattr(fs, "_copy_range", lambda *a: False)
+        src, dst = tmp_path / "src.bin", tmp_path / "dst.bin"
+        src.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+        src.chmod(0o640)
+        os.utime(src, ns=(1_000_000_000, 2_000_000_000))
+        dst.write_bytes(b"previous, longer content" * 1000000)
+
+        fs.copy_file(src, dst)
+
+        assert dst.read_bytes() == src.read_bytes()
+        assert dst.stat().st_mtime_ns == 2_000_000_000
+        assert dst.stat().st_mode & 0o777 == 0o640
+
+    def test_empty_file(self, tmp_path):
+        src, dst = tmp_path / "src", tmp_path / "dst"
+        src.touch()
+        fs.copy_file(src, dst)
+        assert dst.read_bytes() == b""
+
+    def test_copy_range_returning_zero_falls_back(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(fs, "_clone", lambda *a: False)
+        monkeypatch.setattr(fs.os, "copy_file_range", lambda *a: 0, raising=False)
+        src, dst = tmp_path / "src", tmp_path / "dst"
+        src.write_bytes(b"content")
+
+        fs.copy_file(src, dst)
+
+        assert dst.read_bytes() == b"content"
+
+    def test_short_copy_range_raises(self, tmp_path, monkeypatch):
+        results = iter([3, 0])
+        monkeypatch.setattr(fs, "_clone", lambda *a: False)
+        monkeypatch.setattr(fs.os, "copy_file_range", lambda *a: next(results), raising=False)
+        src, dst = tmp_path / "src", tmp_path / "dst"
+        src.write_bytes(b"content")
+
+        with pytest.raises(OSError, match="3 of 7"):
+            fs.copy_file(src, dst)
+
+    def test_same_file_is_refused(self, tmp_path):
+        src, link = tmp_path / "src", tmp_path / "link"
+        src.write_bytes(b"content")
+        os.link(src, link)
+
+        with pytest.raises(shutil.SameFileError):
+            fs.copy_file(src, link)
+        assert src.read_bytes() == b"content"
+
 
 class TestCopy:
     def test_copy_new_file(self, sample_files):
@@ -132,6 +227,58 @@ class TestCopyTree:
         assert (dst / "test.txt").read_text() == "hello world"
         assert (dst / "nested" / "nested.txt").read_text() == "nested content"
 
+    def test_reports_stats(self, sample_files):
+        src, dst = sample_files["src_dir"], sample_files["dst_dir"]
+        (dst / "test.txt").write_text("hello world")
+
+        stats = fs.copy_tree(src, dst, do_backup=False)
+
+        assert stats == fs.CopyStats(
+            files_copied=2, bytes_copied=18, files_skipped=1, bytes_skipped=11, backed_up=0
+        )
+
+    def test_unchanged_tree_skips_on_metadata(self, sample_files):
+        src, dst = sample_files["src_dir"], sample_files["dst_dir"]
+        fs.copy_tree(src, dst)
+
+        with patch.object(fs, "files_equal") as equal, patch.object(fs, "_file_hash") as digest:
+            stats = fs.copy_tree(src, dst)
+
+        assert (stats.files_copied, stats.files_skipped) == (0, 3)
+        equal.assert_not_called()
+        digest.assert_not_called()
+
+    def test_touched_source_with_same_content_is_not_copied(self, sample_files):
+        src, dst = sample_files["src_dir"], sample_files["dst_dir"]
+        fs.copy_tree(src, dst)
+        os.utime(src / "test.txt", ns=(1, 1))
+
+        stats = fs.copy_tree(src, dst)
+
+        assert (stats.files_copied, stats.files_skipped) == (0, 3)
+
+    def test_changed_source_is_copied(self, sample_files):
+        src, dst = sample_files["src_dir"], sample_files["dst_dir"]
+        fs.copy_tree(src, dst)
+        (src / "nested" / "nested.txt").write_text("nested CONTENT")
+
+        stats = fs.copy_tree(src, dst, do_backup=False)
+
+        assert stats.files_copied == 1
+        assert (dst / "nested" / "nested.txt").read_text() == "nested CONTENT"
+
+    def test_drifted_destination_is_backed_up_and_restored(self, sample_files, tmp_path):
+        src, dst = sample_files["src_dir"], sample_files["dst_dir"]
+        fs.copy_tree(src, dst)
+        (dst / "test.txt").write_text("local edit!")
+
+        with patch.object(fs, "backup") as backup:
+            stats = fs.copy_tree(src, dst)
+
+        assert (stats.files_copied, stats.backed_up) == (1, 1)
+        backup.assert_called_once_with(dst / "test.txt")
+        assert (dst / "test.txt").read_text() == "hello world"
+
 
 class TestBackup:
     def test_backup_creates_copy(self, tmp_path):
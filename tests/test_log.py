@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import threading
+
+from tectonic.core import log, ui
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestLogWriter:
+    def test_concurrent_writes_are_whole_lines(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        writer = log.LogWriter(path)
+
+        def spam(n):
+            for i in range(200):
+                writer.write({"task": n, "msg": "x" * 500 + str(i)})
+
+        threads = [threading.Thread(target=spam, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.close()
+
+        records = _records(path)
+        assert len(records) == 1600
+        assert {r["task"] for r in records} == set(range(8))
+
+    def test_flush_returns_once_writer_is_gone(self, tmp_path):
+        writer = log.LogWriter(tmp_path / "run.jsonl")
+        writer.close()
+        writer.flush()
+
+
+class TestRotate:
+    def test_previous_run_is_compressed(self, tmp_path):
+        path = tmp_path / "tectonic.jsonl"
+        path.write_text('{"msg": "previous"}\n')
+
+        log.rotate(path, keep=5)
+
+        assert not path.exists()
+        (rotated,) = tmp_path.glob("tectonic.*.jsonl.gz")
+        assert gzip.decompress(rotated.read_bytes()) == b'{"msg": "previous"}\n'
+
+    def test_same_mtime_does_not_overwrite(self, tmp_path):
+        path = tmp_path / "tectonic.jsonl"
+        for run in (1, 2):
+            path.write_text(f"run {run}\n")
+            os.utime(path, (86400, 86400))
+            log.rotate(path, keep=5)
+
+        rotated = tmp_path.glob("tectonic.*.jsonl.gz")
+        assert sorted(gzip.decompress(p.read_bytes()) for p in rotated) == [b"run 1\n", b"run 2\n"]
+
+    def test_keeps_last_n_runs(self, tmp_path):
+        path = tmp_path / "tectonic.jsonl"
+        for day in range(1, 6):
+            path.write_text(f"run {day}\n")
+            os.utime(path, (day * 86400, day * 86400))
+            log.rotate(path, keep=3)
+
+        rotated = sorted(tmp_path.glob("tectonic.*.jsonl.gz"))
+        assert [gzip.decompress(p.read_bytes()) for p in rotated] == [
+            b"run 3\n", b"run 4\n", b"run 5\n",
+        ]
+
+
+class TestStructuredRecords:
+    def test_record_fields(self, tmp_path):
+        path = tmp_path / "tectonic.jsonl"
+        ui.init(path)
+        ui.section("Tools")
+        ui.ok("done")
+        with ui.grouped(task="strata"):
+            ui.section("Strata")
+            ui.warn("skipped")
+        ui.flush()
+
+        records = _records(path)
+        assert [(r["level"], r["step"], r["task"], r["msg"]) for r in records] == [
+            ("SECTION", "Tools", None, "Tools"),
+            ("OK", "Tools", None, "done"),
+            ("SECTION", "Strata", "strata", "Strata"),
+            ("WARN", "Strata", "strata", "skipped"),
+        ]
+        assert all("ts" in r for r in records)
@@ -0,0 +1,144 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+import yaml
+
+from tectonic import config, modules
+from tectonic.base import ConfigService
+from tectonic.modules import shell_hpc
+
+FAKE_LMOD = """
+export LMOD_VERSION=8.7.1
+export MODULEPATH={root}/modulefiles
+module() {{
+    case "$1" in
+        reset) export LOADEDMODULES=StdEnv; unset STALE ;;
+        load) shift
+            for m; do
+                [ -d "{root}/$m" ] || return 1
+                export PATH="{root}/$m/bin:$PATH"
+                export LOADEDMODULES="$LOADEDMODULES:$m"
+            done ;;
+    esac
+}}
+"""
+
+
+@pytest.fixture
+def package_configs(tmp_path):
+    packages = tmp_path / "packages"
+    packages.mkdir()
+    (packages / "base.yaml").write_text(yaml.dump({"apt": ["curl", "git", "zsh"], "brew": ["git"]}))
+    (packages / "shell.yaml").write_text(yaml.dump({"apt": ["zsh"]}))
+    (packages / "dev-c.yaml").write_text(yaml.dump({"apt": ["cmake", "git"]}))
+    (packages / "apps.yaml").write_text(yaml.dump({"apt": ["docker.io"], "brew": []}))
+    return ConfigService(config_dir=tmp_path)
+
+
+class TestPlanPackages:
+    def test_dedupes_in_module_order(self, package_configs):
+        planned = modules.plan_packages(
+            ["base", "shell", "dev-c", "apps-docker"], "apt", package_configs,
+        )
+        assert planned == ["curl", "git", "zsh", "cmake", "docker.io"]
+
+    def test_modules_without_package_set(self, package_configs):
+        assert modules.plan_packages(["dev-python", "shell-hpc"], "apt", package_configs) == []
+
+    def test_missing_pkg_mgr_list(self, package_configs):
+        assert modules.plan_packages(["shell", "dev-c"], "brew", package_configs) == []
+
+    def test_unknown_module(self, package_configs):
+        with pytest.raises(ValueError, match="nope"):
+            modules.plan_packages(["nope"], "apt", package_configs)
+
+    def test_guarded_packages_left_to_the_module(self, package_configs, monkeypatch):
+        monkeypatch.setattr(modules.shutil, "which", lambda cmd: f"/bin/{cmd}")
+        assert modules.plan_packages(["shell"], "apt", package_configs) == ["zsh"]
+        assert modules.plan_packages(["shell"], "apt", package_configs, check_guards=True) == []
+        # base installs its zsh unconditionally; only shell guards it
+        planned = modules.plan_packages(
+            ["base", "shell"], "apt", package_configs, check_guards=True,
+        )
+        assert planned == ["curl", "git", "zsh"]
+
+    def test_is_set_up(self, monkeypatch):
+        monkeypatch.setattr(modules.shutil, "which", lambda cmd: "/usr/bin/docker")
+        assert modules.is_set_up("apps-docker")
+        assert not modules.is_set_up("base")
+        monkeypatch.setattr(modules.shutil, "which", lambda cmd: None)
+        assert not modules.is_set_up("apps-docker")
+
+
+class TestRegistry:
+    def test_package_sets_exist(self):
+        for name in modules.list_modules():
+            package_set = modules.MODULES[name].packages
+            if package_set:
+                assert package_set in config.configs.list_files("packages")
+
+
+class TestLmodSnapshot:
+    @pytest.fixture
+    def lmod(self, tmp_path, monkeypatch):
+        root = tmp_path / "lmod"
+        for d in ("init", "modulefiles", "gcc/bin"):
+            (root / d).mkdir(parents=True)
+        (root / "init" / "bash").write_text(FAKE_LMOD.format(root=root))
+        monkeypatch.setattr(shell_hpc, "LMOD_SNAPSHOT", tmp_path / "lmod.zsh")
+        monkeypatch.setenv("STALE", "1")
+        return root
+
+    def _source(self, snapshot, key, path="/custom:/usr/bin"):
+        script = f'_lmod_key="$1"; PATH={path}; source {snapshot} || echo stale; echo "$PATH"'
+        return subprocess.run(
+            ["bash", "-c", script, "sh", key], capture_output=True, text=True, check=True,
+        ).stdout.split()
+
+    def test_snapshot_replays_load_on_top_of_shell_path(self, lmod):
+        assert shell_hpc.snapshot_modules(["gcc"], str(lmod))
+        text = shell_hpc.LMOD_SNAPSHOT.read_text()
+        assert 'export LOADEDMODULES="${LOADEDMODULES}":gcc' in text
+        assert "unset STALE" not in text  # reset's change, not the load's
+
+        key = f"gcc|8.7.1|StdEnv|{lmod}/modulefiles={int((lmod / 'modulefiles').stat().st_mtime)}"
+        assert self._source(shell_hpc.LMOD_SNAPSHOT, key) == [f"{lmod}/gcc/bin:/custom:/usr/bin"]
+
+    def test_snapshot_ignored_when_key_differs(self, lmod):
+        shell_hpc.snapshot_modules(["gcc"], str(lmod))
+        assert self._source(shell_hpc.LMOD_SNAPSHOT, "other") == ["stale", "/custom:/usr/bin"]
+
+    def test_failed_load_removes_snapshot(self, lmod):
+        shell_hpc.LMOD_SNAPSHOT.write_text("old")
+        with pytest.raises(shell_hpc.LmodError, match="nope"):
+            shell_hpc.snapshot_modules(["nope"], str(lmod))
+        assert not shell_hpc.LMOD_SNAPSHOT.exists()
+
+    def test_fingerprint_follows_lmod_and_snapshot(self, lmod, monkeypatch):
+        from tectonic.core.distro import Distro
+
+        d = Distro("rocky", "rhel", "9", "Rocky Linux", "dnf")
+        entry = {"hpc": {"modules": ["gcc"]}}
+
+        def fingerprint():
+            return modules.fingerprint("shell-hpc", d, config.configs, entry)
+
+        monkeypatch.setenv("LMOD_VERSION", "8.7.1")
+        first = fingerprint()
+        assert fingerprint() == first
+        shell_hpc.LMOD_SNAPSHOT.write_text("snapshot")
+        written = fingerprint()
+        assert written != first
+        monkeypatch.setenv("LMOD_VERSION", "8.7.2")
+        assert fingerprint() != written
+
+    def test_template_reads_the_snapshot_path(self):
+        template = config.CHEZMOI_SOURCE / "dot_config/zsh/exact_zshrc.d/lmod.zsh.tmpl"
+        relative = shell_hpc.LMOD_SNAPSHOT.relative_to(Path.home())
+        assert f'source "$HOME/{relative}"' in template.read_text()
+
+    def test_export_falls_back_to_full_value(self):
+        assert shell_hpc._export("X", "a", "b:c") == "export X=b:c"
+        assert shell_hpc._export("X", "a:b", "c:a:b:d") == "export X=c:\"${X}\":d"
+        assert shell_hpc._export("X", "ab", "xab") == "export X=xab"
@@ -0,0 +1,36 @@
+import threading
+
+from tectonic.core import parallel, ui
+
+
+class TestMapGrouped:
+    def test_preserves_input_order(self):
+        names = [f"t{i}" for i in range(10)]
+        outcomes = parallel.map_grouped(str.upper, names, jobs=4)
+        assert [o.name for o in outcomes] == names
+        assert [o.value for o in outcomes] == [n.upper() for n in names]
+
+    def test_errors_are_captured_per_item(self):
+        def fn(name):
+            if name == "bad":
+                raise ValueError("boom")
+            return name
+
+        outcomes = parallel.map_grouped(fn, ["a", "bad", "c"], jobs=3)
+        assert [o.failed for o in outcomes] == [False, True, False]
+        assert str(outcomes[1].error) == "boom"
+
+    def test_runs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        outcomes = parallel.map_grouped(lambda n: barrier.wait(), ["a", "b", "c"], jobs=3)
+        assert not any(o.failed for o in outcomes)
+
+    def test_output_grouped_per_item(self, capsys):
+        def fn(name):
+            ui.step(f"{name} start")
+            ui.step(f"{name} end")
+
+        parallel.map_grouped(fn, ["a", "b", "c"], jobs=3)
+        lines = [line for line in capsys.readouterr().out.splitlines() if line.strip()]
+        for i in range(0, len(lines), 2):
+            assert lines[i].split()[1] == lines[i + 1].split()[1]
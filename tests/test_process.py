@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from tectonic.core import process, ui
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+class TestExec:
+    def test_captures_both_streams(self):
+        result = process.run(
+            _py("import sys; print('out'); print('err', file=sys.stderr)"), capture=True
+        )
+        assert result.returncode == 0
+        assert result.stdout == "out\n"
+        assert result.stderr == "err\n"
+
+    def test_uncaptured_stdout_is_none(self):
+        assert process.run(_py("print('x')")).stdout is None
+
+    def test_failure_raises_with_stderr(self):
+        with pytest.raises(subprocess.CalledProcessError) as exc:
+            process.run(_py("import sys; sys.exit('boom')"))
+        assert exc.value.returncode == 1
+        assert "boom" in exc.value.stderr
+
+    def test_no_check_returns_code(self):
+        assert process.run(_py("raise SystemExit(3)"), check=False).returncode == 3
+
+    def test_run_quiet(self):
+        assert process.run_quiet(_py("pass"))
+        assert not process.run_quiet(_py("raise SystemExit(1)"))
+
+    def test_capture_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(process, "CAPTURE_LIMIT", 1000)
+        result = process.run(
+            _py("print('first'); [print('x' * 99) for _ in range(100)]; print('last')"),
+            capture=True,
+        )
+        assert len(result.stdout) < 1200
+        assert result.stdout.startswith("first\n")
+        assert result.stdout.endswith("last\n")
+        assert "characters truncated" in result.stdout
+
+    def test_lines_are_logged_while_running(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        ui.init(path)
+        # The child only exits once its first line has reached the log file.
+        script = (
+            "import pathlib, time\n"
+            "print('hello', flush=True)\n"
+            f"log = pathlib.Path({str(path)!r})\n"
+            "while 'hello' not in log.read_text(): time.sleep(0.01)\n"
+        )
+        process.run(_py(script), check=True)
+        ui.flush()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert ("OUTPUT", "hello") in [(r["level"], r["msg"]) for r in records]
+
+    def test_output_lands_in_grouped_block(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        ui.init(path)
+        with ui.grouped(task="strata"):
+            process.run(_py("print('inside')"))
+        ui.flush()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert {"level": "OUTPUT", "task": "strata"}.items() <= next(
+            r for r in records if r["msg"] == "inside"
+        ).items()
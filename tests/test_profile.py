@@ -0,0 +1,63 @@
+import json
+import sys
+
+import pytest
+
+from tectonic.core import parallel, process, profile
+
+
+@pytest.fixture
+def profiler():
+    p = profile.start()
+    yield p
+    profile.stop()
+
+
+class TestSpans:
+    def test_inactive_is_noop(self):
+        with profile.span("x") as s:
+            pass
+        assert s is None
+
+    def test_step_and_command_spans(self, profiler):
+        with profile.span("packages"):
+            process.run([sys.executable, "-c", "print('x' * 99)"])
+
+        step, command = sorted(profiler.spans, key=lambda s: s.cat, reverse=True)
+        assert (step.name, step.cat) == ("packages", "step")
+        assert command.cat == "command"
+        assert command.args == {"exit_code": 0, "output_bytes": 100}
+        assert command.max_rss > 0
+        assert step.start <= command.start
+        assert command.start + command.dur <= step.start + step.dur
+
+    def test_failed_command_records_exit_code(self, profiler):
+        assert not process.run_quiet([sys.executable, "-c", "raise SystemExit(4)"])
+        (command,) = profiler.spans
+        assert command.args["exit_code"] == 4
+
+    def test_parallel_tasks_are_spans(self, profiler):
+        parallel.map_grouped(lambda name: name, ["a", "b"], jobs=2)
+        assert sorted((s.name, s.cat) for s in profiler.spans) == [("a", "task"), ("b", "task")]
+
+    def test_slowest_first(self, profiler):
+        for name, dur in [("fast", 0.1), ("slow", 2.0), ("mid", 1.0)]:
+            s = profiler.begin(name, "step")
+            profiler.end(s)
+            s.dur = dur
+        assert [s.name for s in profiler.slowest(2)] == ["slow", "mid"]
+
+
+class TestTrace:
+    def test_chrome_trace_events(self, profiler, tmp_path):
+        with profile.span("tools"):
+            pass
+        path = tmp_path / "trace.json"
+        profiler.write_trace(path)
+
+        events = json.loads(path.read_text())["traceEvents"]
+        (meta,) = [e for e in events if e["ph"] == "M"]
+        (span,) = [e for e in events if e["ph"] == "X"]
+        assert meta["args"]["name"] == "MainThread"
+        assert {"name": "tools", "cat": "step", "tid": meta["tid"]}.items() <= span.items()
+        assert isinstance(span["ts"], int) and isinstance(span["dur"], int)
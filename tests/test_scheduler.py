@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from tectonic import modules
+from tectonic.core import scheduler
+
+
+def _task(name, after=(), locks=(), run=None):
+    return scheduler.Task(name, run or (lambda: None), tuple(after), frozenset(locks))
+
+
+class TestOrder:
+    def test_dependencies_first(self):
+        tasks = [_task("shell", after=["base"]), _task("python"), _task("base")]
+        assert scheduler.order(tasks) == ["python", "base", "shell"]
+
+    def test_unknown_dependencies_ignored(self):
+        assert scheduler.order([_task("shell", after=["base"])]) == ["shell"]
+
+    def test_cycle_detected(self):
+        tasks = [_task("a", after=["c"]), _task("b", after=["a"]), _task("c", after=["b"])]
+        with pytest.raises(ValueError, match="cycle: a -> c -> b -> a"):
+            scheduler.order(tasks)
+
+    def test_registry_has_no_cycles(self):
+        tasks = [modules.task(name) for name in modules.list_modules()]
+        assert sorted(scheduler.order(tasks)) == sorted(modules.list_modules())
+
+
+class TestRun:
+    def test_independent_tasks_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        tasks = [_task("a", run=barrier.wait), _task("b", run=barrier.wait)]
+
+        outcomes = scheduler.run(tasks, jobs=2)
+
+        assert not any(o.failed for o in outcomes)
+
+    def test_shared_lock_serializes(self):
+        active = []
+        overlap = []
+
+        def work():
+            active.append(1)
+            if len(active) > 1:
+                overlap.append(True)
+            time.sleep(0.02)
+            active.pop()
+
+        tasks = [_task(n, locks=["pkg"], run=work) for n in "abcd"]
+        outcomes = scheduler.run(tasks, jobs=4)
+
+        assert not any(o.failed for o in outcomes)
+        assert not overlap
+
+    def test_dependencies_finish_first(self):
+        finished = []
+        tasks = [
+            _task("base", run=lambda: (time.sleep(0.02), finished.append("base"))),
+            _task("shell", after=["base"], run=lambda: finished.append("shell")),
+        ]
+
+        scheduler.run(tasks, jobs=2)
+
+        assert finished == ["base", "shell"]
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_failure_skips_dependents_only(self, jobs):
+        ran = []
+
+        def boom():
+            raise RuntimeError("apt failed")
+
+        tasks = [
+            _task("base", run=boom),
+            _task("shell", after=["base"], run=lambda: ran.append("shell")),
+            _task("python", run=lambda: ran.append("python")),
+        ]
+        outcomes = {o.name: o for o in scheduler.run(tasks, jobs=jobs)}
+
+        assert ran == ["python"]
+        assert str(outcomes["base"].error) == "apt failed"
+        assert isinstance(outcomes["shell"].error, scheduler.DependencyError)
+        assert not outcomes["python"].failed
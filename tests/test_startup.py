@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Cumulative import time of tectonic.cli, in microseconds. About 140ms today on a
+# slow runner, mostly typer; the slack absorbs noise, not new eager imports.
+IMPORT_BUDGET_US = 250_000
+
+# Must stay out of `tectonic --help` and read-only commands like `tools --list`.
+LAZY_MODULES = [
+    "tectonic.modules",
+    "tectonic.core.scheduler",
+    "tectonic.core.parallel",
+    "concurrent.futures",
+    "importlib.metadata",
+]
+
+
+def _importtime(*args: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], capture_output=True, text=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line.removeprefix("import time:").split("|")
+        cumulative[name.strip()] = int(cum)
+    return cumulative
+
+
+class TestStartup:
+    def test_cli_import_within_budget(self):
+        timings = _importtime("-c", "import tectonic.cli")
+        assert timings["tectonic.cli"] < IMPORT_BUDGET_US
+
+    def test_cli_import_is_lazy(self):
+        loaded = _importtime("-c", "import tectonic.cli")
+        assert [m for m in [*LAZY_MODULES, "yaml", "rich"] if m in loaded] == []
+
+    def test_help_is_lazy(self):
+        loaded = _importtime("-m", "tectonic", "--help")
+        assert [m for m in [*LAZY_MODULES, "yaml", "rich"] if m in loaded] == []
+
+    def test_tools_list_is_lazy(self):
+        loaded = _importtime("-m", "tectonic", "tools", "--list")
+        assert [m for m in LAZY_MODULES if m in loaded] == []
@@ -0,0 +1,64 @@
+import json
+import time
+
+from tectonic.core import state
+
+
+class TestFingerprint:
+    def test_stable_across_key_order(self):
+        assert state.fingerprint({"a": 1, "b": 2}) == state.fingerprint({"b": 2, "a": 1})
+
+    def test_tree_changes_on_edit(self, sample_files):
+        before = state.tree_fingerprint(sample_files["src_dir"])
+        assert state.tree_fingerprint(sample_files["src_dir"]) == before
+
+        sample_files["nested_file"].write_text("changed content, different size")
+
+        assert state.tree_fingerprint(sample_files["src_dir"]) != before
+
+
+class TestStateStore:
+    def test_record_and_reload(self, tmp_path):
+        path = tmp_path / "cache" / "state.json"
+        state.StateStore(path).record("dotfiles", "abc")
+
+        store = state.StateStore(path)
+        assert store.is_current("dotfiles", "abc")
+        assert not store.is_current("dotfiles", "def")
+        assert not store.is_current("tools", "abc")
+
+    def test_duration_kept_until_replaced(self, tmp_path):
+        store = state.StateStore(tmp_path / "state.json")
+        store.record("dotfiles", "abc", duration=12.5)
+        store.record("dotfiles", "def")
+
+        assert state.StateStore(tmp_path / "state.json").duration("dotfiles") == 12.5
+        assert store.duration("tools") is None
+
+    def test_force_bypasses(self, tmp_path):
+        path = tmp_path / "state.json"
+        state.StateStore(path).record("dotfiles", "abc")
+
+        assert not state.StateStore(path, force=True).is_current("dotfiles", "abc")
+
+    def test_max_age(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text(json.dumps({"tools": {"fingerprint": "abc", "time": time.time() - 100}}))
+        store = state.StateStore(path)
+
+        assert store.is_current("tools", "abc", max_age=1000)
+        assert not store.is_current("tools", "abc", max_age=10)
+
+    def test_corrupt_file_is_empty(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text("{not json")
+
+        assert not state.StateStore(path).is_current("dotfiles", "abc")
+
+    def test_forget(self, tmp_path):
+        path = tmp_path / "state.json"
+        store = state.StateStore(path)
+        store.record("dotfiles", "abc")
+        store.forget("dotfiles")
+
+        assert not state.StateStore(path).is_current("dotfiles", "abc")
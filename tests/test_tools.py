@@ -0,0 +1,348 @@
+import json
+import os
+import shutil
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from tectonic.base import ConfigService
+from tectonic.cli import app
+from tectonic.core import tools
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+runner = CliRunner()
+
+
+def git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repos(tmp_path, monkeypatch):
+    """An upstream repo and a clone of it at <root>/tool."""
+    monkeypatch.setattr(tools, "DIR_BIN", tmp_path / "bin")
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    git("init", "-q", "-b", "main", cwd=upstream)
+    (upstream / "README").write_text("hi\n")
+    git("add", ".", cwd=upstream)
+    git("commit", "-qm", "init", cwd=upstream)
+
+    root = tmp_path / "ws"
+    root.mkdir()
+    git("clone", "-q", str(upstream), "tool", cwd=root)
+    return upstream, root, {"repo": str(upstream), "path": "tool"}
+
+
+class TestToolStatus:
+    def test_missing(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tools, "DIR_BIN", tmp_path / "bin")
+        status = tools.tool_status("tool", {"repo": "x", "path": "tool"}, tmp_path)
+        assert (status.source, status.wrapper, status.branch) == ("missing", "missing", None)
+
+    def test_clean_and_in_sync(self, repos):
+        _, root, defn = repos
+        status = tools.tool_status("tool", defn, root)
+        assert (status.source, status.branch, status.upstream) == ("clean", "main", "origin/main")
+        assert (status.ahead, status.behind) == (0, 0)
+
+    def test_ahead_and_behind(self, repos):
+        upstream, root, defn = repos
+        (upstream / "new").write_text("x")
+        git("add", ".", cwd=upstream)
+        git("commit", "-qm", "upstream", cwd=upstream)
+        git("fetch", "-q", cwd=root / "tool")
+        git("commit", "-q", "--allow-empty", "-m", "local", cwd=root / "tool")
+
+        status = tools.tool_status("tool", defn, root)
+
+        assert (status.ahead, status.behind) == (1, 1)
+        assert status.last_fetch is not None
+
+    def test_untracked_only_scanned_on_request(self, repos):
+        _, root, defn = repos
+        (root / "tool" / "scratch.txt").write_text("x")
+
+        assert tools.tool_status("tool", defn, root).source == "clean"
+        status = tools.tool_status("tool", defn, root, untracked=True)
+        assert (status.source, status.untracked) == ("dirty", 1)
+
+    def test_modified_file_is_dirty(self, repos):
+        _, root, defn = repos
+        (root / "tool" / "README").write_text("changed\n")
+        assert tools.tool_status("tool", defn, root).source == "dirty"
+
+    def test_configure_repo_enables_untracked_cache(self, repos):
+        _, root, _ = repos
+        tools.configure_repo(root / "tool")
+        value = subprocess.run(
+            ["git", "config", "core.untrackedCache"], cwd=root / "tool",
+            capture_output=True, text=True,
+        ).stdout.strip()
+        assert value == "true"
+
+
+class TestStatusCommand:
+    def test_json_output(self, repos, tmp_path):
+        _, root, defn = repos
+        (tmp_path / "cfg").mkdir()
+        (tmp_path / "cfg" / "tools.yaml").write_text(
+            yaml.dump({"root": str(root), "tools": {"tool": defn}})
+        )
+        with patch("tectonic.cli.tools.config.configs", ConfigService(tmp_path / "cfg")):
+            result = runner.invoke(app, ["tools", "--status", "--json"])
+
+        assert result.exit_code == 0
+        (entry,) = json.loads(result.stdout)
+        assert {"name": "tool", "source": "clean", "branch": "main", "behind": 0}.items() <= (
+            entry.items()
+        )
+
+    def test_json_reports_failed_tools(self, repos, tmp_path):
+        _, root, defn = repos
+        (tmp_path / "cfg").mkdir()
+        (tmp_path / "cfg" / "tools.yaml").write_text(
+            yaml.dump({"root": str(root), "tools": {"tool": defn}})
+        )
+        with patch("tectonic.cli.tools.config.configs", ConfigService(tmp_path / "cfg")), \
+             patch("tectonic.cli.tools.core_tools.tool_status", side_effect=OSError("boom")):
+            result = runner.invoke(app, ["tools", "--status", "--json"])
+
+        assert result.exit_code == 1
+        assert json.loads(result.stdout) == [{"name": "tool", "error": "boom"}]
+
+
+class TestClone:
+    def _upstream(self, tmp_path):
+        upstream = tmp_path / "upstream"
+        for d in ("src", "docs"):
+            (upstream / d).mkdir(parents=True)
+            (upstream / d / "file").write_text(d)
+        git("init", "-q", "-b", "main", cwd=upstream)
+        git("add", ".", cwd=upstream)
+        git("commit", "-qm", "one", cwd=upstream)
+        git("commit", "-q", "--allow-empty", "-m", "two", cwd=upstream)
+        return f"file://{upstream}"
+
+    def _git_out(self, *args, cwd):
+        return subprocess.run(
+            ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    def test_shallow_sparse_clone(self, tmp_path):
+        repo, path = self._upstream(tmp_path), tmp_path / "ws" / "tool"
+
+        tools.ensure_source("tool", repo, path, tools.CloneOptions(depth=1, sparse=("src",)))
+
+        assert self._git_out("rev-list", "--count", "HEAD", cwd=path) == "1"
+        assert (path / "src" / "file").exists()
+        assert not (path / "docs").exists()
+
+    def test_mirror_is_created_and_dissociated(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tools, "MIRROR_DIR", tmp_path / "mirrors")
+        repo = self._upstream(tmp_path)
+
+        tools.ensure_source("a", repo, tmp_path / "a", tools.CloneOptions(mirror=True))
+        tools.ensure_source("b", repo, tmp_path / "b", tools.CloneOptions(mirror=True))
+
+        mirror = tools.mirror_path(repo)
+        assert self._git_out("rev-parse", "--is-bare-repository", cwd=mirror) == "true"
+        for clone in ("a", "b"):
+            assert not (tmp_path / clone / ".git" / "objects" / "info" / "alternates").exists()
+            assert self._git_out("rev-list", "--count", "HEAD", cwd=tmp_path / clone) == "2"
+
+    def test_unreachable_mirror_falls_back_to_plain_clone(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tools, "MIRROR_DIR", tmp_path / "mirrors")
+        repo = self._upstream(tmp_path)
+        # Mirror creation fails, so --reference-if-able has nothing to borrow from
+        monkeypatch.setattr(tools, "_refresh_mirror", lambda repo: tools.mirror_path(repo))
+
+        tools.ensure_source("a", repo, tmp_path / "a", tools.CloneOptions(mirror=True))
+
+        assert not tools.mirror_path(repo).exists()
+        assert (tmp_path / "a" / "src" / "file").exists()
+
+
+class TestFetchPolicy:
+    def _head(self, path):
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    def _advance(self, upstream, name="next"):
+        (upstream / name).write_text(name)
+        git("add", ".", cwd=upstream)
+        git("commit", "-qm", name, cwd=upstream)
+
+    def test_fresh_fetch_skips_pull(self, repos):
+        upstream, root, defn = repos
+        path = root / "tool"
+        git("fetch", "-q", cwd=path)
+        self._advance(upstream)
+        before = self._head(path)
+
+        assert tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600) is None
+        assert self._head(path) == before
+
+    def test_diverged_repo_is_reported_within_ttl(self, repos):
+        upstream, root, defn = repos
+        path = root / "tool"
+        self._advance(upstream, "theirs")
+        self._advance(path, "ours")
+
+        assert tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600) == (
+            "diverged from upstream"
+        )
+        assert tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600) == (
+            "diverged from upstream"
+        )
+
+    def test_fetched_but_unmerged_is_pulled_within_ttl(self, repos):
+        upstream, root, defn = repos
+        path = root / "tool"
+        self._advance(upstream)
+        git("fetch", "-q", cwd=path)
+
+        tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600)
+
+        assert self._head(path) == self._head(upstream)
+
+    def test_probe_counts_for_ttl_but_is_not_a_fetch(self, repos):
+        _, root, defn = repos
+        path = root / "tool"
+        git("fetch", "-q", cwd=path)
+        fetch_head = path / ".git" / "FETCH_HEAD"
+        os.utime(fetch_head, (0, 0))
+
+        tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600)
+        with patch.object(tools.process, "run", wraps=tools.process.run) as run:
+            tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600)
+
+        assert fetch_head.stat().st_mtime == 0
+        assert tools.tool_status("tool", defn, root).last_fetch == 0
+        assert "ls-remote" not in [c.args[0][1] for c in run.call_args_list]
+
+    def test_refresh_ignores_ttl(self, repos):
+        upstream, root, defn = repos
+        path = root / "tool"
+        git("fetch", "-q", cwd=path)
+        self._advance(upstream)
+
+        tools.ensure_source("tool", defn["repo"], path, fetch_ttl=3600, refresh=True)
+
+        assert self._head(path) == self._head(upstream)
+
+    def test_unchanged_upstream_is_probed_not_pulled(self, repos):
+        _, root, defn = repos
+        path = root / "tool"
+
+        with patch.object(tools.process, "run", wraps=tools.process.run) as run:
+            tools.ensure_source("tool", defn["repo"], path)
+
+        commands = [c.args[0][1] for c in run.call_args_list]
+        assert "ls-remote" in commands and "pull" not in commands
+
+    def test_moved_upstream_is_pulled(self, repos):
+        upstream, root, defn = repos
+        self._advance(upstream)
+
+        tools.ensure_source("tool", defn["repo"], root / "tool")
+
+        assert self._head(root / "tool") == self._head(upstream)
+
+    def test_skip_reason_unchanged(self, repos):
+        upstream, root, defn = repos
+        self._advance(upstream, "README")
+        (root / "tool" / "README").write_text("local edit\n")
+
+        reason = tools.ensure_source("tool", defn["repo"], root / "tool")
+
+        assert reason == "uncommitted changes"
+
+
+class TestWrapper:
+    @pytest.fixture
+    def tool(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tools, "DIR_BIN", tmp_path / "bin")
+        path = tmp_path / "ws" / "tool"
+        path.mkdir(parents=True)
+        (path / "uv.lock").write_text("lock v1")
+        fake_bin = tmp_path / "fakebin"
+        fake_bin.mkdir()
+        (fake_bin / "uv").write_text('#!/bin/sh\necho "uv $*"\n')
+        (fake_bin / "uv").chmod(0o755)
+        monkeypatch.setenv("PATH", f"{fake_bin}:/usr/bin:/bin")
+        return path
+
+    def _call(self, name, *args, env=None):
+        return subprocess.run(
+            [str(tools.DIR_BIN / name), *args], capture_output=True, text=True,
+            env={**os.environ, **(env or {})},
+        ).stdout
+
+    def _venv(self, tool):
+        venv_bin = tool / ".venv" / "bin"
+        venv_bin.mkdir(parents=True)
+        (venv_bin / "tool").write_text('#!/bin/sh\necho "venv $*"\n')
+        (venv_bin / "tool").chmod(0o755)
+
+    def test_execs_venv_directly_with_uv_run_fallback(self, tool):
+        tools.ensure_wrapper("tool", tool)
+        assert self._call("tool", "x") == f"uv run --project {tool} tool x\n"
+
+        self._venv(tool)
+        tools.ensure_env("tool", tool)
+        assert self._call("tool", "x") == "venv x\n"
+        assert self._call("tool", "x", env={"TECTONIC_UV_RUN": "1"}).startswith("uv run")
+
+    def test_failed_sync_falls_back_to_uv_run(self, tool, tmp_path):
+        self._venv(tool)
+        tools.ensure_env("tool", tool)
+        tools.ensure_wrapper("tool", tool)
+        (tmp_path / "fakebin" / "uv").write_text(
+            '#!/bin/sh\n[ "$1" = sync ] && exit 1\necho "uv $*"\n'
+        )
+        (tool / "uv.lock").write_text("lock v2")
+
+        tools.ensure_env("tool", tool)
+
+        assert self._call("tool", "x") == f"uv run --project {tool} tool x\n"
+
+    def test_env_synced_once_per_lock(self, tool):
+        (tool / ".venv" / "bin").mkdir(parents=True)
+        (tool / ".venv" / "bin" / "tool").touch()
+
+        with patch.object(tools.process, "run", wraps=tools.process.run) as run:
+            tools.ensure_env("tool", tool)
+            tools.ensure_env("tool", tool)
+            (tool / "uv.lock").write_text("lock v2")
+            tools.ensure_env("tool", tool)
+
+        syncs = [c.args[0] for c in run.call_args_list if c.args[0][:2] == ["uv", "sync"]]
+        assert len(syncs) == 2
+        assert "--frozen" in syncs[0] and "--compile-bytecode" in syncs[0]
+        assert "--inexact" in syncs[0]  # dev dependencies of a working checkout survive
+
+    def test_status_stale_after_lock_change(self, tool):
+        root, defn = tool.parent, {"repo": "x", "path": "tool"}
+        tools.ensure_env("tool", tool)
+        tools.ensure_wrapper("tool", tool)
+        assert tools.tool_status("tool", defn, root).wrapper == "ok"
+
+        (tool / "uv.lock").write_text("lock v2")
+
+        assert tools.tool_status("tool", defn, root).wrapper == "stale"
+
+    def test_status_without_uv(self, tool, monkeypatch):
+        root, defn = tool.parent, {"repo": "x", "path": "tool"}
+        tools.ensure_wrapper("tool", tool)
+        monkeypatch.setattr(tools.process, "is_installed", lambda cmd: cmd != "uv")
+
+        assert tools.tool_status("tool", defn, root).wrapper == "no-uv"
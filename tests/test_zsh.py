@@ -0,0 +1,126 @@
+import json
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from tectonic import config
+from tectonic.core import zsh
+
+# Stands in for zsh: reports two sourced files the way dot_zshrc's hook does
+FAKE_ZSH = """#!/bin/sh
+if [ -n "$TECTONIC_ZSH_PROFILE" ]; then
+    printf '%s\\t%s\\n' "$HOME/.config/zsh/zshrc.d/prompt.zsh" 2.5 >> "$TECTONIC_ZSH_PROFILE"
+    printf '%s\\t%s\\n' /opt/plugin.zsh 1.0 >> "$TECTONIC_ZSH_PROFILE"
+fi
+[ -n "$TECTONIC_ZSH_ZPROF" ] && echo "num  calls  time"
+env > "$(dirname "$0")/env.txt"
+"""
+
+
+@pytest.fixture
+def fake_zsh(tmp_path):
+    path = tmp_path / "zsh"
+    path.write_text(FAKE_ZSH)
+    path.chmod(0o755)
+    return str(path)
+
+
+class TestPercentile:
+    def test_nearest_rank(self):
+        values = [float(v) for v in range(1, 11)]
+        assert zsh.percentile(values, 50) == 5
+        assert zsh.percentile(values, 90) == 9
+        assert zsh.percentile(values, 99) == 10
+        assert zsh.percentile([3.0], 50) == 3
+
+
+class TestBench:
+    def test_collects_totals_and_per_file_times(self, fake_zsh):
+        result = zsh.bench(runs=3, warmup=1, zsh=fake_zsh)
+
+        assert len(result.totals) == 3
+        assert result.file_medians() == {"~/.config/zsh/zshrc.d/prompt.zsh": 2.5,
+                                         "/opt/plugin.zsh": 1.0}
+        assert set(result.summary()) == {"min", "p50", "p90", "p99", "max"}
+
+    def test_environment_is_clean(self, fake_zsh, tmp_path, monkeypatch):
+        monkeypatch.setenv("VIRTUAL_ENV", "/somewhere")
+        zsh.bench(runs=1, warmup=0, zsh=fake_zsh)
+        env = (tmp_path / "env.txt").read_text()
+        assert "VIRTUAL_ENV" not in env
+        assert "TECTONIC_ZSH_PROFILE=" in env
+        assert "TECTONIC_ZSH_EAGER=1" in env
+
+    def test_deferred_leaves_plugins_to_zle(self, fake_zsh, tmp_path):
+        zsh.bench(runs=1, warmup=0, zsh=fake_zsh, eager=False)
+        assert "TECTONIC_ZSH_EAGER" not in (tmp_path / "env.txt").read_text()
+
+    def test_zprof(self, fake_zsh):
+        assert "calls" in zsh.zprof(fake_zsh)
+
+
+@pytest.mark.skipif(shutil.which("zsh") is None, reason="needs zsh")
+class TestManagedZshrc:
+    @pytest.fixture
+    def home(self, tmp_path, monkeypatch):
+        """The repo's .zshrc with one zshrc.d snippet, in a throwaway HOME."""
+        zdotdir = tmp_path / ".config" / "zsh"
+        (zdotdir / "zshrc.d").mkdir(parents=True)
+        shutil.copy(config.CHEZMOI_SOURCE / "dot_config" / "zsh" / "dot_zshrc", zdotdir / ".zshrc")
+        (zdotdir / "zshrc.d" / "snippet.zsh").write_text("typeset -g SNIPPET=1\n")
+        (tmp_path / ".zshenv").write_text(
+            f"export ZDOTDIR={zdotdir} XDG_CACHE_HOME={tmp_path / '.cache'}\n"
+        )
+        init = tmp_path / ".cache" / "zsh" / "init"
+        init.mkdir(parents=True)
+        (init / "tool.zsh").write_text("true\n")
+        monkeypatch.setenv("HOME", str(tmp_path))
+        return tmp_path
+
+    def test_per_file_times_survive_a_compiling_shell(self, home):
+        # A normal shell starts the background zcompile; wait for it to finish
+        subprocess.run(
+            ["zsh", "-i", "-c", "exit"], env=zsh.clean_env(), stdin=subprocess.DEVNULL,
+            capture_output=True, check=False,
+        )
+        compiled = home / ".cache" / "zsh" / "init" / "tool.zsh.zwc"
+        deadline = time.monotonic() + 10
+        while not compiled.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert compiled.exists()
+
+        result = zsh.bench(runs=2, warmup=0, zsh="zsh")
+
+        assert "~/.config/zsh/zshrc.d/snippet.zsh" in result.file_medians()
+
+
+class TestHistory:
+    def test_append_and_read_last(self, tmp_path):
+        history = tmp_path / "bench.jsonl"
+        assert zsh.last_record("h", history=history) is None
+        result = zsh.BenchResult(totals=[10.0, 12.0], files={"a.zsh": [1.0, 3.0]})
+
+        zsh.append_record(zsh.record(result, host="h2"), history)
+        zsh.append_record(zsh.record(result, host="h", dotfiles="abc", plugins="eager"), history)
+        zsh.append_record(zsh.record(result, host="h2", plugins="eager"), history)
+        with open(history, "a") as f:
+            f.write('{"torn":')
+
+        last = zsh.last_record("h", history=history)
+        assert (last["host"], last["dotfiles"]) == ("h", "abc")
+        assert (last["runs"], last["p50"], last["files"]) == (2, 10.0, {"a.zsh": 2.0})
+        assert zsh.last_record("elsewhere", history=history) is None
+        assert len(history.read_text().splitlines()) == 4
+        json.loads(history.read_text().splitlines()[0])
+
+    def test_eager_and_deferred_runs_are_not_compared(self, tmp_path):
+        history = tmp_path / "bench.jsonl"
+        result = zsh.BenchResult(totals=[10.0])
+        # Written before plugins could load eagerly: no "plugins" field
+        zsh.append_record(zsh.record(result, host="h", dotfiles="old"), history)
+        zsh.append_record(zsh.record(result, host="h", plugins="eager"), history)
+
+        assert zsh.last_record("h", "deferred", history)["dotfiles"] == "old"
+        assert "dotfiles" not in zsh.last_record("h", "eager", history)